@@ -0,0 +1,78 @@
+"""Compare KMeansConstrained with RecursiveBisectionConstrained on synthetic departments.
+
+Run from the repository root:
+    python -m benchmarks.constrained_engines --sizes 300 1000 3000 100000 --kmeans-limit 3000
+"""
+import argparse
+import json
+import time
+import numpy as np
+
+from math import ceil
+from k_means_constrained import KMeansConstrained
+
+from src.Clustering.RecursiveBisection import RecursiveBisectionConstrained
+
+
+def synthetic_department(n: int, rng: np.random.Generator, n_centers: int = 5) -> np.ndarray:
+    """Participants around a few towns, in LV95 metres."""
+    centers = rng.uniform([2_500_000, 1_080_000], [2_800_000, 1_280_000], size=(n_centers, 2))
+    assignment = rng.integers(0, n_centers, size=n)
+    return centers[assignment] + rng.normal(0, 5000, size=(n, 2))
+
+
+def run_engine(engine, coordinates: np.ndarray) -> dict:
+    start = time.perf_counter()
+    labels = engine.fit_predict(coordinates)
+    elapsed = time.perf_counter() - start
+    centers = engine.cluster_centers_
+    sizes = np.bincount(labels, minlength=len(centers))
+    return {
+        'seconds': round(elapsed, 3),
+        'inertia': float(((coordinates - centers[labels]) ** 2).sum()),
+        'min_size': int(sizes.min()),
+        'max_size': int(sizes.max())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[300, 1000, 3000, 10000, 100000])
+    parser.add_argument('--size-max', type=int, default=36)
+    parser.add_argument('--kmeans-limit', type=int, default=3000,
+                        help="Skip KMeansConstrained above this many points, it grows roughly with n * k")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    for n in args.sizes:
+        coordinates = synthetic_department(n, rng)
+        n_clusters = ceil(n / args.size_max)
+        size_min = max(1, n // n_clusters - 5)  # Same slack as DepartmentGeoClustering
+
+        row = {'n': n, 'n_clusters': n_clusters}
+        row['bisection'] = run_engine(
+            RecursiveBisectionConstrained(n_clusters, size_min=size_min, size_max=args.size_max), coordinates
+        )
+        if n <= args.kmeans_limit:
+            row['kmeans'] = run_engine(
+                KMeansConstrained(n_clusters, size_min=size_min, size_max=args.size_max, random_state=args.seed),
+                coordinates
+            )
+        results.append(row)
+
+        line = f"n={n:>7} k={n_clusters:>5}  bisection {row['bisection']['seconds']:>8.3f}s"
+        if 'kmeans' in row:
+            ratio = row['bisection']['inertia'] / row['kmeans']['inertia']
+            line += f"  kmeans {row['kmeans']['seconds']:>8.3f}s  inertia ratio {ratio:.2f}"
+        print(line, flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
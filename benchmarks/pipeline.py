@@ -0,0 +1,239 @@
+"""Time the pipeline stages on synthetic Swiss participants and save the results as JSON.
+
+Run from the repository root:
+    python -m benchmarks.pipeline --sizes 1000 10000 100000
+    python -m benchmarks.pipeline --sizes 1000 --baseline benchmarks/results/<previous>.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import numpy as np
+
+from datetime import datetime
+from math import ceil
+
+from benchmarks.synthetic import generate_participants, load_cantons, to_export_frame
+from src.ClusterExport import export_clusters_csv
+from src.Clustering.DepartmentGeoClustering import DepartmentGeoClustering
+from src.Clustering.GeoClustering import GeoClustering
+from src.Clustering.GeoClusteringConstrained import GeoClusteringConstrained
+from src.Clustering.HierarchicalGeoClustering import HierarchicalGeoClustering
+from src.Clustering.LeaderAssignment import LeaderAssignment
+from src.Participant import Participant
+from src.ParticipantTable import ParticipantTable
+from src.ParticipantLoader import (
+    read_export, normalize_frame, filter_by_function, build_full_addresses, participants_from_frame
+)
+from src.Visualizer import ParticipantVisualizer
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+STAGES = (
+    'ingestion', 'geo_clustering', 'geo_clustering_constrained', 'department_clustering',
+    'hierarchical_clustering', 'leader_assignment', 'merge_small_clusters', 'csv_export', 'map'
+)
+# Stages that are impractical beyond some size are skipped there unless --limit overrides it
+DEFAULT_LIMITS = {
+    'geo_clustering_constrained': 5000, 'geo_clustering': 100000, 'leader_assignment': 100000, 'map': 50000
+}
+SIZE_MAX = 36
+
+
+def run_size(n: int, stages: list, limits: dict, args, cantons, workdir: str) -> dict:
+    start = time.perf_counter()
+    participants = generate_participants(n, seed=args.seed, cantons=cantons)
+    result = {'size': n, 'generate_seconds': round(time.perf_counter() - start, 3), 'stages': {}}
+    logger.warning(f"Generated {n} synthetic participants in {result['generate_seconds']}s")
+
+    members = [p for p in participants if p.is_participant()]
+    n_clusters = ceil(len(members) / SIZE_MAX)
+    export_path = os.path.join(workdir, f"export_{n}.csv")
+    to_export_frame(participants).to_csv(export_path, sep=';', index=False)
+
+    def ingestion():
+        frame = filter_by_function(
+            normalize_frame(read_export(export_path)), [Participant.PARTICIPANT_FUNCTION, Participant.LEADER_FUNCTION]
+        )
+        frame['full_address'] = build_full_addresses(frame)
+        return len(participants_from_frame(frame))
+
+    def geo_clustering():
+        return len(GeoClustering(n_clusters=n_clusters, random_state=args.seed).cluster_participants(members))
+
+    def geo_clustering_constrained():
+        clusterer = GeoClusteringConstrained(n_clusters=n_clusters, size_max=SIZE_MAX, random_state=args.seed)
+        return len(clusterer.cluster_participants(members))
+
+    clusters = {}
+
+    def department_clustering():
+        clusterer = DepartmentGeoClustering(size_max=SIZE_MAX, n_jobs=args.jobs, engine=args.engine)
+        clusters.update(clusterer.cluster_participants(members))
+        return len(clusters)
+
+    def hierarchical_clustering():
+        clusterer = HierarchicalGeoClustering(size_max=SIZE_MAX, n_jobs=args.jobs, engine=args.engine)
+        return len(clusterer.cluster_participants(members))
+
+    def leader_assignment():
+        # Units of the department clustering stage if it ran, department chunks otherwise
+        units = clusters or {
+            cluster_id: [members[row] for row in rows]
+            for cluster_id, rows in department_chunks(members, DepartmentGeoClustering(size_max=SIZE_MAX)).items()
+        }
+        leaders = [p for p in participants if p.is_leader()]
+        LeaderAssignment(min_leaders=1, max_leaders=3).assign_leaders(units, leaders)
+        return len(leaders)
+
+    merge_input = {}
+
+    def merge_small_clusters():
+        clusterer = DepartmentGeoClustering(size_max=SIZE_MAX)
+        initial = department_chunks(members, clusterer)
+        merge_input['clusters'] = len(initial)
+        return len(clusterer._merge_small_clusters(initial, ParticipantTable.from_participants(members).xy))
+
+    def csv_export():
+        export_clusters_csv(clusters or {0: members}, os.path.join(workdir, f"clusters_{n}.csv"))
+        return len(members)
+
+    def interactive_map():
+        ParticipantVisualizer().create_interactive_map(
+            members, clusters or None, output_file=os.path.join(workdir, f"map_{n}.html"), mode=args.map_mode
+        )
+        return len(members)
+
+    functions = {
+        'ingestion': ingestion,
+        'geo_clustering': geo_clustering,
+        'geo_clustering_constrained': geo_clustering_constrained,
+        'department_clustering': department_clustering,
+        'hierarchical_clustering': hierarchical_clustering,
+        'leader_assignment': leader_assignment,
+        'merge_small_clusters': merge_small_clusters,
+        'csv_export': csv_export,
+        'map': interactive_map
+    }
+
+    for stage in stages:
+        limit = limits.get(stage)
+        if limit is not None and n > limit:
+            result['stages'][stage] = {'skipped': f"size above limit {limit}"}
+            continue
+        start = time.perf_counter()
+        try:
+            items = functions[stage]()
+        except Exception as e:
+            logger.exception(f"Stage {stage} failed for size {n}")
+            result['stages'][stage] = {'error': repr(e)}
+            continue
+        seconds = time.perf_counter() - start
+        result['stages'][stage] = {'seconds': round(seconds, 4), 'items': items}
+        if stage == 'merge_small_clusters':
+            result['stages'][stage]['input_clusters'] = merge_input['clusters']
+        logger.warning(f"  {stage:<28} {seconds:>9.3f}s  ({items} items)")
+
+    return result
+
+
+def department_chunks(members: list, clusterer: DepartmentGeoClustering) -> dict:
+    """Initial clusters as the department step would produce them: each department cut into
+    chunks of at most size_max along x, which leaves many small clusters to merge. Clusters are
+    lists of positions in members."""
+    clusters = {}
+    by_department = {}
+    for row, participant in enumerate(members):
+        by_department.setdefault(participant.abteilung, []).append(row)
+    for dept, dept_rows in by_department.items():
+        dept_rows.sort(key=lambda row: members[row].geo_data.x)
+        n_chunks = ceil(len(dept_rows) / clusterer.size_max)
+        for sub_label, chunk in enumerate(np.array_split(np.arange(len(dept_rows)), n_chunks)):
+            cluster_id = len(clusters)
+            clusters[cluster_id] = [dept_rows[i] for i in chunk]
+            clusterer.cluster_info[cluster_id] = {
+                'department': dept, 'sub_cluster': sub_label + 1 if n_chunks > 1 else None
+            }
+    return clusters
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare(results: list, baseline_path: str):
+    """Print the ratio current / baseline for every stage timed in both runs."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {row['size']: row['stages'] for row in json.load(f)['results']}
+    for row in results:
+        for stage, timing in row['stages'].items():
+            previous = baseline.get(row['size'], {}).get(stage, {})
+            if 'seconds' in timing and previous.get('seconds'):
+                ratio = timing['seconds'] / previous['seconds']
+                print(f"n={row['size']:>7} {stage:<28} {previous['seconds']:>9.3f}s -> {timing['seconds']:>9.3f}s  x{ratio:.2f}")
+
+
+def parse_limits(values: list) -> dict:
+    limits = dict(DEFAULT_LIMITS)
+    for value in values or []:
+        stage, _, limit = value.partition('=')
+        if stage not in STAGES:
+            raise SystemExit(f"Unknown stage '{stage}' in --limit, expected one of {STAGES}")
+        limits[stage] = int(limit) if limit and limit.lower() != 'none' else None
+    return limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 500000])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--limit', action='append', metavar='STAGE=N',
+                        help=f"Largest size to run STAGE at ('none' for no limit). Defaults: {DEFAULT_LIMITS}")
+    parser.add_argument('--jobs', type=int, default=1, help="Worker processes for department clustering")
+    parser.add_argument('--engine', default='kmeans', help="Department clustering engine")
+    parser.add_argument('--map-mode', default='markers', help="ParticipantVisualizer map mode")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Result file, defaults to benchmarks/results/pipeline-<timestamp>.json")
+    parser.add_argument('--baseline', help="Previous result file to compare against")
+    parser.add_argument('--log-level', default='WARNING', help="Log level of the pipeline code while timing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format='%(message)s')
+    limits = parse_limits(args.limit)
+    cantons = load_cantons()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            results.append(run_size(n, args.stages, limits, args, cantons, workdir))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'arguments': vars(args), 'results': results}, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
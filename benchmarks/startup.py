@@ -0,0 +1,70 @@
+"""Measure import time of main.py and the stage modules, and which heavy dependencies they load.
+
+Every measurement runs in a fresh interpreter. Run from the repository root:
+    python -m benchmarks.startup --repeat 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Heavy third-party packages that should only be imported by the stages that need them
+HEAVY_MODULES = ('pandas', 'sklearn', 'k_means_constrained', 'scipy', 'folium', 'matplotlib', 'requests')
+
+TARGETS = {
+    'main': 'import main',
+    'clustering': 'from src.Clustering.DepartmentGeoClustering import DepartmentGeoClustering',
+    'map': 'from src.Visualizer import ParticipantVisualizer',
+    'all_stages': (
+        'import main; import src.Clustering.DepartmentGeoClustering, src.Clustering.GeoClustering, '
+        'src.Clustering.GeoClusteringConstrained, src.Visualizer, src.interactWithLawmanger'
+    ),
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{'seconds': seconds, 'loaded': loaded}}))
+"""
+
+
+def measure(statement: str, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'median_seconds': round(statistics.median(run['seconds'] for run in runs), 3),
+        'min_seconds': round(min(run['seconds'] for run in runs), 3),
+        'loaded': runs[0]['loaded']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, statement in TARGETS.items():
+        results[name] = measure(statement, args.repeat)
+        print(
+            f"{name:<12} {results[name]['median_seconds']:>7.3f}s median  "
+            f"{results[name]['min_seconds']:>7.3f}s min  loads: {', '.join(results[name]['loaded']) or '-'}"
+        )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Synthetic Swiss participants for benchmarks.
+
+Departments get a home location inside a canton, with cantons drawn proportionally to their
+population (data/geodata/Switzerland_overview.csv) and the location drawn uniformly inside the
+canton polygons (data/geodata/switzerland.geojson). Department sizes follow a log-normal
+distribution and members live within a few kilometres of their department's home.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+from math import ceil
+from typing import Dict, List
+
+from src.Geodata import Geodata, wgs84_to_lv95
+from src.Participant import Participant
+from src.ParticipantLoader import CSV_COLUMNS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OVERVIEW_PATH = os.path.join(BASE_DIR, 'data', 'geodata', 'Switzerland_overview.csv')
+GEOJSON_PATH = os.path.join(BASE_DIR, 'data', 'geodata', 'switzerland.geojson')
+
+# Department sizes: median ~25 members, long tail of large departments
+DEPARTMENT_SIZE_MEDIAN = 25
+DEPARTMENT_SIZE_SIGMA = 0.8
+DEPARTMENT_SIZE_RANGE = (3, 400)
+MEMBER_SPREAD_METERS = 4000
+LEADER_SHARE = 0.1
+
+FIRST_NAMES = ['Anna', 'Luca', 'Mia', 'Noah', 'Lea', 'Elias', 'Lina', 'Leon', 'Emma', 'Nino', 'Chiara', 'Matteo']
+LAST_NAMES = ['Müller', 'Meier', 'Schmid', 'Keller', 'Weber', 'Huber', 'Rossi', 'Favre', 'Bianchi', 'Moser']
+SCOUT_NAMES = ['Fuchs', 'Biber', 'Luchs', 'Dachs', 'Falke', 'Igel', 'Wiesel', 'Specht', '']
+STREETS = ['Bahnhofstrasse', 'Hauptstrasse', 'Dorfstrasse', 'Kirchweg', 'Rue du Lac', 'Via Centrale']
+
+
+def load_cantons() -> pd.DataFrame:
+    """Canton table with population weights and the outer/inner rings of each canton's polygons."""
+    overview = pd.read_csv(OVERVIEW_PATH)
+    with open(GEOJSON_PATH, encoding='utf-8') as f:
+        features = json.load(f)['features']
+
+    rings = {}
+    for feature in features:
+        geometry = feature['geometry']
+        polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+        for polygon in polygons:
+            for ring in polygon:
+                # Drop the elevation, the GeoJSON coordinates are (lon, lat, height)
+                rings.setdefault(feature['properties']['KANTONSNUM'], []).append(np.asarray(ring)[:, :2])
+
+    overview['rings'] = overview['CantonNumber'].map(rings)
+    overview['weight'] = overview['Population'] / overview['Population'].sum()
+    return overview
+
+
+def sample_in_rings(rings: List[np.ndarray], n: int, rng: np.random.Generator) -> np.ndarray:
+    """Uniform (lon, lat) points inside a set of polygon rings by rejection sampling in the bounding box."""
+    all_points = np.concatenate(rings)
+    low, high = all_points.min(axis=0), all_points.max(axis=0)
+    samples = []
+    remaining = n
+    while remaining > 0:
+        candidates = rng.uniform(low, high, size=(max(2 * remaining, 16), 2))
+        inside = candidates[_inside_rings(candidates, rings)]
+        samples.append(inside[:remaining])
+        remaining -= len(samples[-1])
+    return np.concatenate(samples)
+
+
+def department_sizes(n: int, rng: np.random.Generator) -> np.ndarray:
+    """Log-normal department sizes summing to exactly n."""
+    expected = ceil(n / DEPARTMENT_SIZE_MEDIAN) + 1
+    sizes = np.empty(0, dtype=np.int64)
+    while sizes.sum() < n:
+        drawn = rng.lognormal(np.log(DEPARTMENT_SIZE_MEDIAN), DEPARTMENT_SIZE_SIGMA, size=expected)
+        sizes = np.concatenate([sizes, np.clip(drawn.round(), *DEPARTMENT_SIZE_RANGE).astype(np.int64)])
+    cut = int(np.searchsorted(np.cumsum(sizes), n)) + 1
+    sizes = sizes[:cut]
+    sizes[-1] -= sizes.sum() - n
+    return sizes[sizes > 0]
+
+
+def generate_participants(n: int, seed: int = 42, cantons: pd.DataFrame | None = None) -> List[Participant]:
+    """n participants (about LEADER_SHARE of them unit leads) with geo_data in WGS84 and LV95."""
+    rng = np.random.default_rng(seed)
+    cantons = load_cantons() if cantons is None else cantons
+
+    sizes = department_sizes(n, rng)
+    department_canton = rng.choice(len(cantons), size=len(sizes), p=cantons['weight'].to_numpy())
+
+    homes = np.empty((len(sizes), 2))
+    for canton in np.unique(department_canton):
+        rows = np.flatnonzero(department_canton == canton)
+        homes[rows] = sample_in_rings(cantons['rings'].iloc[canton], len(rows), rng)
+
+    member_department = np.repeat(np.arange(len(sizes)), sizes)
+    member_canton = department_canton[member_department]
+    home_lon, home_lat = homes[member_department, 0], homes[member_department, 1]
+    lat = home_lat + rng.normal(0, MEMBER_SPREAD_METERS / 111_000, size=n)
+    lon = home_lon + rng.normal(0, MEMBER_SPREAD_METERS / (111_000 * np.cos(np.radians(home_lat))), size=n)
+    x, y = wgs84_to_lv95(lat, lon)
+
+    is_leader = rng.random(n) < LEADER_SHARE
+    first = rng.integers(0, len(FIRST_NAMES), size=n)
+    last = rng.integers(0, len(LAST_NAMES), size=n)
+    scout = rng.integers(0, len(SCOUT_NAMES), size=n)
+    street = rng.integers(0, len(STREETS), size=n)
+    house_number = rng.integers(1, 200, size=n)
+
+    names = cantons['Canton'].tolist()
+    capitals = cantons['Capital'].tolist()
+    participants = []
+    for i in range(n):
+        canton = member_canton[i]
+        participant = Participant.from_normalized(
+            FIRST_NAMES[first[i]], f"{LAST_NAMES[last[i]]} {i}", SCOUT_NAMES[scout[i]],
+            STREETS[street[i]], str(house_number[i]), None, str(1000 + 10 * canton), capitals[canton], 'CH',
+            f"Pfadi {names[canton]}",
+            Participant.LEADER_FUNCTION if is_leader[i] else Participant.PARTICIPANT_FUNCTION,
+            f"Abteilung {member_department[i]:05d}", names[canton]
+        )
+        participant.geo_data = Geodata(lat=float(lat[i]), lon=float(lon[i]), x=float(x[i]), y=float(y[i]))
+        participants.append(participant)
+    return participants
+
+
+def to_export_frame(participants: List[Participant]) -> pd.DataFrame:
+    """Participants as a Midata export frame (column names of CSV_COLUMNS, all text)."""
+    return pd.DataFrame({
+        column: [getattr(p, field) for p in participants] for field, column in CSV_COLUMNS.items()
+    })
+
+
+def department_counts(participants: List[Participant]) -> Dict[str, int]:
+    return pd.Series([p.abteilung for p in participants]).value_counts().to_dict()
+
+
+def _inside_rings(points: np.ndarray, rings: List[np.ndarray]) -> np.ndarray:
+    # Even-odd ray casting over all rings, so holes (lakes, enclaves) are excluded
+    inside = np.zeros(len(points), dtype=bool)
+    px, py = points[:, 0, None], points[:, 1, None]
+    for ring in rings:
+        x1, y1 = ring[:-1, 0], ring[:-1, 1]
+        x2, y2 = ring[1:, 0], ring[1:, 1]
+        crosses = (y1 > py) != (y2 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= (crosses & (px < x_cross)).sum(axis=1) % 2 == 1
+    return inside
@@ -1,156 +1,540 @@
 import os
+import argparse
 import logging
-import pickle
-import pandas as pd
+import numpy as np
 
 from dotenv import load_dotenv
 
-from src.interactWithLawmanger import LawmangerInteractor
+from src.GeocodeCache import GeocodeCache
 from src.Participant import Participant
-from src.Clustering.GeoClusteringConstrained import GeoClusteringConstrained
-from src.Clustering.GeoClustering import GeoClustering
-from src.Clustering.DepartmentGeoClustering import DepartmentGeoClustering
-from src.Visualizer import ParticipantVisualizer
-
-logging.basicConfig(
-    level=logging.INFO,
-    datefmt='%Y-%m-%d %H:%M:%S',
-    filename='UnitAssigner.log',
-    filemode='w',
-    encoding='utf-8',
-    format='%(asctime)s %(levelname)-8s %(message)s'
+from src.ArtifactStore import ArtifactStore
+from src.ParticipantTable import ParticipantTable
+from src.ParticipantStore import (
+    save_snapshot, load_participants, load_table, read_snapshot_meta, SnapshotSchemaError, save_cluster_labels,
+    load_labels, load_cluster_labels, convert_legacy_pickle
 )
-console = logging.StreamHandler()
-console.setLevel(logging.INFO)
-console.setFormatter(logging.Formatter('%(asctime)s %(levelname)-8s %(message)s'))
+from src.ParticipantLoader import (
+    read_export, normalize_frame, filter_by_function, build_full_addresses, participants_from_frame,
+    reuse_snapshot_geodata
+)
+from src.Clustering.WarmStart import load_centroids, save_centroids
+from src.ClusterExport import export_clusters, FILE_EXTENSIONS
+from src.Gazetteer import GAZETTEER_PATH, load_gazetteer
+from src.Instrumentation import RunReport
+# Modules with heavy dependencies (requests, k_means_constrained/scikit-learn/scipy, folium) are
+# imported inside the stage that needs them, so runs that skip a stage do not pay for its imports
 
 logger = logging.getLogger()
-logger.addHandler(console)
-logger.setLevel(logging.INFO)
 
 load_dotenv()
 
 CONSTRAINT_ENABLED = os.getenv("CONSTRAINT_ENABLED", "False").lower() in ("true", "1", "t")
 IS_DEV = os.getenv("IS_DEV", "False").lower() in ("true", "1", "t")
 RELOAD_DATA = os.getenv("RELOAD_DATA", "False").lower() in ("true", "1", "t")
+INCREMENTAL_RELOAD = os.getenv("INCREMENTAL_RELOAD", "False").lower() in ("true", "1", "t")
 LAWMANAGER_BASE_URL = os.getenv("LAWMANAGER_BASE_URL")
+LAWMANAGER_BATCH_URL = os.getenv("LAWMANAGER_BATCH_URL") or None  # Optional batch endpoint
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", "./export/geocode_cache.sqlite")
+GEOCODE_CACHE_TTL_DAYS = float(os.getenv("GEOCODE_CACHE_TTL_DAYS", "180"))
+GEOCODE_CACHE_NEGATIVE_TTL_DAYS = float(os.getenv("GEOCODE_CACHE_NEGATIVE_TTL_DAYS", "7"))
+GEOCODE_CONCURRENCY = int(os.getenv("GEOCODE_CONCURRENCY", "8"))
+# api: Lawmanager API only, fallback: API and the PLZ/Ort gazetteer for addresses it did not find,
+# offline: gazetteer only, no network access
+GEOCODE_MODE = os.getenv("GEOCODE_MODE", "api").lower()
+GEOCODE_BATCH_SIZE = int(os.getenv("GEOCODE_BATCH_SIZE", "100"))
+GEOCODE_RATE_LIMIT = float(os.getenv("GEOCODE_RATE_LIMIT", "0")) or None  # requests per second, 0 = unlimited
+CLUSTERING_JOBS = int(os.getenv("CLUSTERING_JOBS", "1"))
+WARM_START = os.getenv("WARM_START", "True").lower() in ("true", "1", "t")
+CLUSTERING_ENGINE = os.getenv("CLUSTERING_ENGINE", "kmeans").lower()
+CLUSTERING_STRATEGY = os.getenv("CLUSTERING_STRATEGY", "department").lower()
+# Assign "UL (Unit Lead)" leaders to the units after clustering, see src/Clustering/LeaderAssignment.py
+ASSIGN_LEADERS = os.getenv("ASSIGN_LEADERS", "False").lower() in ("true", "1", "t")
+LEADERS_PER_UNIT_MIN = int(os.getenv("LEADERS_PER_UNIT_MIN", "1"))
+LEADERS_PER_UNIT_MAX = int(os.getenv("LEADERS_PER_UNIT_MAX", "2"))
+# One required leader per this many participants of a unit (within the limits above), 0 to require the minimum only
+PARTICIPANTS_PER_LEADER = int(os.getenv("PARTICIPANTS_PER_LEADER", "0"))
+LEADER_DEPARTMENT_PENALTY = float(os.getenv("LEADER_DEPARTMENT_PENALTY", "20000"))  # metres
+MAP_MODE = os.getenv("MAP_MODE", "auto").lower()
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "csv").lower()
+EXPORT_PER_CLUSTER = os.getenv("EXPORT_PER_CLUSTER", "False").lower() in ("true", "1", "t")
+SIZE_MAX = int(os.getenv("SIZE_MAX", "36"))
+TRACE_MEMORY = os.getenv("TRACE_MEMORY", "False").lower() in ("true", "1", "t")
+
+EXPORT_SNAPSHOT_PATH = './export/participants_with_geo'
+# Pickle written by earlier versions, converted to a snapshot on first run
+LEGACY_PKL_PATH = './export/participants_with_geo.pkl'
+# Final k-means centroids per department, used to warm start the next run
+# Files in every cluster result directory: final centroids per department, and the centroids the
+# clustering started from (WARM_START)
+CENTROIDS_FILE = 'centroids.json'
+WARM_START_FILE = 'warm_start.json'
+# Timings, memory and counters per stage of the last run
+RUN_REPORT_PATH = './export/run_report.json'
+# Stage manifest and cluster results, one directory per set of clustering inputs
+ARTIFACTS_PATH = './export/artifacts'
+# Without extension, it depends on the export format
+CLUSTERS_EXPORT_PATH = './export/clusters_export'
+# One file per cluster with --per-cluster
+CLUSTERS_EXPORT_DIR = './export/clusters'
+MAP_PATH = './export/participant_map.html'
+# Comparison table of the last parameter sweep
+SWEEP_RESULTS_PATH = './export/sweep_results.csv'
+RANDOM_STATE = 42
+
+# Subcommands, each one runs the stages before it first unless they are up to date
+COMMANDS = ('geocode', 'cluster', 'export', 'map', 'all', 'sweep')
+
+
+def setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        datefmt='%Y-%m-%d %H:%M:%S',
+        filename='UnitAssigner.log',
+        filemode='w',
+        encoding='utf-8',
+        format='%(asctime)s %(levelname)-8s %(message)s'
+    )
+    console = logging.StreamHandler()
+    console.setLevel(logging.INFO)
+    console.setFormatter(logging.Formatter('%(asctime)s %(levelname)-8s %(message)s'))
+
+    logger.addHandler(console)
+    logger.setLevel(logging.INFO)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Assign participants to units. Every command runs the stages it depends on first, "
+                    "stages whose inputs did not change since the last run are skipped."
+    )
+    parser.add_argument(
+        'command', nargs='?', choices=COMMANDS, default='all',
+        help="geocode: export CSV -> participant snapshot, cluster: snapshot -> units, "
+             "export: units -> CSV, map: units -> HTML map, all (default): everything, "
+             "sweep: compare clustering parameters on the snapshot"
+    )
+    parser.add_argument('--force', action='store_true', help="Run the selected stage even if it is up to date")
+    parser.add_argument('--size-max', type=int, default=SIZE_MAX, help=f"Maximum unit size (default {SIZE_MAX})")
+    parser.add_argument('--engine', default=CLUSTERING_ENGINE, help="Department split engine: kmeans, bisection or auto")
+    parser.add_argument('--strategy', default=CLUSTERING_STRATEGY,
+                        help="department: all departments at once, hierarchical: per Kantonalverband first")
+    parser.add_argument('--assign-leaders', action=argparse.BooleanOptionalAction, default=ASSIGN_LEADERS,
+                        help="Also assign unit leaders to the units, they are exported with their unit and a "
+                             "Funktion column (default from ASSIGN_LEADERS)")
+    parser.add_argument('--map-mode', default=MAP_MODE, help="Map mode: markers, fast, hulls or auto")
+    parser.add_argument('--export-format', default=EXPORT_FORMAT, choices=tuple(FILE_EXTENSIONS),
+                        help="Format of the cluster export (parquet needs pyarrow)")
+    parser.add_argument('--per-cluster', action='store_true', default=EXPORT_PER_CLUSTER,
+                        help=f"Export one file per cluster to {CLUSTERS_EXPORT_DIR}")
+    sweep = parser.add_argument_group('sweep', "Values combined into the parameter grid of the sweep command")
+    sweep.add_argument('--sweep-size-max', type=int, nargs='+', metavar='N', help="Unit sizes (default: --size-max)")
+    sweep.add_argument('--sweep-slack', type=int, nargs='+', default=[0, 5, 10], metavar='N',
+                       help="How much smaller than an even split a department's sub-clusters may be")
+    sweep.add_argument('--sweep-merge', type=float, nargs='+', default=[0.25, 0.5, 0.75], metavar='F',
+                       help="Merge clusters smaller than F * size_max")
+    sweep.add_argument('--sweep-engines', nargs='+', metavar='E', help="Split engines (default: --engine)")
+    sweep.add_argument('--sweep-strategies', nargs='+', metavar='S', help="Clustering strategies (default: --strategy)")
+    return parser.parse_args(argv)
+
 
-EXPORT_PKL_PATH = './export/participants_with_geo.pkl'
-lawmangerInteractor = LawmangerInteractor(base_url=LAWMANAGER_BASE_URL)
-
-# Read csv
-if IS_DEV:
-    logger.info("Loading development dataset...")
-    df = pd.read_csv('./data/event_participation_export-dev.csv', sep=';', na_values=[''])
-else:
-    logger.info("Loading production dataset...")
-    df = pd.read_csv('./data/event_participation_export.csv', sep=';', na_values=[''])
-
-# Display basic information about the dataset
-logger.info("Dataset Information:")
-logger.info(f"Total rows: {len(df)}")
-logger.info(f"Total columns: {len(df.columns)}")
-logger.info("\nColumn names:")
-logger.info(df.columns.tolist())
-
-participants = []
-participants_with_no_geo = []
-
-if not RELOAD_DATA and os.path.exists(EXPORT_PKL_PATH):
-    logging.info("Attempting to load participants from existing pickle file...")
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging()
+
+    report = RunReport(trace_memory=TRACE_MEMORY)
     try:
-        with open(EXPORT_PKL_PATH, 'rb') as f:
-            participants = pickle.load(f)
-            logger.info(f"Loaded {len(participants)} participants from pickle file.")
-    except FileNotFoundError:
-        logger.info("Pickle file not found. Proceeding to create participants from CSV.")
-else:
-    logger.info("RELOAD_DATA is enabled. Proceeding to create participants from CSV.")
-    for index, row in df.iterrows():
-        participant = Participant(
-            vorname=row['Vorname'],
-            nachname=row['Nachname'],
-            pfadiname=row['Pfadiname'],
-            strasse=row['Strasse'],
-            hausnummer=row['Hausnummer'],
-            postfach=row['Postfach'],
-            plz=row['PLZ'],
-            ort=row['Ort'],
-            land=row['Land'],
-            hauptebene=row['Hauptebene'],
-            funktion_im_jamboree=row['3) In welcher Funktion meld...'],
-            abteilung=row['5) Aus welcher Pfadiabteilu...'],
-            kantonalverband=row['9) Mein Kantonalverband / M...'],
+        run_pipeline(args, ArtifactStore(ARTIFACTS_PATH), report)
+    finally:
+        # Also written when a stage fails, the report then shows how far the run got
+        report.log_summary()
+        report.write_json(RUN_REPORT_PATH)
+
+
+def run_pipeline(args: argparse.Namespace, store: ArtifactStore, report: RunReport):
+    participants = geocode_stage(store, report, force=RELOAD_DATA or (args.force and args.command == 'geocode'))
+    if args.command == 'geocode':
+        return
+
+    # Clustering and the sweep only read coordinates, function, department and Kantonalverband
+    with report.stage('table_load') as stage:
+        table = load_table(EXPORT_SNAPSHOT_PATH)
+        stage.items = len(table)
+
+    if args.command == 'sweep':
+        sweep_stage(report, table, args)
+        return
+
+    cluster_key = cluster_stage(store, report, table, args, force=args.force and args.command == 'cluster')
+    if args.command == 'cluster':
+        return
+
+    # Export and map need names and addresses, the stored clusters are put on the full participants
+    if participants is None:
+        with report.stage('snapshot_load') as stage:
+            logger.info("Loading participants from existing snapshot...")
+            participants = load_participants(EXPORT_SNAPSHOT_PATH)
+            logger.info(f"Loaded {len(participants)} participants from snapshot.")
+            stage.items = len(participants)
+    clusters, _ = load_cluster_labels(clusters_path(store, cluster_key), participants)
+
+    if args.command in ('export', 'all'):
+        export_stage(store, report, clusters, cluster_key, args, force=args.force and args.command == 'export')
+    if args.command in ('map', 'all'):
+        map_stage(store, report, participants, clusters, cluster_key, args, force=args.force and args.command == 'map')
+
+
+def geocode_stage(store: ArtifactStore, report: RunReport, force: bool) -> list | None:
+    """Create the participant snapshot from the export CSV. Skipped if the CSV is unchanged since
+    the snapshot was written. Returns the participants if they were created, else None."""
+    csv_path = './data/event_participation_export-dev.csv' if IS_DEV else './data/event_participation_export.csv'
+
+    snapshot_ready = False
+    if os.path.exists(EXPORT_SNAPSHOT_PATH):
+        try:
+            read_snapshot_meta(EXPORT_SNAPSHOT_PATH)
+            snapshot_ready = True
+        except SnapshotSchemaError as e:
+            logger.warning(f"{e}. Participants will be created from CSV.")
+    elif os.path.exists(LEGACY_PKL_PATH):
+        logger.info(f"Converting legacy pickle file {LEGACY_PKL_PATH} to snapshot at {EXPORT_SNAPSHOT_PATH}...")
+        convert_legacy_pickle(LEGACY_PKL_PATH, EXPORT_SNAPSHOT_PATH)
+        snapshot_ready = True
+
+    geocode_mode = resolve_geocode_mode()
+    # A mode change is a new input, locality centroids in the snapshot are then geocoded again
+    input_key = store.key(store.digest(csv_path), geocode_mode)
+    if snapshot_ready and not force and not INCREMENTAL_RELOAD:
+        if store.is_current('geocode', input_key):
+            logger.info(f"Export {csv_path} unchanged since the snapshot was created. Skipping geocoding.")
+            return None
+        if 'geocode' not in store.manifest['stages']:
+            # Snapshot written before stages were tracked (or converted from the legacy pickle), trust it like before
+            logger.info("Snapshot has no recorded export, assuming it matches the current export.")
+            store.record('geocode', input_key, [EXPORT_SNAPSHOT_PATH])
+            return None
+
+    # Loaded before reading and geocoding anything, so that a missing gazetteer fails right away
+    # instead of discarding the geocoding work
+    gazetteer = load_gazetteer() if geocode_mode in ('offline', 'fallback') else None
+
+    # Read csv
+    with report.stage('csv_read') as stage:
+        logger.info(f"Loading {'development' if IS_DEV else 'production'} dataset...")
+        df = read_export(csv_path)
+        stage.items = len(df)
+
+    # Display basic information about the dataset
+    logger.info("Dataset Information:")
+    logger.info(f"Total rows: {len(df)}")
+    logger.info(f"Total columns: {len(df.columns)}")
+    logger.info("\nColumn names:")
+    logger.info(df.columns.tolist())
+
+    participants = []
+    participants_with_no_geo = []
+
+    with report.stage('participant_creation') as stage:
+        previous_participants = []
+        if snapshot_ready and not force:
+            logger.info("Export changed since the last snapshot. Only new or changed addresses will be geocoded.")
+            previous_participants = load_participants(EXPORT_SNAPSHOT_PATH)
+        else:
+            logger.info("RELOAD_DATA is enabled or no snapshot exists. Proceeding to create participants from CSV.")
+
+        participant_frame = normalize_frame(df)
+        participant_frame = filter_by_function(
+            participant_frame, [Participant.PARTICIPANT_FUNCTION, Participant.LEADER_FUNCTION]
         )
+        participant_frame['full_address'] = build_full_addresses(participant_frame)
+        logger.info(f"{len(participant_frame)} participants and unit leads found in export")
 
-        full_address = participant.get_full_address()
+        if previous_participants:
+            snapshot_geo, diff_summary = reuse_snapshot_geodata(participant_frame, previous_participants)
+            logger.info(
+                f"Compared with previous snapshot: {diff_summary['added']} added, {diff_summary['changed']} changed, "
+                f"{diff_summary['unchanged']} unchanged, {diff_summary['removed']} removed, "
+                f"{diff_summary['to_geocode']} without coordinates to reuse (new, changed or located by PLZ/Ort)"
+            )
+        else:
+            snapshot_geo = [None] * len(participant_frame)
 
-        if not full_address:
+        has_address = (participant_frame['full_address'] != "").to_numpy()
+        for participant in participants_from_frame(participant_frame[~has_address]):
             logger.warning(f"Participant {participant.get_full_name()} does not have a valid address. Skipping geocoding.")
             participants_with_no_geo.append(participant)
-            continue
 
-        geo_data=lawmangerInteractor.search_address(full_address, k=1)
-        participant.geo_data = geo_data
+        participants_to_geocode = []
+        addresses = []
+        for participant, geo_data, full_address in zip(
+            participants_from_frame(participant_frame[has_address]),
+            (geo for geo, valid in zip(snapshot_geo, has_address) if valid),
+            participant_frame.loc[has_address, 'full_address'].tolist()
+        ):
+            if geo_data is not None:
+                # Address unchanged since the previous snapshot
+                participant.geo_data = geo_data
+                participants.append(participant)
+            else:
+                participants_to_geocode.append(participant)
+                addresses.append(full_address)
+        stage.items = len(participant_frame)
 
-        if not participant.has_valid_geo():
-            logger.warning(f"Participant {participant.get_full_name()} does not have valid geo coordinates. Address: {participant.get_full_address()}")
-            participants_with_no_geo.append(participant)
+    with report.stage('geocoding') as stage:
+        if geocode_mode == 'offline':
+            logger.info(f"Geocoding {len(participants_to_geocode)} addresses offline by PLZ/Ort...")
         else:
-            participants.append(participant)
-            logger.info(f"Created participant: {participant}")
-
-    # dump to exported file pkl
-    logger.info(f"\nSaving participants to pickle file at {EXPORT_PKL_PATH}...")
-    with open(EXPORT_PKL_PATH, 'wb') as f:
-        pickle.dump(participants, f)
-
-logger.info(f"\nTotal participants created: {len(participants)}")
-
-# Filter based on participant function
-participants = [p for p in participants if p.is_participant()]
-
-# Cluster participants by department first, then by geography
-logger.info("\nClustering participants by department and geographic location...")
-SIZE_MAX = 36
-logger.info(f"Max cluster size: {SIZE_MAX}")
-clusterer = DepartmentGeoClustering(size_max=SIZE_MAX)
-clusters = clusterer.cluster_participants(participants)
-
-# Display cluster statistics
-stats = clusterer.get_cluster_statistics(clusters)
-logger.info("\nCluster Statistics:")
-for cluster_id, cluster_stats in stats.items():
-    dept_name = cluster_stats['department']
-    sub_cluster = cluster_stats['sub_cluster']
-    cluster_label = f"Cluster {cluster_id} - {dept_name}"
-    if sub_cluster:
-        cluster_label += f" (Sub-cluster {sub_cluster})"
-
-    logger.info(f"{cluster_label}:")
-    logger.info(f"  Size: {cluster_stats['size']}")
-    logger.info(f"  Geographic Center: ({cluster_stats['mean_x']:.2f}, {cluster_stats['mean_y']:.2f})")
-    logger.info(f"  Geographic Spread: (σx={cluster_stats['std_x']:.2f}, σy={cluster_stats['std_y']:.2f})")
-
-# Export clusters to CSV
-logger.info("\nExporting clusters to CSV...")
-csv_output_path = './export/clusters_export.csv'
-csv_separator = ';'
-with open(csv_output_path, 'w', encoding='utf-8') as f:
-    # Write header
-    header = csv_separator.join(["Cluster", "Vorname", "Nachname", "Pfadiname", "Strasse", "Hausnummer", "PLZ", "Ort", "Abteilung", "Kantonalverband"]) + "\n"
-    f.write(header)
-
-    # Write each participant with their cluster assignment
-    for cluster_id, cluster_participants in clusters.items():
-        for participant in cluster_participants:
-            f.write(f"{cluster_id};{participant.to_csv(separator=csv_separator)}\n")
-
-logger.info(f"Clusters exported to {csv_output_path}")
-
-# Visualize participants on map
-logger.info("\nGenerating visualizations...")
-visualizer = ParticipantVisualizer()
-
-# Create interactive map
-visualizer.create_interactive_map(participants, clusters, output_file='./export/participant_map.html')
+            from src.interactWithLawmanger import LawmangerInteractor
+
+            geocodeCache = GeocodeCache(
+                GEOCODE_CACHE_PATH,
+                ttl_seconds=GEOCODE_CACHE_TTL_DAYS * 24 * 3600,
+                negative_ttl_seconds=GEOCODE_CACHE_NEGATIVE_TTL_DAYS * 24 * 3600
+            )
+            purged = geocodeCache.purge_expired()
+            if purged:
+                logger.info(f"Removed {purged} expired entries from the geocode cache")
+            lawmangerInteractor = LawmangerInteractor(
+                base_url=LAWMANAGER_BASE_URL,
+                cache=geocodeCache,
+                max_workers=GEOCODE_CONCURRENCY,
+                rate_limit=GEOCODE_RATE_LIMIT,
+                batch_url=LAWMANAGER_BATCH_URL,
+                batch_size=GEOCODE_BATCH_SIZE
+            )
+
+            logger.info(
+                f"Geocoding {len(participants_to_geocode)} addresses with {GEOCODE_CONCURRENCY} concurrent workers..."
+            )
+            geo_results = lawmangerInteractor.search_addresses(addresses, k=1)
+            for participant, geo_data in zip(participants_to_geocode, geo_results):
+                participant.geo_data = geo_data
+
+            cache_stats = geocodeCache.stats()
+            logger.info(
+                f"Geocode cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                f"(hit rate {cache_stats['hit_rate']:.1%})"
+            )
+
+        if gazetteer is not None:
+            # Locality centroid for every address the API did not find (all of them offline)
+            located = gazetteer.locate(participants_to_geocode)
+            logger.info(f"{located} participants located by PLZ/Ort from the gazetteer")
+
+        for participant in participants_to_geocode:
+            if not participant.has_valid_geo():
+                logger.warning(f"Participant {participant.get_full_name()} does not have valid geo coordinates. Address: {participant.get_full_address()}")
+                participants_with_no_geo.append(participant)
+            else:
+                participants.append(participant)
+                logger.info(f"Created participant: {participant}")
+        stage.items = len(addresses)
+
+    with report.stage('snapshot_save') as stage:
+        logger.info(f"\nSaving participants to snapshot at {EXPORT_SNAPSHOT_PATH}...")
+        save_snapshot(EXPORT_SNAPSHOT_PATH, participants)
+        stage.items = len(participants)
+    store.record('geocode', input_key, [EXPORT_SNAPSHOT_PATH])
+
+    logger.info(f"\nTotal participants created: {len(participants)}")
+    return participants
+
+
+def resolve_geocode_mode() -> str:
+    """GEOCODE_MODE, checked against the gazetteer file. Without it, fallback continues with the API
+    only. Offline geocoding fails once there is something to geocode (see load_gazetteer)."""
+    if GEOCODE_MODE not in ('api', 'fallback', 'offline'):
+        raise ValueError(f"Unknown GEOCODE_MODE '{GEOCODE_MODE}', expected api, fallback or offline")
+    if GEOCODE_MODE != 'fallback' or os.path.exists(GAZETTEER_PATH):
+        return GEOCODE_MODE
+    logger.warning(
+        f"Gazetteer {GAZETTEER_PATH} not found, GEOCODE_MODE=fallback geocodes with the API only. "
+        f"Build it with `python -m src.Gazetteer swisstopo <AMTOVZ_CSV_LV95.csv>`"
+    )
+    return 'api'
+
+
+def cluster_stage(store: ArtifactStore, report: RunReport, table: ParticipantTable, args: argparse.Namespace,
+                  force: bool) -> str:
+    """Cluster the participants of the snapshot table (load_table). Results are stored per input key
+    (snapshot content, clustering settings and warm start centroids), so switching back to earlier
+    settings reuses their result. Returns the key."""
+    snapshot_digest = store.digest(EXPORT_SNAPSHOT_PATH)
+    settings = (args.size_max, args.engine, args.strategy, RANDOM_STATE)
+    # Warm start centroids are kept per settings, a run with other settings does not change them
+    warm_start_stage = f"warm_start:{store.key(*settings)[:16]}"
+    seed_path = warm_start_seed(store, warm_start_stage, snapshot_digest) if WARM_START else None
+    cluster_key = store.key(
+        snapshot_digest, *settings, WARM_START, store.digest(seed_path) if seed_path else None,
+        (LEADERS_PER_UNIT_MIN, LEADERS_PER_UNIT_MAX, LEADER_DEPARTMENT_PENALTY, PARTICIPANTS_PER_LEADER)
+        if args.assign_leaders else None
+    )
+    labels_path = clusters_path(store, cluster_key)
+    stage_name = f"cluster:{cluster_key[:16]}"
+
+    from src.Clustering.HierarchicalGeoClustering import STRATEGIES
+
+    if args.strategy not in STRATEGIES:
+        raise ValueError(f"Unknown clustering strategy '{args.strategy}', expected one of {tuple(STRATEGIES)}")
+    clusterer = STRATEGIES[args.strategy](
+        size_max=args.size_max,
+        n_jobs=CLUSTERING_JOBS,
+        init_centroids=load_centroids(seed_path) if seed_path else None,
+        engine=args.engine
+    )
+
+    if not force and store.is_current(stage_name, cluster_key):
+        logger.info(f"Clustering inputs unchanged, reusing {labels_path}")
+    else:
+        # Filter based on participant function
+        with report.stage('filtering') as stage:
+            members = table.take(table.is_participant())
+            stage.items = len(members)
+
+        # Cluster participants by department first, then by geography
+        with report.stage('clustering') as stage:
+            logger.info("\nClustering participants by department and geographic location...")
+            logger.info(f"Max cluster size: {args.size_max}")
+            labels = clusterer.cluster_labels(members)
+            stage.items = len(members)
+        rows = [members.rows]
+        row_labels = [labels]
+
+        if args.assign_leaders:
+            from src.Clustering.LeaderAssignment import LeaderAssignment
+
+            with report.stage('leader_assignment') as stage:
+                leaders = table.take(table.is_leader())
+                logger.info(f"\nAssigning {len(leaders)} unit leaders to {len(clusterer.cluster_info)} units...")
+                clustered = labels >= 0
+                rows.append(leaders.rows)
+                row_labels.append(LeaderAssignment(
+                    min_leaders=LEADERS_PER_UNIT_MIN,
+                    max_leaders=LEADERS_PER_UNIT_MAX,
+                    department_penalty=LEADER_DEPARTMENT_PENALTY,
+                    participants_per_leader=PARTICIPANTS_PER_LEADER
+                ).assign_labels(members.take(clustered), labels[clustered], leaders))
+                stage.items = len(leaders)
+
+        # Leaders are stored with the cluster they were assigned to
+        save_cluster_labels(labels_path, len(table), np.concatenate(rows), np.concatenate(row_labels), clusterer.cluster_info)
+        centroids_path = os.path.join(labels_path, CENTROIDS_FILE)
+        save_centroids(centroids_path, clusterer.department_centroids)
+        if seed_path:
+            # Written from memory, the seed may have been in the directory replaced above
+            save_centroids(os.path.join(labels_path, WARM_START_FILE), clusterer.init_centroids)
+        store.record(stage_name, cluster_key, [labels_path])
+        store.record(warm_start_stage, snapshot_digest, [centroids_path])
+
+    # Statistics are always computed from the stored labels, so they do not depend on caching
+    labels, clusterer.cluster_info = load_labels(labels_path)
+    leader_counts = np.bincount(labels[table.is_leader() & (labels >= 0)], minlength=len(clusterer.cluster_info))
+
+    # Display cluster statistics, computed over the participants only
+    with report.stage('statistics') as stage:
+        participant_rows = table.is_participant()
+        stats = clusterer.get_label_statistics(table.xy[participant_rows], labels[participant_rows])
+        logger.info("\nCluster Statistics:")
+        for cluster_id, cluster_stats in stats.items():
+            dept_name = cluster_stats['department']
+            sub_cluster = cluster_stats['sub_cluster']
+            cluster_label = f"Cluster {cluster_id} - {dept_name}"
+            if sub_cluster:
+                cluster_label += f" (Sub-cluster {sub_cluster})"
+
+            logger.info(f"{cluster_label}:")
+            logger.info(f"  Size: {cluster_stats['size']}")
+            if args.assign_leaders:
+                logger.info(f"  Leaders: {leader_counts[cluster_id]}")
+            logger.info(f"  Geographic Center: ({cluster_stats['mean_x']:.2f}, {cluster_stats['mean_y']:.2f})")
+            logger.info(f"  Geographic Spread: (σx={cluster_stats['std_x']:.2f}, σy={cluster_stats['std_y']:.2f})")
+            logger.info(
+                f"  Distance to Center: mean {cluster_stats['mean_distance']:.0f} m, radius {cluster_stats['radius']:.0f} m"
+            )
+        stage.items = len(stats)
+
+    return cluster_key
+
+
+def clusters_path(store: ArtifactStore, cluster_key: str) -> str:
+    return store.path(f"clusters-{cluster_key[:16]}")
+
+
+def warm_start_seed(store: ArtifactStore, warm_start_stage: str, snapshot_digest: str) -> str | None:
+    """Centroids to warm start from: the result of the last run with the same settings. If that run
+    was on the current snapshot, the centroids it started from instead, so that it gets the same key
+    and its result is reused."""
+    centroids_path = next(iter(store.output_digests(warm_start_stage)), None)
+    if centroids_path is None:
+        return None
+    if store.recorded_input(warm_start_stage) == snapshot_digest:
+        centroids_path = os.path.join(os.path.dirname(centroids_path), WARM_START_FILE)
+    return centroids_path if os.path.exists(centroids_path) else None
+
+
+def unit_participants(clusters: dict) -> dict:
+    """The clusters without their assigned leaders."""
+    return {cluster_id: [p for p in members if p.is_participant()] for cluster_id, members in clusters.items()}
+
+
+def sweep_stage(report: RunReport, table: ParticipantTable, args: argparse.Namespace):
+    """Cluster the snapshot with every combination of the sweep parameters and compare the results.
+    Nothing else is written, the cluster artifacts of the normal pipeline are left alone."""
+    from src.Clustering.ParameterSweep import parameter_grid, run_sweep, format_table, write_results_csv
+
+    grid = parameter_grid(
+        args.sweep_size_max or [args.size_max], args.sweep_slack, args.sweep_merge, args.sweep_engines or [args.engine],
+        args.sweep_strategies or [args.strategy]
+    )
+    with report.stage('sweep') as stage:
+        members = table.take(table.is_participant())
+        results = run_sweep(members, grid, n_jobs=CLUSTERING_JOBS, random_state=RANDOM_STATE)
+        write_results_csv(results, SWEEP_RESULTS_PATH)
+        stage.items = len(grid)
+
+    logger.info(f"\nParameter sweep, sorted by mean spread (m):\n{format_table(results)}")
+    logger.info(f"Sweep results written to {SWEEP_RESULTS_PATH}")
+
+
+def export_stage(store: ArtifactStore, report: RunReport, clusters: dict, cluster_key: str,
+                 args: argparse.Namespace, force: bool):
+    if args.per_cluster:
+        export_path = CLUSTERS_EXPORT_DIR
+    else:
+        export_path = CLUSTERS_EXPORT_PATH + FILE_EXTENSIONS[args.export_format]
+    input_key = store.key(cluster_key, args.export_format, args.per_cluster, args.assign_leaders)
+    if not force and store.is_current(f"export:{export_path}", input_key):
+        logger.info(f"{export_path} is up to date")
+        return
+
+    # Export clusters
+    logger.info(f"\nExporting clusters as {args.export_format}...")
+    with report.stage('export') as stage:
+        export_clusters(clusters, export_path, args.export_format, per_cluster=args.per_cluster, separator=';',
+                        with_function=args.assign_leaders)
+        store.record(f"export:{export_path}", input_key, [export_path])
+        stage.items = sum(len(members) for members in clusters.values())
+
+
+def map_stage(store: ArtifactStore, report: RunReport, participants: list, clusters: dict, cluster_key: str,
+              args: argparse.Namespace, force: bool):
+    input_key = store.key(cluster_key, args.map_mode)
+    if not force and store.is_current('map', input_key):
+        logger.info(f"{MAP_PATH} is up to date")
+        return
+
+    # Visualize participants on map
+    logger.info("\nGenerating visualizations...")
+    with report.stage('map') as stage:
+        from src.Visualizer import ParticipantVisualizer
+
+        visualizer = ParticipantVisualizer()
+
+        # Create interactive map
+        members = [p for p in participants if p.is_participant()]
+        visualizer.create_interactive_map(members, unit_participants(clusters), output_file=MAP_PATH, mode=args.map_mode)
+        store.record('map', input_key, [MAP_PATH])
+        stage.items = len(members)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+
+
+class ArtifactStore:
+    """Tracks which inputs produced the outputs of each pipeline stage.
+
+    For every stage the manifest stores an input key (a hash of the input artifacts and settings)
+    and the content digest of every output. A stage is up to date when it was last run with the
+    same input key and all of its outputs still exist unchanged. File digests are cached by size
+    and modification time, so unchanged inputs such as a large export CSV are not read again.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_FILE)
+        os.makedirs(root, exist_ok=True)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+        self.manifest.setdefault('stages', {})
+        self.manifest.setdefault('files', {})
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def digest(self, path: str) -> str:
+        """SHA-256 of a file, or of all files below a directory (names and contents)."""
+        if os.path.isdir(path):
+            digest = hashlib.sha256()
+            for directory, subdirectories, files in sorted(os.walk(path)):
+                subdirectories.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(directory, name)
+                    digest.update(os.path.relpath(file_path, path).encode())
+                    digest.update(self.digest(file_path).encode())
+            return digest.hexdigest()
+
+        stat = os.stat(path)
+        cached = self.manifest['files'].get(os.path.abspath(path))
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['digest']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self.manifest['files'][os.path.abspath(path)] = {
+            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest.hexdigest()
+        }
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(*parts) -> str:
+        """Input key of a stage from digests and settings (anything JSON serializable)."""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def is_current(self, stage: str, input_key: str) -> bool:
+        entry = self.manifest['stages'].get(stage)
+        if entry is None or entry['input'] != input_key:
+            return False
+        for path, digest in entry['outputs'].items():
+            if not os.path.exists(path) or self.digest(path) != digest:
+                logger.info(f"Output {path} of stage '{stage}' is missing or was modified")
+                return False
+        return True
+
+    def record(self, stage: str, input_key: str, outputs: Iterable[str]):
+        self.manifest['stages'][stage] = {
+            'input': input_key,
+            'outputs': {path: self.digest(path) for path in outputs}
+        }
+        self.save()
+
+    def recorded_input(self, stage: str) -> str | None:
+        """Input key the stage was last recorded with."""
+        return self.manifest['stages'].get(stage, {}).get('input')
+
+    def output_digests(self, stage: str) -> Dict[str, str]:
+        return self.manifest['stages'].get(stage, {}).get('outputs', {})
+
+    def save(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import os
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GEODATA_DIR = os.path.join(BASE_DIR, 'data', 'geodata')
+KANTON_OVERVIEW_PATH = os.path.join(GEODATA_DIR, 'Switzerland_overview.csv')
+KANTON_GEOJSON_PATH = os.path.join(GEODATA_DIR, 'switzerland.geojson')
+# Generated from the two files above, rebuilt automatically when they or the settings change
+CANTON_LAYER_PATH = os.path.join(GEODATA_DIR, 'switzerland_simplified.geojson')
+
+# Douglas-Peucker tolerance in degrees (~0.001° = 75-110 m), invisible at the zoom levels of the map
+SIMPLIFY_TOLERANCE = 0.001
+COORDINATE_DECIMALS = 4
+
+
+def load_canton_layer(path: str = CANTON_LAYER_PATH) -> dict:
+    """Simplified canton polygons with Population and Density joined into the feature properties.
+
+    The layer is read from the cache file if it was built from the current source files with the
+    current settings, otherwise it is rebuilt and written. Repeated calls return the same dict.
+    """
+    return _load_canton_layer(path, _source_fingerprint())
+
+
+@lru_cache(maxsize=4)
+def _load_canton_layer(path: str, fingerprint: str) -> dict:
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            layer = json.load(f)
+        if layer.get('metadata', {}).get('fingerprint') == fingerprint:
+            return layer
+        logger.info(f"Canton layer {path} is outdated, rebuilding it")
+
+    layer = build_canton_layer()
+    layer['metadata'] = {'fingerprint': fingerprint}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(layer, f, separators=(',', ':'), ensure_ascii=False)
+    logger.info(f"Canton layer written to {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    return layer
+
+
+def build_canton_layer(tolerance: float = SIMPLIFY_TOLERANCE, decimals: int = COORDINATE_DECIMALS) -> dict:
+    overview = pd.read_csv(KANTON_OVERVIEW_PATH).set_index('CantonNumber')
+    with open(KANTON_GEOJSON_PATH, encoding='utf-8') as f:
+        source = json.load(f)
+
+    features = []
+    for feature in source['features']:
+        number = feature['properties']['KANTONSNUM']
+        canton = overview.loc[number]
+        geometry = feature['geometry']
+        polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+        simplified = [
+            [_simplify_ring(np.asarray(ring, dtype=np.float64)[:, :2], tolerance).round(decimals).tolist() for ring in polygon]
+            for polygon in polygons
+        ]
+        features.append({
+            'type': 'Feature',
+            'properties': {
+                'KANTONSNUM': int(number),
+                'Canton': canton['Canton'],
+                'Abbr': canton['Abbr'],
+                'Population': int(canton['Population']),
+                'Density': int(canton['Density'])
+            },
+            'geometry': {
+                'type': geometry['type'],
+                'coordinates': simplified if geometry['type'] == 'MultiPolygon' else simplified[0]
+            }
+        })
+
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def canton_densities(layer: dict) -> pd.Series:
+    """Density per canton number, the data series for folium.Choropleth."""
+    return pd.Series({
+        feature['properties']['KANTONSNUM']: feature['properties']['Density'] for feature in layer['features']
+    })
+
+
+def _source_fingerprint() -> str:
+    digest = hashlib.sha256(f"{SIMPLIFY_TOLERANCE}:{COORDINATE_DECIMALS}".encode())
+    for path in (KANTON_GEOJSON_PATH, KANTON_OVERVIEW_PATH):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _simplify_ring(ring: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker simplification of a closed ring. The ring is split at the point farthest
+    from its start so that both halves have distinct end points. Rings that would collapse to
+    fewer than three distinct points are returned unchanged."""
+    if len(ring) <= 4:
+        return ring
+    split = int(np.argmax(((ring - ring[0]) ** 2).sum(axis=1)))
+    keep = np.zeros(len(ring), dtype=bool)
+    keep[[0, split, len(ring) - 1]] = True
+    _douglas_peucker(ring, 0, split, tolerance, keep)
+    _douglas_peucker(ring, split, len(ring) - 1, tolerance, keep)
+    return ring[keep] if keep.sum() >= 4 else ring
+
+
+def _douglas_peucker(points: np.ndarray, first: int, last: int, tolerance: float, keep: np.ndarray):
+    # Iterative to avoid deep recursion on long borders
+    stack = [(first, last)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        inner = points[first + 1:last]
+        direction = end - start
+        length = np.hypot(*direction)
+        if length == 0:
+            distances = np.hypot(*(inner - start).T)
+        else:
+            distances = np.abs(direction[0] * (inner[:, 1] - start[1]) - direction[1] * (inner[:, 0] - start[0])) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            index = first + 1 + farthest
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+
+if __name__ == '__main__':
+    # Preprocessing step: python -m src.CantonLayer
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    _load_canton_layer.cache_clear()
+    if os.path.exists(CANTON_LAYER_PATH):
+        os.remove(CANTON_LAYER_PATH)
+    load_canton_layer()
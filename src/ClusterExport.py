@@ -0,0 +1,105 @@
+import csv
+import logging
+import os
+from itertools import islice
+from typing import Dict, Iterator, List
+
+from .Participant import Participant
+
+logger = logging.getLogger(__name__)
+
+CSV_HEADER = ["Cluster", "Vorname", "Nachname", "Pfadiname", "Strasse", "Hausnummer", "PLZ", "Ort", "Abteilung", "Kantonalverband"]
+# Added after the other columns when unit leaders are exported with their unit
+FUNCTION_COLUMN = "Funktion"
+EXPORT_FORMATS = ('csv', 'parquet')
+FILE_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet'}
+
+# Write buffer of the CSV files
+WRITE_BUFFER_SIZE = 1 << 20
+# Rows per row group of the Parquet files
+PARQUET_BATCH_ROWS = 65536
+
+
+def export_clusters(clusters: Dict[int, List[Participant]], path: str, export_format: str = 'csv',
+                    per_cluster: bool = False, separator: str = ';', with_function: bool = False):
+    """Export the clusters as one file, or with per_cluster as one file per cluster in the directory path.
+    With with_function the function of every member is added as column Funktion."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}', expected one of {EXPORT_FORMATS}")
+    if per_cluster:
+        export_clusters_per_cluster(clusters, path, export_format, separator, with_function)
+    elif export_format == 'parquet':
+        export_clusters_parquet(clusters, path, with_function)
+    else:
+        export_clusters_csv(clusters, path, separator, with_function)
+
+
+def export_clusters_csv(clusters: Dict[int, List[Participant]], path: str, separator: str = ';',
+                        with_function: bool = False):
+    """Write one line per participant with its cluster ID. Fields containing the separator, quotes
+    or line breaks are quoted, so the file can be read back with any CSV parser."""
+    _write_csv(clusters, path, separator, with_function)
+    logger.info(f"Clusters exported to {path}")
+
+
+def export_clusters_parquet(clusters: Dict[int, List[Participant]], path: str, with_function: bool = False):
+    """Write the export as a Parquet file with the same columns as the CSV, streamed in row groups.
+    Needs pyarrow."""
+    _write_parquet(clusters, path, with_function)
+    logger.info(f"Clusters exported to {path}")
+
+
+def export_clusters_per_cluster(clusters: Dict[int, List[Participant]], directory: str, export_format: str = 'csv',
+                                separator: str = ';', with_function: bool = False):
+    """Write every cluster to its own file cluster_<id> in directory. Files of clusters that no
+    longer exist are removed."""
+    os.makedirs(directory, exist_ok=True)
+    extension = FILE_EXTENSIONS[export_format]
+    for name in os.listdir(directory):
+        if name.startswith('cluster_') and name.endswith(extension):
+            os.remove(os.path.join(directory, name))
+
+    for cluster_id, cluster_participants in clusters.items():
+        path = os.path.join(directory, f"cluster_{cluster_id:04d}{extension}")
+        if export_format == 'parquet':
+            _write_parquet({cluster_id: cluster_participants}, path, with_function)
+        else:
+            _write_csv({cluster_id: cluster_participants}, path, separator, with_function)
+
+    logger.info(f"{len(clusters)} cluster files exported to {directory}")
+
+
+def _write_csv(clusters: Dict[int, List[Participant]], path: str, separator: str, with_function: bool):
+    with open(path, 'w', encoding='utf-8', newline='', buffering=WRITE_BUFFER_SIZE) as f:
+        writer = csv.writer(f, delimiter=separator, lineterminator='\n')
+        writer.writerow(_header(with_function))
+        writer.writerows(_rows(clusters, with_function))
+
+
+def _write_parquet(clusters: Dict[int, List[Participant]], path: str, with_function: bool):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(f"Parquet export needs pyarrow (pip install pyarrow): {e}") from e
+
+    schema = pa.schema([(name, pa.int32() if name == 'Cluster' else pa.string()) for name in _header(with_function)])
+    rows = _rows(clusters, with_function)
+    # Written in row groups of PARQUET_BATCH_ROWS, like the CSV only one batch is held in memory
+    with pq.ParquetWriter(path, schema) as writer:
+        while batch := list(islice(rows, PARQUET_BATCH_ROWS)):
+            columns = zip(*batch)
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+            ))
+
+
+def _header(with_function: bool) -> list:
+    return CSV_HEADER + [FUNCTION_COLUMN] if with_function else CSV_HEADER
+
+
+def _rows(clusters: Dict[int, List[Participant]], with_function: bool) -> Iterator[list]:
+    # Streamed, the rows of all participants are never held in memory at once
+    for cluster_id, cluster_participants in clusters.items():
+        for participant in cluster_participants:
+            yield [cluster_id, *participant.csv_fields(with_function)]
@@ -0,0 +1,99 @@
+import numpy as np
+from typing import Dict
+
+from src.Geodata import lv95_to_wgs84
+
+# Per-cluster metrics returned by coordinate_statistics, in order
+STATISTICS = (
+    'size', 'mean_x', 'mean_y', 'std_x', 'std_y', 'min_x', 'max_x', 'min_y', 'max_y',
+    'mean_distance', 'radius', 'rms_pairwise_distance', 'center_lat', 'center_lon'
+)
+
+
+def cluster_statistics(clusters: dict) -> Dict[int, dict]:
+    """Statistics of every cluster in a {cluster_id: [participants]} dict, see coordinate_statistics.
+
+    The coordinates of all clusters are read into one array once, so the cost does not grow with
+    the number of clusters beyond a few vectorized passes.
+    """
+    cluster_ids = list(clusters.keys())
+    sizes = np.array([len(clusters[cluster_id]) for cluster_id in cluster_ids], dtype=np.int64)
+    xy = np.array(
+        [(p.geo_data.x, p.geo_data.y) for cluster_id in cluster_ids for p in clusters[cluster_id]],
+        dtype=np.float64
+    ).reshape(-1, 2)
+    labels = np.repeat(np.arange(len(cluster_ids)), sizes)
+
+    stats = label_statistics(xy, labels, len(cluster_ids))
+    return {cluster_id: stats[i] for i, cluster_id in enumerate(cluster_ids)}
+
+
+def label_statistics(xy: np.ndarray, labels: np.ndarray, n_clusters: int) -> Dict[int, dict]:
+    """Statistics of every cluster 0..n_clusters-1 of the rows of xy labelled with their cluster,
+    see coordinate_statistics."""
+    columns = {name: values.tolist() for name, values in coordinate_statistics(xy, labels, n_clusters).items()}
+    return {cluster_id: {name: columns[name][cluster_id] for name in STATISTICS} for cluster_id in range(n_clusters)}
+
+
+def coordinate_statistics(xy: np.ndarray, labels: np.ndarray, n_clusters: int) -> Dict[str, np.ndarray]:
+    """Grouped statistics of the rows of xy by cluster label 0..n_clusters-1, one array per metric.
+
+    Sizes, means and standard deviations come from np.bincount sums, minima and maxima from
+    reductions over the rows sorted by label. mean_distance and radius are the mean and maximum
+    distance of the members to their cluster mean, rms_pairwise_distance is the root mean square
+    distance between two members, derived from the variances. center_lat/center_lon is the mean
+    converted to WGS84. Empty clusters get NaN.
+    """
+    labels = np.asarray(labels, dtype=np.intp)
+    sizes = np.bincount(labels, minlength=n_clusters)
+    # Work relative to the overall mean, sums of squares of raw LV95 values (~2.6e6 m) lose precision
+    origin = xy.mean(axis=0) if len(xy) else np.zeros(2)
+    local = xy - origin
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sums = np.column_stack([np.bincount(labels, weights=local[:, d], minlength=n_clusters) for d in (0, 1)])
+        squares = np.column_stack([np.bincount(labels, weights=local[:, d] ** 2, minlength=n_clusters) for d in (0, 1)])
+        means = sums / sizes[:, None]
+        variances = np.maximum(squares / sizes[:, None] - means ** 2, 0.0)
+
+        distances = np.hypot(*(local - means[labels]).T)
+        mean_distance = np.bincount(labels, weights=distances, minlength=n_clusters) / sizes
+        # E|a - b|^2 over distinct pairs is 2n/(n-1) times the total variance
+        rms_pairwise = np.where(
+            sizes > 1, np.sqrt(2 * sizes / np.maximum(sizes - 1, 1) * variances.sum(axis=1)), 0.0
+        )
+    rms_pairwise[sizes == 0] = np.nan
+
+    # Minima and maxima over contiguous segments of the rows sorted by label
+    order = np.argsort(labels, kind='stable')
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    filled = sizes > 0
+    minima = np.full((n_clusters, 2), np.nan)
+    maxima = np.full((n_clusters, 2), np.nan)
+    radius = np.full(n_clusters, np.nan)
+    if filled.any():
+        minima[filled] = np.minimum.reduceat(local[order], starts[filled])
+        maxima[filled] = np.maximum.reduceat(local[order], starts[filled])
+        radius[filled] = np.maximum.reduceat(distances[order], starts[filled])
+
+    means += origin
+    minima += origin
+    maxima += origin
+    stds = np.sqrt(variances)
+    center_lat, center_lon = lv95_to_wgs84(means[:, 0], means[:, 1])
+    return {
+        'size': sizes,
+        'mean_x': means[:, 0],
+        'mean_y': means[:, 1],
+        'std_x': stds[:, 0],
+        'std_y': stds[:, 1],
+        'min_x': minima[:, 0],
+        'max_x': maxima[:, 0],
+        'min_y': minima[:, 1],
+        'max_y': maxima[:, 1],
+        'mean_distance': mean_distance,
+        'radius': radius,
+        'rms_pairwise_distance': rms_pairwise,
+        'center_lat': center_lat,
+        'center_lon': center_lon
+    }
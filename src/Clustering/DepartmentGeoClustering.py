@@ -1,147 +1,200 @@
 import logging
 import numpy as np
 
+from concurrent.futures import ProcessPoolExecutor
 from math import ceil
-from k_means_constrained import KMeansConstrained
-from typing import List
+from typing import Dict, List
 
+from src.Clustering.ClusterStatistics import cluster_statistics, label_statistics
+from src.Clustering.RecursiveBisection import RecursiveBisectionConstrained
+from src.Clustering.WarmStart import DEFAULT_INIT, initial_centers
+from src.Instrumentation import counters, CLUSTERING_SOLVER_CALLS
 from src.Participant import Participant
+from src.ParticipantTable import ParticipantTable
 
 logger = logging.getLogger(__name__)
 
+# Engines for splitting a department: constrained k-means, recursive bisection, or bisection only
+# for departments with more than BISECTION_THRESHOLD participants
+ENGINES = ('kmeans', 'bisection', 'auto')
+BISECTION_THRESHOLD = 2000
+
 class DepartmentGeoClustering:
 
-    def __init__(self, size_max: int = 36, random_state: int = 42):
+    def __init__(self, size_max: int = 36, random_state: int = 42, n_jobs: int = 1,
+                 init_centroids: Dict[str, np.ndarray] | None = None, engine: str = 'kmeans',
+                 size_min_slack: int = 5, merge_threshold: int | None = None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown clustering engine '{engine}', expected one of {ENGINES}")
         self.size_max = size_max
+        # A split department's sub-clusters may be this much smaller than an even split
+        self.size_min_slack = size_min_slack
+        # Clusters smaller than this are merged into a nearby cluster, defaults to half of size_max
+        self.merge_threshold = size_max // 2 if merge_threshold is None else merge_threshold
         self.random_state = random_state
+        self.n_jobs = n_jobs  # Worker processes used to split oversized departments
         self.cluster_info = {}  # Store department info for each cluster
+        # Final sub-cluster centroids per department from a previous run, used as k-means init
+        self.init_centroids = init_centroids or {}
+        self.department_centroids = {}  # Final centroids of this run, to be persisted for the next one
+        self.engine = engine
+
+    def cluster_participants(self, participants: List[Participant] | ParticipantTable) -> dict:
+        """Cluster participants (or a table built from them) and set their cluster.
+        Returns {cluster_id: [participants]}, participants without valid coordinates are left out."""
+        table = participants if isinstance(participants, ParticipantTable) else ParticipantTable.from_participants(participants)
+        labels = self.cluster_labels(table)
+        clusters = {cluster_id: [] for cluster_id in range(int(labels.max(initial=-1)) + 1)}
+        for participant, label in zip(table.participants, labels.tolist()):
+            if label >= 0:
+                participant.cluster = label
+                clusters[label].append(participant)
+        return clusters
 
-    def cluster_participants(self, participants: List[Participant]) -> dict:
-        # Filter participants with valid geo_data
-        valid_participants = [
-            p for p in participants
-            if p.geo_data is not None and hasattr(p.geo_data, 'x') and hasattr(p.geo_data, 'y')
-        ]
-
-        if not valid_participants:
+    def cluster_labels(self, table: ParticipantTable) -> np.ndarray:
+        """Cluster ID of every row of the table, -1 for rows without valid coordinates. Works on
+        the arrays of the table only, so the table needs no Participant objects."""
+        labels = np.full(len(table), -1, dtype=np.int64)
+        # Keep rows with valid coordinates, grouped by department so that the
+        # coordinates of each department are a contiguous slice of one array
+        positions = np.flatnonzero(table.has_xy())
+        table = table.take(positions)
+        order = table.department_order()
+        positions = positions[order]
+        table = table.take(order)
+
+        if len(table) == 0:
             logger.warning("No participants with valid geo_data found")
-            return {}
+            return labels
 
-        # Group participants by department
-        dept_groups = {}
-        for participant in valid_participants:
-            dept = participant.abteilung if participant.abteilung else "UNKNOWN"
-            if dept not in dept_groups:
-                dept_groups[dept] = []
-            dept_groups[dept].append(participant)
+        dept_slices = table.department_slices()
 
-        logger.info(f"Found {len(dept_groups)} unique departments")
-        for dept, members in dept_groups.items():
-            logger.info(f"  Department '{dept}': {len(members)} participants")
+        logger.info(f"Found {len(dept_slices)} unique departments")
+        for dept, rows in dept_slices.items():
+            logger.info(f"  Department '{dept}': {rows.stop - rows.start} participants")
 
-        # Process each department
+        # Solve the geographic split of all oversized departments, possibly in parallel
+        split_jobs = {}
+        for dept, rows in dept_slices.items():
+            dept_size = rows.stop - rows.start
+            if dept_size > self.size_max:
+                n_sub_clusters = ceil(dept_size / self.size_max)
+                size_min = max(1, dept_size // n_sub_clusters - self.size_min_slack)  # Allow some flexibility
+                # Coordinates for this department (a view into the table, no copy)
+                init = initial_centers(self.init_centroids.get(dept), n_sub_clusters, label=f"department '{dept}'")
+                split_jobs[dept] = (table.xy[rows], n_sub_clusters, size_min, init)
+        split_results = self._solve_departments(split_jobs)
+
+        # Assemble clusters in department order so cluster IDs do not depend on the execution order.
+        # Clusters hold row positions of the sorted table.
         clusters = {}
         cluster_id = 0
 
-        for dept, dept_participants in dept_groups.items():
-            dept_size = len(dept_participants)
+        for dept, rows in dept_slices.items():
+            dept_size = rows.stop - rows.start
 
             if dept_size <= self.size_max:
                 # Department fits in one cluster
                 logger.info(
                     f"Department '{dept}' ({dept_size} participants) fits in single cluster"
                 )
-                for participant in dept_participants:
-                    participant.cluster = cluster_id
-                clusters[cluster_id] = dept_participants
+                clusters[cluster_id] = list(range(rows.start, rows.stop))
                 self.cluster_info[cluster_id] = {
                     'department': dept,
                     'sub_cluster': None
                 }
                 cluster_id += 1
-            else:
-                # Department needs to be split geographically
-                n_sub_clusters = ceil(dept_size / self.size_max)
-                logger.info(
-                    f"Department '{dept}' ({dept_size} participants) needs to be split "
-                    f"into {n_sub_clusters} geographic sub-clusters"
+                continue
+
+            # Department needs to be split geographically
+            n_sub_clusters = split_jobs[dept][1]
+            logger.info(
+                f"Department '{dept}' ({dept_size} participants) needs to be split "
+                f"into {n_sub_clusters} geographic sub-clusters"
+            )
+            split_result = split_results[dept]
+
+            if isinstance(split_result, Exception):
+                logger.error(
+                    f"Failed to split department '{dept}' geographically: {split_result}. "
+                    f"Falling back to single large cluster."
                 )
+                # Fallback: keep as single cluster even if oversized
+                clusters[cluster_id] = list(range(rows.start, rows.stop))
+                self.cluster_info[cluster_id] = {
+                    'department': dept,
+                    'sub_cluster': None
+                }
+                cluster_id += 1
+                continue
 
-                # Extract coordinates for this department
-                coordinates = np.array([
-                    [p.geo_data.x, p.geo_data.y] for p in dept_participants
-                ])
-
-                # Apply constrained k-means clustering
-                size_min = max(1, dept_size // n_sub_clusters - 5)  # Allow some flexibility
-                kmeans = KMeansConstrained(
-                    n_clusters=n_sub_clusters,
-                    size_min=size_min,
-                    size_max=self.size_max,
-                    random_state=self.random_state
+            sub_labels, self.department_centroids[dept] = split_result
+
+            # Create cluster groups
+            for sub_label, members in enumerate(label_groups(sub_labels, n_sub_clusters)):
+                current_cluster_id = cluster_id + sub_label
+                clusters[current_cluster_id] = (members + rows.start).tolist()
+                self.cluster_info[current_cluster_id] = {
+                    'department': dept,
+                    'sub_cluster': sub_label + 1
+                }
+                logger.info(
+                    f"  Sub-cluster {sub_label + 1}/{n_sub_clusters}: "
+                    f"{len(members)} participants"
                 )
 
-                try:
-                    sub_labels = kmeans.fit_predict(coordinates)
-
-                    # Assign cluster IDs and group participants
-                    for participant, sub_label in zip(dept_participants, sub_labels):
-                        participant.cluster = cluster_id + sub_label
-
-                    # Create cluster groups
-                    for sub_label in range(n_sub_clusters):
-                        current_cluster_id = cluster_id + sub_label
-                        sub_cluster_members = [
-                            p for p in dept_participants
-                            if p.cluster == current_cluster_id
-                        ]
-                        clusters[current_cluster_id] = sub_cluster_members
-                        self.cluster_info[current_cluster_id] = {
-                            'department': dept,
-                            'sub_cluster': sub_label + 1
-                        }
-                        logger.info(
-                            f"  Sub-cluster {sub_label + 1}/{n_sub_clusters}: "
-                            f"{len(sub_cluster_members)} participants"
-                        )
-
-                    cluster_id += n_sub_clusters
-
-                except Exception as e:
-                    logger.error(
-                        f"Failed to split department '{dept}' geographically: {e}. "
-                        f"Falling back to single large cluster."
-                    )
-                    # Fallback: keep as single cluster even if oversized
-                    for participant in dept_participants:
-                        participant.cluster = cluster_id
-                    clusters[cluster_id] = dept_participants
-                    self.cluster_info[cluster_id] = {
-                        'department': dept,
-                        'sub_cluster': None
-                    }
-                    cluster_id += 1
+            cluster_id += n_sub_clusters
 
         logger.info(
             f"Successfully created {len(clusters)} initial clusters from "
-            f"{len(valid_participants)} participants across {len(dept_groups)} departments"
+            f"{len(table)} participants across {len(dept_slices)} departments"
         )
 
         # Merge small clusters based on geographic proximity
-        clusters = self._merge_small_clusters(clusters)
-
-        return clusters
+        clusters = self._merge_small_clusters(clusters, table.xy)
 
-    def _merge_small_clusters(self, clusters: dict) -> dict:
+        for cluster_id, members in clusters.items():
+            labels[positions[members]] = cluster_id
+        return labels
+
+    def _solve_departments(self, split_jobs: Dict[str, tuple]) -> Dict[str, tuple | Exception]:
+        """Run the constrained split for every department in split_jobs and return (labels, centroids).
+        Failures are returned as the exception so that the caller can fall back per department."""
+        # Counted here, the workers run in other processes
+        counters.increment(CLUSTERING_SOLVER_CALLS, len(split_jobs))
+        if self.n_jobs > 1 and len(split_jobs) > 1:
+            logger.info(f"Splitting {len(split_jobs)} departments using {self.n_jobs} worker processes")
+            with ProcessPoolExecutor(max_workers=min(self.n_jobs, len(split_jobs))) as executor:
+                futures = {
+                    dept: executor.submit(
+                        _split_department, coordinates, n_sub_clusters, size_min, self.size_max, self.random_state,
+                        init, self.engine
+                    )
+                    for dept, (coordinates, n_sub_clusters, size_min, init) in split_jobs.items()
+                }
+                return {dept: future.result() for dept, future in futures.items()}
+
+        return {
+            dept: _split_department(
+                coordinates, n_sub_clusters, size_min, self.size_max, self.random_state, init, self.engine
+            )
+            for dept, (coordinates, n_sub_clusters, size_min, init) in split_jobs.items()
+        }
+
+    def _merge_small_clusters(self, clusters: dict, xy: np.ndarray) -> dict:
+        """Merge clusters below merge_threshold into the nearest cluster with room. clusters maps
+        cluster IDs to lists of rows of xy, the result is renumbered from 0."""
         logger.info("\nMerging small clusters based on geographic proximity...")
 
-        # Define threshold for what's considered a "small" cluster
-        # We'll try to merge clusters that are less than half the max size
-        merge_threshold = self.size_max // 2
+        # Clusters below merge_threshold (by default half the max size) are considered "small"
+        merge_threshold = self.merge_threshold
 
         # Sort clusters by size (smallest first)
         sorted_cluster_ids = sorted(clusters.keys(), key=lambda cid: len(clusters[cid]))
 
+        # Centroids are kept as coordinate sums and sizes, so a merge updates them in O(1)
+        index = _CentroidIndex(clusters, sorted_cluster_ids, self.size_max, xy)
+
         merged_count = 0
         clusters_to_remove = set()
 
@@ -156,56 +209,17 @@ class DepartmentGeoClustering:
             if cluster_size >= merge_threshold:
                 continue
 
-            # Calculate centroid of this cluster
-            coords = np.array([[p.geo_data.x, p.geo_data.y] for p in cluster])
-            centroid = np.mean(coords, axis=0)
-
             # Find the nearest cluster that can accommodate these participants
-            best_merge_candidate = None
-            best_distance = float('inf')
-
-            for other_cluster_id in sorted_cluster_ids:
-                if other_cluster_id == cluster_id or other_cluster_id in clusters_to_remove:
-                    continue
-
-                other_cluster = clusters[other_cluster_id]
-                other_size = len(other_cluster)
-
-                # Check if merge would respect size constraint
-                if cluster_size + other_size > self.size_max:
-                    continue
-
-                # Calculate distance between centroids
-                other_coords = np.array([[p.geo_data.x, p.geo_data.y] for p in other_cluster])
-                other_centroid = np.mean(other_coords, axis=0)
-                distance = np.linalg.norm(centroid - other_centroid)
-
-                if distance < best_distance:
-                    best_distance = distance
-                    best_merge_candidate = other_cluster_id
+            best_merge_candidate = index.nearest_feasible(cluster_id)
 
             # Perform merge if a suitable candidate was found
             if best_merge_candidate is not None:
                 # Merge cluster into best_merge_candidate
                 clusters[best_merge_candidate].extend(cluster)
-
-                # Update cluster assignments for participants
-                for participant in cluster:
-                    participant.cluster = best_merge_candidate
+                index.merge(cluster_id, best_merge_candidate)
 
                 # Update cluster info to reflect multiple departments if needed
-                current_info = self.cluster_info[best_merge_candidate]
-                merging_info = self.cluster_info[cluster_id]
-
-                if current_info['department'] != merging_info['department']:
-                    # Mixed departments - flatten to list of department names
-                    current_depts = current_info['department'] if isinstance(current_info['department'], list) else [current_info['department']]
-                    merging_depts = merging_info['department'] if isinstance(merging_info['department'], list) else [merging_info['department']]
-
-                    # Combine and deduplicate
-                    all_depts = list(set(current_depts + merging_depts))
-                    current_info['department'] = all_depts
-                    current_info['sub_cluster'] = None  # No longer a simple sub-cluster
+                self._combine_cluster_info(self.cluster_info[best_merge_candidate], self.cluster_info[cluster_id])
 
                 clusters_to_remove.add(cluster_id)
                 merged_count += 1
@@ -226,9 +240,6 @@ class DepartmentGeoClustering:
         for new_id, old_id in enumerate(sorted(clusters.keys())):
             new_clusters[new_id] = clusters[old_id]
             new_cluster_info[new_id] = self.cluster_info[old_id]
-            # Update participant cluster assignments
-            for participant in new_clusters[new_id]:
-                participant.cluster = new_id
 
         logger.info(
             f"Merged {merged_count} clusters. Final cluster count: {len(new_clusters)}"
@@ -237,11 +248,140 @@ class DepartmentGeoClustering:
         self.cluster_info = new_cluster_info
         return new_clusters
 
-    def get_cluster_statistics(self, clusters: dict) -> dict:
-        stats = {}
-        for cluster_id, members in clusters.items():
-            coords = np.array([[p.geo_data.x, p.geo_data.y] for p in members])
+    def assign_late_participants(self, clusters: dict, new_participants: List[Participant]) -> dict:
+        """Add participants registered after clustering without moving anyone already assigned.
+
+        Each new participant joins the nearest cluster of their department that still has room under
+        size_max. Participants that do not fit are split into new clusters of their own (constrained
+        k-means if needed); a new cluster that ends up small is merged into the nearest cluster with
+        room, like _merge_small_clusters does. `clusters` and cluster_info are updated in place.
+        """
+        table = ParticipantTable.with_valid_xy(new_participants)
+        if len(table) < len(new_participants):
+            logger.warning(f"{len(new_participants) - len(table)} late participants without valid geo_data are skipped")
+        if len(table) == 0:
+            return clusters
+
+        # Current centroid and size of every cluster, updated as participants are added
+        sizes = {cluster_id: len(members) for cluster_id, members in clusters.items()}
+        sums = {
+            cluster_id: np.array([[p.geo_data.x, p.geo_data.y] for p in members], dtype=np.float64).sum(axis=0)
+            for cluster_id, members in clusters.items()
+        }
+
+        clusters_by_dept = {}
+        for cluster_id in clusters:
+            for dept in self._cluster_departments(cluster_id):
+                clusters_by_dept.setdefault(dept, []).append(cluster_id)
+
+        overflow = {}
+        for participant, coordinates, dept_code in zip(table.participants, table.xy, table.department_codes):
+            dept = table.departments[dept_code]
+            candidates = [cid for cid in clusters_by_dept.get(dept, []) if sizes[cid] < self.size_max]
+            if not candidates:
+                overflow.setdefault(dept, []).append((participant, coordinates))
+                continue
 
+            centroids = np.array([sums[cid] / sizes[cid] for cid in candidates])
+            best = candidates[int(np.argmin(np.linalg.norm(centroids - coordinates, axis=1)))]
+            clusters[best].append(participant)
+            participant.cluster = best
+            sizes[best] += 1
+            sums[best] = sums[best] + coordinates
+            logger.info(f"Late participant {participant.get_full_name()} assigned to cluster {best}")
+
+        # Participants that did not fit into an existing cluster form new clusters
+        next_cluster_id = max(clusters.keys(), default=-1) + 1
+        for dept, members in overflow.items():
+            coordinates = np.array([c for _, c in members])
+            n_sub_clusters = ceil(len(members) / self.size_max)
+            if n_sub_clusters > 1:
+                size_min = max(1, len(members) // n_sub_clusters - self.size_min_slack)
+                counters.increment(CLUSTERING_SOLVER_CALLS)
+                split_result = _split_department(
+                    coordinates, n_sub_clusters, size_min, self.size_max, self.random_state, engine=self.engine
+                )
+                if isinstance(split_result, Exception):
+                    logger.error(f"Failed to split late participants of '{dept}': {split_result}. Using one cluster.")
+                    labels = np.zeros(len(members), dtype=int)
+                    n_sub_clusters = 1
+                else:
+                    labels, _ = split_result
+            else:
+                labels = np.zeros(len(members), dtype=int)
+
+            existing_sub_clusters = len(clusters_by_dept.get(dept, []))
+            for sub_label in range(n_sub_clusters):
+                rows = np.flatnonzero(labels == sub_label)
+                if len(rows) == 0:
+                    continue
+                sub_members = [members[row][0] for row in rows]
+                sub_sum = coordinates[rows].sum(axis=0)
+                numbered = existing_sub_clusters > 0 or n_sub_clusters > 1
+                info = {
+                    'department': dept,
+                    'sub_cluster': existing_sub_clusters + sub_label + 1 if numbered else None
+                }
+
+                # A small leftover joins the nearest cluster with room instead of staying on its own
+                target = None
+                if len(sub_members) < self.merge_threshold:
+                    room = [cid for cid in clusters if sizes[cid] + len(sub_members) <= self.size_max]
+                    if room:
+                        centroids = np.array([sums[cid] / sizes[cid] for cid in room])
+                        distances = np.linalg.norm(centroids - sub_sum / len(sub_members), axis=1)
+                        target = room[int(np.argmin(distances))]
+
+                if target is None:
+                    target = next_cluster_id
+                    next_cluster_id += 1
+                    clusters[target] = []
+                    sizes[target] = 0
+                    sums[target] = np.zeros(2)
+                    self.cluster_info[target] = info
+                    logger.info(f"Created cluster {target} for {len(sub_members)} late participants of '{dept}'")
+                else:
+                    self._combine_cluster_info(self.cluster_info[target], info)
+                    logger.info(f"Merged {len(sub_members)} late participants of '{dept}' into cluster {target}")
+
+                clusters[target].extend(sub_members)
+                for participant in sub_members:
+                    participant.cluster = target
+                sizes[target] += len(sub_members)
+                sums[target] = sums[target] + sub_sum
+                clusters_by_dept.setdefault(dept, []).append(target)
+
+        return clusters
+
+    def _cluster_departments(self, cluster_id) -> list:
+        department = self.cluster_info.get(cluster_id, {}).get('department', 'UNKNOWN')
+        return department if isinstance(department, list) else [department]
+
+    @staticmethod
+    def _combine_cluster_info(current_info: dict, merging_info: dict):
+        if current_info['department'] != merging_info['department']:
+            # Mixed departments - flatten to list of department names
+            current_depts = current_info['department'] if isinstance(current_info['department'], list) else [current_info['department']]
+            merging_depts = merging_info['department'] if isinstance(merging_info['department'], list) else [merging_info['department']]
+
+            # Combine and deduplicate
+            all_depts = list(set(current_depts + merging_depts))
+            current_info['department'] = all_depts
+            current_info['sub_cluster'] = None  # No longer a simple sub-cluster
+
+    def get_cluster_statistics(self, clusters: dict) -> dict:
+        return self._describe(cluster_statistics(clusters))
+
+    def get_label_statistics(self, xy: np.ndarray, labels: np.ndarray) -> dict:
+        """get_cluster_statistics for the rows of xy labelled with their cluster ID (see cluster_labels),
+        for every cluster of cluster_info. Rows labelled -1 are skipped."""
+        n_clusters = max(self.cluster_info, default=-1) + 1
+        assigned = labels >= 0
+        stats = label_statistics(xy[assigned], labels[assigned], n_clusters)
+        return self._describe({cluster_id: stats[cluster_id] for cluster_id in sorted(self.cluster_info)})
+
+    def _describe(self, stats: dict) -> dict:
+        for cluster_id, coordinate_stats in stats.items():
             cluster_info = self.cluster_info.get(cluster_id, {})
             dept_name = cluster_info.get('department', 'UNKNOWN')
             sub_cluster = cluster_info.get('sub_cluster')
@@ -260,17 +400,158 @@ class DepartmentGeoClustering:
                 dept_display = str(dept_name)
 
             stats[cluster_id] = {
-                'size': len(members),
                 'department': dept_display,
                 'sub_cluster': sub_cluster,
-                'mean_x': float(np.mean(coords[:, 0])),
-                'mean_y': float(np.mean(coords[:, 1])),
-                'std_x': float(np.std(coords[:, 0])),
-                'std_y': float(np.std(coords[:, 1])),
-                'min_x': float(np.min(coords[:, 0])),
-                'max_x': float(np.max(coords[:, 0])),
-                'min_y': float(np.min(coords[:, 1])),
-                'max_y': float(np.max(coords[:, 1]))
+                **coordinate_stats
             }
 
         return stats
+
+
+class _CentroidIndex:
+    """Nearest-feasible-neighbour lookups between cluster centroids for _merge_small_clusters.
+
+    Centroids are stored as coordinate sums and sizes. A KD-tree answers nearest neighbour queries
+    for clusters whose centroid has not changed since the tree was built. Clusters that received a
+    merge since then are "dirty" and checked by brute force, and the tree is rebuilt once there are
+    too many of them. Only clusters with room left (size < size_max) are ever indexed.
+    """
+
+    def __init__(self, clusters: dict, order: list, size_max: int, xy: np.ndarray):
+        self.size_max = size_max
+        self.ids = list(order)
+        self.position = {cluster_id: i for i, cluster_id in enumerate(self.ids)}
+
+        sizes = [len(clusters[cluster_id]) for cluster_id in self.ids]
+        labels = np.repeat(np.arange(len(self.ids)), sizes)
+        rows = np.fromiter((row for cluster_id in self.ids for row in clusters[cluster_id]), dtype=np.intp, count=sum(sizes))
+        coords = xy[rows]
+
+        self.sizes = np.array(sizes, dtype=np.int64)
+        self.sums = np.column_stack([
+            np.bincount(labels, weights=coords[:, 0], minlength=len(self.ids)),
+            np.bincount(labels, weights=coords[:, 1], minlength=len(self.ids))
+        ])
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        self.dirty = np.zeros(len(self.ids), dtype=bool)
+        self.n_dirty = 0
+        self.rebuild_threshold = max(32, int(np.sqrt(len(self.ids))))
+        self._build_tree()
+
+    def centroids(self, indices) -> np.ndarray:
+        return self.sums[indices] / self.sizes[indices, None]
+
+    def nearest_feasible(self, cluster_id):
+        i = self.position[cluster_id]
+        centroid = self.centroids(i)
+        capacity = self.size_max - self.sizes[i]
+
+        candidates = []
+
+        # Clean clusters: KD-tree positions are exact, widen the query until a feasible one shows up
+        k = 8
+        n_indexed = len(self.tree_members)
+        while n_indexed:
+            k = min(k, n_indexed)
+            distances, tree_indices = self.tree.query(centroid, k=k)
+            distances = np.atleast_1d(distances)
+            members = self.tree_members[np.atleast_1d(tree_indices)]
+            feasible = (
+                self.alive[members] & (members != i) & (self.sizes[members] <= capacity)
+                & ~self.dirty[members]
+            )
+            if feasible.any():
+                first = np.argmax(feasible)
+                # Keep every candidate tied with the nearest one, ties are broken by merge order below
+                tied = feasible & (distances == distances[first])
+                candidates.extend(zip(distances[tied].tolist(), members[tied].tolist()))
+                break
+            if k == n_indexed:
+                break
+            k *= 4
+
+        # Dirty clusters: centroid moved since the tree was built, check them directly
+        if self.n_dirty:
+            dirty = np.flatnonzero(self.dirty)
+            dirty = dirty[self.alive[dirty] & (dirty != i) & (self.sizes[dirty] <= capacity)]
+            if len(dirty):
+                distances = np.linalg.norm(self.centroids(dirty) - centroid, axis=1)
+                candidates.extend(zip(distances.tolist(), dirty.tolist()))
+
+        if not candidates:
+            return None
+
+        # Same preference as a linear scan in size order: nearest first, earlier cluster on ties
+        _, best = min(candidates)
+        return self.ids[best]
+
+    def merge(self, source_id, target_id):
+        source = self.position[source_id]
+        target = self.position[target_id]
+        self.sums[target] += self.sums[source]
+        self.sizes[target] += self.sizes[source]
+        self.alive[source] = False
+        self.n_dirty += int(not self.dirty[target]) - int(self.dirty[source])
+        self.dirty[source] = False
+        self.dirty[target] = True
+
+        if self.n_dirty > self.rebuild_threshold:
+            self._build_tree()
+
+    def _build_tree(self):
+        from scipy.spatial import cKDTree
+        self.tree_members = np.flatnonzero(self.alive & (self.sizes < self.size_max))
+        self.tree = cKDTree(self.centroids(self.tree_members)) if len(self.tree_members) else None
+        self.dirty[:] = False
+        self.n_dirty = 0
+
+
+def label_groups(labels: np.ndarray, n_clusters: int) -> List[np.ndarray]:
+    """Positions of the rows with label 0, 1, ..., n_clusters - 1, in row order."""
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind='stable')
+    return np.split(order, np.cumsum(np.bincount(labels, minlength=n_clusters))[:-1])
+
+
+def _split_department(coordinates: np.ndarray, n_sub_clusters: int, size_min: int, size_max: int,
+                      random_state: int, init=DEFAULT_INIT, engine: str = 'kmeans') -> tuple | Exception:
+    # Module level so that it can be sent to worker processes
+    use_bisection = engine == 'bisection' or (engine == 'auto' and len(coordinates) > BISECTION_THRESHOLD)
+    if not use_bisection:
+        result = _split_with_kmeans(coordinates, n_sub_clusters, size_min, size_max, random_state, init)
+        if not isinstance(result, Exception):
+            return result
+        # The min-cost-flow solver can run out of memory or fail on very large departments,
+        # recursive bisection still gives a split that respects size_max
+        logger.warning(f"Constrained k-means failed ({result}), retrying with recursive bisection")
+
+    bisection = RecursiveBisectionConstrained(
+        n_clusters=n_sub_clusters,
+        size_min=size_min,
+        size_max=size_max,
+        random_state=random_state
+    )
+    try:
+        labels = bisection.fit_predict(coordinates)
+        return labels, bisection.cluster_centers_
+    except Exception as e:
+        return e
+
+
+def _split_with_kmeans(coordinates: np.ndarray, n_sub_clusters: int, size_min: int, size_max: int,
+                       random_state: int, init) -> tuple | Exception:
+    # Imported on first use, k_means_constrained pulls in a large part of scikit-learn and scipy
+    from k_means_constrained import KMeansConstrained
+    kmeans = KMeansConstrained(
+        n_clusters=n_sub_clusters,
+        size_min=size_min,
+        size_max=size_max,
+        init=init,
+        n_init=1 if isinstance(init, np.ndarray) else 10,  # A warm start needs a single run only
+        random_state=random_state
+    )
+    try:
+        labels = kmeans.fit_predict(coordinates)
+        return labels, kmeans.cluster_centers_
+    except Exception as e:
+        return e
@@ -3,23 +3,26 @@ import numpy as np
 from sklearn.cluster import KMeans
 from typing import List
 
+from src.Clustering.ClusterStatistics import cluster_statistics
+from src.Clustering.WarmStart import initial_centers
+from src.Instrumentation import counters, CLUSTERING_SOLVER_CALLS
 from src.Participant import Participant
+from src.ParticipantTable import ParticipantTable
 
 logger = logging.getLogger(__name__)
 
 class GeoClustering:
-    def __init__(self, n_clusters: int = 5, random_state: int = 42):
+    def __init__(self, n_clusters: int = 5, random_state: int = 42, init_centers: np.ndarray | None = None):
         self.n_clusters = n_clusters
         self.random_state = random_state
+        self.init_centers = init_centers  # Final centers of a previous run, used as k-means init
         self.kmeans = None
         self.cluster_centers = None
 
-    def cluster_participants(self, participants: List[Participant]) -> dict:
+    def cluster_participants(self, participants: List[Participant] | ParticipantTable) -> dict:
         # Filter participants with valid geo_data
-        valid_participants = [
-            p for p in participants
-            if p.geo_data is not None and hasattr(p.geo_data, 'x') and hasattr(p.geo_data, 'y')
-        ]
+        table = ParticipantTable.with_valid_xy(participants)
+        valid_participants = table.participants
 
         if not valid_participants:
             logger.warning("No participants with valid geo_data found")
@@ -32,11 +35,18 @@ class GeoClustering:
             )
             self.n_clusters = len(valid_participants)
 
-        # Extract x, y coordinates
-        coordinates = np.array([[p.geo_data.x, p.geo_data.y] for p in valid_participants])
+        # x, y coordinates straight from the table
+        coordinates = table.xy
 
-        # Perform k-means clustering
-        self.kmeans = KMeans(n_clusters=self.n_clusters, random_state=self.random_state)
+        # Perform k-means clustering, warm started from previous centers if they still fit
+        init = initial_centers(self.init_centers, self.n_clusters)
+        self.kmeans = KMeans(
+            n_clusters=self.n_clusters,
+            init=init,
+            n_init=1 if isinstance(init, np.ndarray) else 'auto',
+            random_state=self.random_state
+        )
+        counters.increment(CLUSTERING_SOLVER_CALLS)
         cluster_labels = self.kmeans.fit_predict(coordinates)
         self.cluster_centers = self.kmeans.cluster_centers_
 
@@ -59,15 +69,7 @@ class GeoClustering:
         return clusters
 
     def get_cluster_statistics(self, clusters: dict) -> dict:
-        stats = {}
-        for cluster_id, members in clusters.items():
-            coords = np.array([[p.geo_data.x, p.geo_data.y] for p in members])
-            stats[cluster_id] = {
-                'size': len(members),
-                'center': self.cluster_centers[cluster_id].tolist(),
-                'mean_x': float(np.mean(coords[:, 0])),
-                'mean_y': float(np.mean(coords[:, 1])),
-                'std_x': float(np.std(coords[:, 0])),
-                'std_y': float(np.std(coords[:, 1]))
-            }
+        stats = cluster_statistics(clusters)
+        for cluster_id, cluster_stats in stats.items():
+            cluster_stats['center'] = self.cluster_centers[cluster_id].tolist()
         return stats
@@ -3,7 +3,11 @@ import numpy as np
 from k_means_constrained import KMeansConstrained
 from typing import List, Optional
 
+from src.Clustering.ClusterStatistics import cluster_statistics
+from src.Clustering.WarmStart import initial_centers
+from src.Instrumentation import counters, CLUSTERING_SOLVER_CALLS
 from src.Participant import Participant
+from src.ParticipantTable import ParticipantTable
 
 logger = logging.getLogger(__name__)
 
@@ -13,21 +17,21 @@ class GeoClusteringConstrained:
         n_clusters: int = 5,
         size_min: Optional[int] = None,
         size_max: Optional[int] = None,
-        random_state: int = 42
+        random_state: int = 42,
+        init_centers: Optional[np.ndarray] = None
     ):
         self.n_clusters = n_clusters
         self.size_min = size_min if size_min is not None else 1
         self.size_max = size_max
         self.random_state = random_state
+        self.init_centers = init_centers  # Final centers of a previous run, used as k-means init
         self.kmeans = None
         self.cluster_centers = None
 
-    def cluster_participants(self, participants: List[Participant]) -> dict:
+    def cluster_participants(self, participants: List[Participant] | ParticipantTable) -> dict:
         # Filter participants with valid geo_data
-        valid_participants = [
-            p for p in participants
-            if p.geo_data is not None and hasattr(p.geo_data, 'x') and hasattr(p.geo_data, 'y')
-        ]
+        table = ParticipantTable.with_valid_xy(participants)
+        valid_participants = table.participants
 
         if not valid_participants:
             logger.warning("No participants with valid geo_data found")
@@ -54,16 +58,20 @@ class GeoClusteringConstrained:
             )
             self.size_min = max(1, len(valid_participants) // self.n_clusters)
 
-        # Extract x, y coordinates
-        coordinates = np.array([[p.geo_data.x, p.geo_data.y] for p in valid_participants])
+        # x, y coordinates straight from the table
+        coordinates = table.xy
 
-        # Perform constrained k-means clustering
+        # Perform constrained k-means clustering, warm started from previous centers if they still fit
+        init = initial_centers(self.init_centers, self.n_clusters)
         self.kmeans = KMeansConstrained(
             n_clusters=self.n_clusters,
             size_min=self.size_min,
             size_max=self.size_max,
+            init=init,
+            n_init=1 if isinstance(init, np.ndarray) else 10,
             random_state=self.random_state
         )
+        counters.increment(CLUSTERING_SOLVER_CALLS)
         cluster_labels = self.kmeans.fit_predict(coordinates)
         self.cluster_centers = self.kmeans.cluster_centers_
 
@@ -89,19 +97,11 @@ class GeoClusteringConstrained:
         return clusters
 
     def get_cluster_statistics(self, clusters: dict) -> dict:
-        stats = {}
-        for cluster_id, members in clusters.items():
-            coords = np.array([[p.geo_data.x, p.geo_data.y] for p in members])
-            stats[cluster_id] = {
-                'size': len(members),
-                'center': self.cluster_centers[cluster_id].tolist(),
-                'mean_x': float(np.mean(coords[:, 0])),
-                'mean_y': float(np.mean(coords[:, 1])),
-                'std_x': float(np.std(coords[:, 0])),
-                'std_y': float(np.std(coords[:, 1])),
-                'constraints': {
-                    'size_min': self.size_min,
-                    'size_max': self.size_max
-                }
+        stats = cluster_statistics(clusters)
+        for cluster_id, cluster_stats in stats.items():
+            cluster_stats['center'] = self.cluster_centers[cluster_id].tolist()
+            cluster_stats['constraints'] = {
+                'size_min': self.size_min,
+                'size_max': self.size_max
             }
         return stats
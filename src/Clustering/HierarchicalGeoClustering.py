@@ -0,0 +1,119 @@
+import logging
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+from src.Clustering.DepartmentGeoClustering import DepartmentGeoClustering, label_groups
+from src.Instrumentation import counters, CLUSTERING_SOLVER_CALLS
+from src.ParticipantTable import ParticipantTable
+
+logger = logging.getLogger(__name__)
+
+
+class HierarchicalGeoClustering(DepartmentGeoClustering):
+    """Kantonalverband -> Abteilung -> geographic clustering.
+
+    Participants are partitioned by Kantonalverband first. Every partition is clustered like
+    DepartmentGeoClustering does for the whole event (departments split geographically, small
+    clusters merged), but merges only look at clusters of the same Kantonalverband. Partitions are
+    independent and solved in n_jobs worker processes. Clusters that are still small afterwards
+    (no room left in their Kantonalverband) are merged in one pass across all partitions.
+    """
+
+    UNKNOWN_PARTITION = "UNKNOWN"
+
+    def cluster_labels(self, table: ParticipantTable) -> np.ndarray:
+        labels = np.full(len(table), -1, dtype=np.int64)
+        positions = np.flatnonzero(table.has_xy())
+        table = table.take(positions)
+        if len(table) == 0:
+            logger.warning("No participants with valid geo_data found")
+            return labels
+
+        # Rows per Kantonalverband, in order of first appearance so that cluster IDs are stable
+        _, first_index, inverse = np.unique(table.kantonalverband_codes, return_index=True, return_inverse=True)
+        rank = np.argsort(np.argsort(first_index))[inverse]
+        order = np.argsort(rank, kind='stable')
+        partitions = {}
+        for rows in np.split(order, np.flatnonzero(np.diff(rank[order])) + 1):
+            name = table.kantonalverbaende[table.kantonalverband_codes[rows[0]]] or self.UNKNOWN_PARTITION
+            partitions[name] = rows
+
+        logger.info(f"Clustering {len(table)} participants in {len(partitions)} Kantonalverband partitions")
+        results = self._solve_partitions({name: table.take(rows) for name, rows in partitions.items()})
+
+        # Assemble in partition order, cluster IDs do not depend on the execution order
+        clusters = {}
+        self.cluster_info = {}
+        for name, (groups, infos, centroids) in results.items():
+            rows = partitions[name]
+            for members, info in zip(groups, infos):
+                cluster_id = len(clusters)
+                clusters[cluster_id] = rows[members].tolist()
+                self.cluster_info[cluster_id] = info
+            self.department_centroids.update(centroids)
+            logger.info(f"  Kantonalverband '{name}': {len(rows)} participants in {len(groups)} clusters")
+
+        leftovers = sum(len(members) < self.merge_threshold for members in clusters.values())
+        logger.info(f"{len(clusters)} clusters from all partitions, {leftovers} small leftovers for the cross-partition pass")
+
+        # Cross-partition pass, only clusters below merge_threshold are moved
+        for cluster_id, members in self._merge_small_clusters(clusters, table.xy).items():
+            labels[positions[members]] = cluster_id
+        return labels
+
+    def _solve_partitions(self, partitions: Dict[str, ParticipantTable]) -> Dict[str, tuple]:
+        """Cluster every partition and return (member rows per cluster, cluster infos, centroids)."""
+        params = {
+            'size_max': self.size_max,
+            'random_state': self.random_state,
+            'engine': self.engine,
+            'size_min_slack': self.size_min_slack,
+            'merge_threshold': self.merge_threshold
+        }
+        jobs = {
+            name: (partition, partition.departments[np.unique(partition.department_codes)])
+            for name, partition in partitions.items()
+        }
+
+        if self.n_jobs > 1 and len(partitions) > 1:
+            logger.info(f"Solving {len(partitions)} partitions using {self.n_jobs} worker processes")
+            with ProcessPoolExecutor(max_workers=min(self.n_jobs, len(partitions))) as executor:
+                futures = {
+                    name: executor.submit(
+                        _cluster_partition, partition, params,
+                        {dept: self.init_centroids[dept] for dept in departments if dept in self.init_centroids}
+                    )
+                    for name, (partition, departments) in jobs.items()
+                }
+                results = {name: future.result() for name, future in futures.items()}
+            # Solver calls were counted in the worker processes
+            counters.increment(CLUSTERING_SOLVER_CALLS, sum(result[3] for result in results.values()))
+        else:
+            results = {
+                name: _cluster_partition(
+                    partition, params,
+                    {dept: self.init_centroids[dept] for dept in departments if dept in self.init_centroids}
+                )
+                for name, (partition, departments) in jobs.items()
+            }
+
+        return {name: result[:3] for name, result in results.items()}
+
+
+def _cluster_partition(table: ParticipantTable, params: dict, init_centroids: Dict[str, np.ndarray]) -> tuple:
+    # Module level so that it can be sent to worker processes. Clusters are returned as row indices
+    # into the partition table.
+    solver_calls = counters.snapshot().get(CLUSTERING_SOLVER_CALLS, 0)
+    clusterer = DepartmentGeoClustering(n_jobs=1, init_centroids=init_centroids, **params)
+    labels = clusterer.cluster_labels(table)
+
+    groups = label_groups(labels, len(clusterer.cluster_info))
+    infos = [clusterer.cluster_info[cluster_id] for cluster_id in range(len(groups))]
+    solver_calls = counters.snapshot().get(CLUSTERING_SOLVER_CALLS, 0) - solver_calls
+    return groups, infos, clusterer.department_centroids, solver_calls
+
+
+# Clustering strategies selectable in main.py and the parameter sweep
+STRATEGIES = {'department': DepartmentGeoClustering, 'hierarchical': HierarchicalGeoClustering}
@@ -0,0 +1,125 @@
+import logging
+import numpy as np
+
+from typing import Dict, List
+
+from src.Participant import Participant
+from src.ParticipantTable import ParticipantTable
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderAssignment:
+    """Assign unit leaders to the units of a finished clustering.
+
+    The cost of a leader in a unit is the distance from the leader's home to the unit center plus
+    department_penalty times the share of the unit's members that are not from the leader's
+    department. Every unit offers max_leaders slots. The first of them are required: min_leaders,
+    or with participants_per_leader one per that many members, between min_leaders and max_leaders.
+    Required slots get a bonus larger than any possible cost difference, so as many units as
+    possible get their required leaders before the remaining leaders are placed by cost. The whole
+    cost matrix is built with array operations and solved with scipy's linear_sum_assignment.
+    """
+
+    def __init__(self, min_leaders: int = 1, max_leaders: int = 2, department_penalty: float = 20000.0,
+                 participants_per_leader: int = 0):
+        if not 0 <= min_leaders <= max_leaders or max_leaders < 1:
+            raise ValueError(f"Invalid leaders per unit: min {min_leaders}, max {max_leaders}")
+        if participants_per_leader < 0:
+            raise ValueError(f"Invalid participants per leader: {participants_per_leader}")
+        self.min_leaders = min_leaders
+        self.max_leaders = max_leaders
+        self.department_penalty = department_penalty  # In metres, a unit without the department costs this much extra
+        self.participants_per_leader = participants_per_leader  # 0: min_leaders are required in every unit
+        self.unassigned: List[int] = []  # Rows of the leaders without valid coordinates or free slot
+
+    def assign_leaders(self, clusters: Dict[int, List[Participant]], leaders: List[Participant]) -> Dict[int, List[Participant]]:
+        """Set the cluster of every leader and return {cluster_id: [leaders]} for all clusters."""
+        cluster_ids = [cluster_id for cluster_id, members in clusters.items() if members]
+        members = ParticipantTable.from_participants([p for cluster_id in cluster_ids for p in clusters[cluster_id]])
+        labels = np.repeat(cluster_ids, [len(clusters[cluster_id]) for cluster_id in cluster_ids])
+        leader_labels = self.assign_labels(members, labels, ParticipantTable.from_participants(leaders))
+
+        assignment = {cluster_id: [] for cluster_id in clusters}
+        for leader, label in zip(leaders, leader_labels.tolist()):
+            leader.cluster = None if label < 0 else label
+            if label >= 0:
+                assignment[label].append(leader)
+        return assignment
+
+    def assign_labels(self, members: ParticipantTable, labels: np.ndarray, leaders: ParticipantTable) -> np.ndarray:
+        """Cluster ID of every leader row (-1 if not assigned) for units given as the rows of members
+        labelled with their cluster ID. unassigned holds the rows of the leaders without unit."""
+        from scipy.optimize import linear_sum_assignment
+
+        leader_labels = np.full(len(leaders), -1, dtype=np.int64)
+        cluster_ids, units = np.unique(labels, return_inverse=True)
+        located = leaders.has_xy()
+        self.unassigned = np.flatnonzero(~located).tolist()
+        if self.unassigned:
+            logger.warning(f"{len(self.unassigned)} leaders without valid coordinates are not assigned")
+        rows = np.flatnonzero(located)
+        if not len(cluster_ids) or not len(rows):
+            return leader_labels
+
+        distances, mismatch = _unit_costs(members, units, len(cluster_ids), leaders.take(rows))
+        costs = distances + self.department_penalty * mismatch
+
+        # One column per slot, the required slots of every unit carry the bonus
+        required_counts = self.required_leaders(np.bincount(units, minlength=len(cluster_ids)))
+        slot_units = np.repeat(np.arange(len(cluster_ids)), self.max_leaders)
+        required = np.tile(np.arange(self.max_leaders), len(cluster_ids)) < required_counts[slot_units]
+        bonus = min(len(rows), len(slot_units)) * float(np.ptp(costs)) + 1.0
+        slot_costs = costs[:, slot_units]
+        slot_costs[:, required] -= bonus
+        assigned, slots = linear_sum_assignment(slot_costs)
+        leader_labels[rows[assigned]] = cluster_ids[slot_units[slots]]
+
+        placed = np.zeros(len(rows), dtype=bool)
+        placed[assigned] = True
+        if not placed.all():
+            logger.warning(
+                f"{int((~placed).sum())} leaders left without unit, {len(cluster_ids)} units take at most "
+                f"{self.max_leaders} leaders each"
+            )
+            self.unassigned += rows[~placed].tolist()
+
+        counts = np.bincount(slot_units[slots], minlength=len(cluster_ids))
+        unit_of = slot_units[slots]
+        logger.info(
+            f"Assigned {len(assigned)} leaders to {len(cluster_ids)} units: {int((counts < required_counts).sum())} "
+            f"units below their required leaders, {int((mismatch[assigned, unit_of] == 1).sum())} leaders in a unit "
+            f"without their department, mean distance to the unit center {distances[assigned, unit_of].mean():.0f} m"
+        )
+        return leader_labels
+
+    def required_leaders(self, unit_sizes: np.ndarray) -> np.ndarray:
+        """Number of required leaders of units with unit_sizes members."""
+        if not self.participants_per_leader:
+            return np.full(len(unit_sizes), self.min_leaders, dtype=np.int64)
+        return np.clip(-(-unit_sizes // self.participants_per_leader), self.min_leaders, self.max_leaders)
+
+
+def _unit_costs(members: ParticipantTable, units: np.ndarray, n_units: int, leaders: ParticipantTable) -> tuple:
+    """Distance in metres from every leader (rows) to the center of every unit (columns), and the
+    share of the unit's members that are not from the leader's department. units holds the unit
+    0..n_units-1 of every member row."""
+    valid = members.has_xy()
+
+    sizes = np.bincount(units[valid], minlength=n_units)
+    centers = np.column_stack([
+        np.bincount(units[valid], weights=members.xy[valid, d], minlength=n_units) for d in (0, 1)
+    ]) / np.maximum(sizes, 1)[:, None]
+    distances = np.hypot(leaders.x[:, None] - centers[None, :, 0], leaders.y[:, None] - centers[None, :, 1])
+
+    # Department shares per unit from one bincount over (unit, department) pairs
+    n_departments = len(members.departments)
+    shares = np.bincount(
+        units * n_departments + members.department_codes, minlength=n_units * n_departments
+    ).reshape(n_units, n_departments) / np.maximum(np.bincount(units, minlength=n_units), 1)[:, None]
+    code_of = {department: code for code, department in enumerate(members.departments)}
+    leader_codes = np.array([code_of.get(department, -1) for department in leaders.departments], dtype=np.intp)
+    leader_codes = leader_codes[leaders.department_codes]
+    # Leaders of a department without members in any unit match nowhere
+    shares = np.column_stack([shares, np.zeros(n_units)])
+    return distances, 1.0 - shares[:, leader_codes].T
@@ -0,0 +1,134 @@
+import csv
+import itertools
+import logging
+import time
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from src.Clustering.DepartmentGeoClustering import DepartmentGeoClustering
+from src.Clustering.HierarchicalGeoClustering import STRATEGIES
+from src.ParticipantTable import ParticipantTable
+
+logger = logging.getLogger(__name__)
+
+# Columns of the comparison table, in order
+SCORE_COLUMNS = (
+    'size_max', 'size_min_slack', 'merge_threshold', 'engine', 'strategy', 'clusters', 'mean_size', 'size_std',
+    'min_size', 'max_size', 'oversized', 'mean_spread', 'max_spread', 'mixed_units', 'seconds'
+)
+
+# Participants of the sweep, set once per worker process by _init_worker
+_table: ParticipantTable | None = None
+
+
+def parameter_grid(size_max_values: list, slack_values: list, merge_fractions: list, engines: list,
+                   strategies: list = ('department',)) -> List[dict]:
+    """All combinations of the given values. The merge threshold is given as a fraction of size_max,
+    so that one set of fractions fits every size_max of the grid."""
+    grid = []
+    combinations = itertools.product(size_max_values, slack_values, merge_fractions, engines, strategies)
+    for size_max, slack, fraction, engine, strategy in combinations:
+        grid.append({
+            'size_max': size_max,
+            'size_min_slack': slack,
+            'merge_threshold': int(size_max * fraction),
+            'engine': engine,
+            'strategy': strategy
+        })
+    return grid
+
+
+def run_sweep(table: ParticipantTable, grid: List[dict], n_jobs: int = 1, random_state: int = 42) -> List[dict]:
+    """Cluster the participants of the table with every configuration of the grid and return one
+    score row each.
+
+    The table is sent to every worker process once, each configuration then only transfers its
+    parameters and scores. Only cluster labels are computed, no participant is modified.
+    """
+    logger.info(f"Sweeping {len(grid)} configurations over {len(table)} participants using {n_jobs} worker(s)")
+    if n_jobs > 1 and len(grid) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(n_jobs, len(grid)), initializer=_init_worker, initargs=(table,)
+        ) as executor:
+            futures = [executor.submit(_score_configuration, config, random_state) for config in grid]
+            results = [future.result() for future in futures]
+    else:
+        _init_worker(table)
+        results = [_score_configuration(config, random_state) for config in grid]
+
+    for row in results:
+        logger.info(
+            f"size_max={row['size_max']} slack={row['size_min_slack']} merge<{row['merge_threshold']} "
+            f"{row['engine']} {row['strategy']}: {row['clusters']} clusters, σ size {row['size_std']:.2f}, "
+            f"spread {row['mean_spread']:.0f} m, {row['mixed_units']} mixed ({row['seconds']:.1f}s)"
+        )
+    return results
+
+
+def format_table(results: List[dict], sort_by: str = 'mean_spread') -> str:
+    """Comparison table as plain text, one configuration per line."""
+    rows = sorted(results, key=lambda row: row[sort_by])
+    widths = [max(len(column), 8) for column in SCORE_COLUMNS]
+    lines = [' '.join(f"{column:>{width}}" for column, width in zip(SCORE_COLUMNS, widths))]
+    for row in rows:
+        lines.append(' '.join(
+            f"{row[column]:>{width}.2f}" if isinstance(row[column], float) else f"{row[column]!s:>{width}}"
+            for column, width in zip(SCORE_COLUMNS, widths)
+        ))
+    return '\n'.join(lines)
+
+
+def write_results_csv(results: List[dict], path: str):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SCORE_COLUMNS, delimiter=';')
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def score_clusters(clusterer: DepartmentGeoClustering, xy: np.ndarray, labels: np.ndarray) -> dict:
+    """Scores of the clustering of the rows of xy, labels as returned by clusterer.cluster_labels."""
+    stats = clusterer.get_label_statistics(xy, labels)
+    sizes = np.array([cluster_stats['size'] for cluster_stats in stats.values()], dtype=np.float64)
+    # Spread of a cluster: standard distance of its members to the center, in metres (LV95)
+    spreads = np.array([np.hypot(s['std_x'], s['std_y']) for s in stats.values()], dtype=np.float64)
+    mixed = sum(isinstance(info['department'], list) for info in clusterer.cluster_info.values())
+    return {
+        'clusters': len(stats),
+        'mean_size': round(float(sizes.mean()), 2) if len(sizes) else 0.0,
+        'size_std': round(float(sizes.std()), 2) if len(sizes) else 0.0,
+        'min_size': int(sizes.min()) if len(sizes) else 0,
+        'max_size': int(sizes.max()) if len(sizes) else 0,
+        'oversized': int((sizes > clusterer.size_max).sum()),
+        'mean_spread': round(float(spreads.mean()), 2) if len(spreads) else 0.0,
+        'max_spread': round(float(spreads.max()), 2) if len(spreads) else 0.0,
+        'mixed_units': mixed
+    }
+
+
+def _init_worker(table: ParticipantTable):
+    global _table
+    _table = table
+
+
+def _score_configuration(config: dict, random_state: int) -> dict:
+    # Module level so that it can be sent to worker processes
+    clusterer = STRATEGIES[config['strategy']](
+        size_max=config['size_max'],
+        random_state=random_state,
+        engine=config['engine'],
+        size_min_slack=config['size_min_slack'],
+        merge_threshold=config['merge_threshold']
+    )
+    start = time.perf_counter()
+    # Each configuration is logged as one line by run_sweep, not per department
+    previous_level = logging.getLogger('src.Clustering').level
+    logging.getLogger('src.Clustering').setLevel(logging.WARNING)
+    try:
+        labels = clusterer.cluster_labels(_table)
+    finally:
+        logging.getLogger('src.Clustering').setLevel(previous_level)
+    seconds = time.perf_counter() - start
+    return {**config, **score_clusters(clusterer, _table.xy, labels), 'seconds': round(seconds, 3)}
+
@@ -0,0 +1,275 @@
+import logging
+import numpy as np
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class RecursiveBisectionConstrained:
+    """Capacity-constrained clustering by recursive geographic bisection.
+
+    Drop-in alternative to KMeansConstrained (fit_predict / cluster_centers_) for groups that are
+    far larger than size_max. Points are split along their principal axis into two parts whose
+    sizes are proportional to the number of clusters each part receives, until every part is one
+    cluster. This needs O(n log k) time and memory instead of a min-cost-flow graph with n * k
+    edges, and no cluster can exceed ceil(n / k) <= size_max. Afterwards, Lloyd-style iterations
+    with a greedy capacitated assignment over the nearest centres and pairwise swaps between
+    neighbouring clusters reduce the within-cluster distances while respecting size_min/size_max.
+    """
+
+    def __init__(
+        self,
+        n_clusters: int = 8,
+        size_min: Optional[int] = None,
+        size_max: Optional[int] = None,
+        random_state: Optional[int] = None,
+        refine_iterations: int = 10,
+        n_neighbors: int = 6
+    ):
+        self.n_clusters = n_clusters
+        self.size_min = size_min
+        self.size_max = size_max
+        self.random_state = random_state  # Unused, the split is deterministic. Kept for interface parity
+        self.refine_iterations = refine_iterations
+        self.n_neighbors = n_neighbors
+        self.labels_ = None
+        self.cluster_centers_ = None
+        self.inertia_ = None
+
+    def fit_predict(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        n = len(X)
+        k = self.n_clusters
+
+        if k < 1 or k > n:
+            raise ValueError(f"n_clusters={k} must be between 1 and the number of points ({n})")
+        if self.size_max is not None and n > k * self.size_max:
+            raise ValueError(f"{n} points cannot be split into {k} clusters of at most {self.size_max}")
+        if self.size_min is not None and n < k * self.size_min:
+            raise ValueError(f"{n} points cannot be split into {k} clusters of at least {self.size_min}")
+
+        labels = self._bisect(X, k)
+        labels = self._reassign(X, labels, k)
+        labels = self._refine(X, labels, k)
+
+        self.labels_ = labels
+        self.cluster_centers_ = _centroids(X, labels, k)
+        self.inertia_ = float(((X - self.cluster_centers_[labels]) ** 2).sum())
+        return labels
+
+    def _bisect(self, X: np.ndarray, k: int) -> np.ndarray:
+        labels = np.empty(len(X), dtype=np.int64)
+        next_label = 0
+        stack = [(np.arange(len(X)), k)]
+
+        while stack:
+            indices, parts = stack.pop()
+            if parts == 1:
+                labels[indices] = next_label
+                next_label += 1
+                continue
+
+            parts_left = parts // 2
+            # Flooring the left part keeps both halves within parts * size_max, and as long as
+            # there are at least as many points as parts each half keeps at least one point per part
+            n_left = len(indices) * parts_left // parts
+
+            projection = _principal_projection(X[indices])
+            order = np.argpartition(projection, n_left - 1)
+            stack.append((indices[order[n_left:]], parts - parts_left))
+            stack.append((indices[order[:n_left]], parts_left))
+
+        return labels
+
+    def _reassign(self, X: np.ndarray, labels: np.ndarray, k: int) -> np.ndarray:
+        """Lloyd-style iterations with a capacitated greedy assignment step, keeping the best labels."""
+        if k < 2 or self.refine_iterations <= 0:
+            return labels
+
+        size_min = self.size_min or 0
+        size_max = self.size_max or len(X)
+        best_labels, best_inertia = labels, _inertia(X, labels, k)
+        for iteration in range(self.refine_iterations):
+            centers = _centroids(X, labels, k)
+            labels = _capacitated_assignment(X, centers, size_min, size_max, self.n_neighbors)
+            inertia = _inertia(X, labels, k)
+            if inertia < best_inertia:
+                best_labels, best_inertia = labels, inertia
+        return best_labels
+
+    def _refine(self, X: np.ndarray, labels: np.ndarray, k: int) -> np.ndarray:
+        if k < 2 or self.refine_iterations <= 0:
+            return labels
+
+        from scipy.spatial import cKDTree
+        n_neighbors = min(self.n_neighbors + 1, k)
+        for iteration in range(self.refine_iterations):
+            centers = _centroids(X, labels, k)
+            _, neighbors = cKDTree(centers).query(centers, k=n_neighbors)
+            neighbors = neighbors.reshape(k, -1)[:, 1:]
+
+            # Best alternative cluster for every point among the neighbours of its own cluster
+            candidate_clusters = neighbors[labels]
+            own_distance = ((X - centers[labels]) ** 2).sum(axis=1)
+            candidate_distance = ((X[:, None, :] - centers[candidate_clusters]) ** 2).sum(axis=2)
+            best = np.argmin(candidate_distance, axis=1)
+            target = candidate_clusters[np.arange(len(X)), best]
+            gain = own_distance - candidate_distance[np.arange(len(X)), best]
+
+            moved = self._move_within_slack(labels, target, gain, k)
+
+            swaps = _pairwise_swaps(labels, target, gain, exclude=moved)
+            if len(swaps) == 0 and not moved.any():
+                break
+
+            # Swapping two points between clusters keeps both cluster sizes unchanged
+            labels[swaps[:, 0]], labels[swaps[:, 1]] = labels[swaps[:, 1]], labels[swaps[:, 0]]
+
+        return labels
+
+    def _move_within_slack(self, labels: np.ndarray, target: np.ndarray, gain: np.ndarray, k: int) -> np.ndarray:
+        """Move single points with positive gain while both clusters stay within [size_min, size_max].
+        Updates labels in place and returns the mask of moved points."""
+        moved = np.zeros(len(labels), dtype=bool)
+        size_min = self.size_min if self.size_min is not None else 1
+        size_max = self.size_max if self.size_max is not None else len(labels)
+        sizes = np.bincount(labels, minlength=k)
+        if (sizes <= size_min).all() or (sizes >= size_max).all():
+            return moved
+
+        # Best gains first; sizes change as points move so this part is sequential
+        for point in np.flatnonzero(gain > 0)[np.argsort(-gain[gain > 0])]:
+            source, destination = labels[point], target[point]
+            if sizes[source] > size_min and sizes[destination] < size_max:
+                labels[point] = destination
+                sizes[source] -= 1
+                sizes[destination] += 1
+                moved[point] = True
+        return moved
+
+
+def _principal_projection(points: np.ndarray) -> np.ndarray:
+    centered = points - points.mean(axis=0)
+    covariance = centered.T @ centered
+    _, eigenvectors = np.linalg.eigh(covariance)
+    return centered @ eigenvectors[:, -1]
+
+
+def _centroids(X: np.ndarray, labels: np.ndarray, k: int) -> np.ndarray:
+    counts = np.bincount(labels, minlength=k).astype(np.float64)
+    sums = np.column_stack([
+        np.bincount(labels, weights=X[:, 0], minlength=k),
+        np.bincount(labels, weights=X[:, 1], minlength=k)
+    ])
+    return sums / np.maximum(counts, 1)[:, None]
+
+
+def _inertia(X: np.ndarray, labels: np.ndarray, k: int) -> float:
+    return float(((X - _centroids(X, labels, k)[labels]) ** 2).sum())
+
+
+def _capacitated_assignment(X: np.ndarray, centers: np.ndarray, size_min: int, size_max: int, n_neighbors: int) -> np.ndarray:
+    """Assign every point to its nearest centre with capacity left, then top up clusters below
+    size_min with the closest points of clusters above it.
+
+    The assignment runs in rounds over the n_neighbors nearest centres of every point (already
+    sorted by distance): all unassigned points propose to their next centre at once, and every
+    centre accepts the closest proposals up to its remaining capacity."""
+    from scipy.spatial import cKDTree
+    n, k = len(X), len(centers)
+    m = min(n_neighbors, k)
+    distances, candidates = cKDTree(centers).query(X, k=m)
+    distances, candidates = distances.reshape(n, m), candidates.reshape(n, m)
+
+    labels = np.full(n, -1, dtype=np.int64)
+    sizes = np.zeros(k, dtype=np.int64)
+    pending = _assign_in_rounds(np.arange(n), candidates, distances, labels, sizes, size_max)
+
+    # Points whose nearby centres are all full go to the nearest centres with capacity left
+    while len(pending):
+        open_clusters = np.flatnonzero(sizes < size_max)
+        m = min(2 * m, len(open_clusters))
+        open_distances, nearest = cKDTree(centers[open_clusters]).query(X[pending], k=m)
+        pending = _assign_in_rounds(
+            pending, open_clusters[nearest.reshape(len(pending), m)], open_distances.reshape(len(pending), m),
+            labels, sizes, size_max, rows=np.arange(len(pending))
+        )
+
+    deficits = np.flatnonzero(sizes < size_min)
+    if len(deficits):
+        tree = cKDTree(X)
+        for cluster in deficits:
+            # Closest points first, from clusters that can spare one
+            n_nearest = min(n, 4 * size_min)
+            while sizes[cluster] < size_min:
+                _, nearest = tree.query(centers[cluster], k=n_nearest)
+                for point in np.atleast_1d(nearest).tolist():
+                    source = labels[point]
+                    if sizes[source] > size_min:
+                        sizes[source] -= 1
+                        labels[point] = cluster
+                        sizes[cluster] += 1
+                        if sizes[cluster] >= size_min:
+                            break
+                if n_nearest == n:
+                    break
+                n_nearest = min(n, 4 * n_nearest)
+
+    return labels
+
+
+def _assign_in_rounds(points: np.ndarray, candidates: np.ndarray, distances: np.ndarray, labels: np.ndarray,
+                      sizes: np.ndarray, size_max: int, rows: np.ndarray | None = None) -> np.ndarray:
+    """Assign points to their candidate clusters (columns sorted by distance) in rounds: every pending
+    point proposes to its next candidate, every cluster accepts the closest proposals up to size_max.
+    candidates/distances are indexed by rows (default: the point itself). Updates labels and sizes
+    in place and returns the points that are still unassigned."""
+    rows = points if rows is None else rows
+    for rank in range(candidates.shape[1]):
+        if len(points) == 0:
+            break
+        proposed = candidates[rows, rank]
+        # Proposals grouped by cluster, closest first, and their position within the group
+        order = np.lexsort((distances[rows, rank], proposed))
+        points, rows, proposed = points[order], rows[order], proposed[order]
+        position = np.arange(len(points)) - np.searchsorted(proposed, proposed, side='left')
+        accepted = position < size_max - sizes[proposed]
+        labels[points[accepted]] = proposed[accepted]
+        sizes += np.bincount(proposed[accepted], minlength=len(sizes))
+        points, rows = points[~accepted], rows[~accepted]
+    return points
+
+
+def _pairwise_swaps(labels: np.ndarray, target: np.ndarray, gain: np.ndarray, exclude: np.ndarray) -> np.ndarray:
+    """Pair points of cluster a that prefer b with points of b that prefer a, best gains first,
+    as long as the combined gain of a swap is positive. Returns an (m, 2) array of point indices."""
+    candidates = np.flatnonzero(~exclude)
+    source, destination = labels[candidates], target[candidates]
+
+    # Sort by (unordered pair, direction, descending gain)
+    low = np.minimum(source, destination)
+    high = np.maximum(source, destination)
+    forward = source == low
+    order = np.lexsort((-gain[candidates], ~forward, high, low))
+    candidates, low, high, forward = candidates[order], low[order], high[order], forward[order]
+
+    if len(candidates) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    # Rank of every point within its (pair, direction) group, the r-th best point of one direction
+    # is paired with the r-th best of the other
+    index = np.arange(len(candidates))
+    new_pair = np.concatenate(([True], (np.diff(low) != 0) | (np.diff(high) != 0)))
+    pair = np.cumsum(new_pair) - 1
+    new_group = new_pair | np.concatenate(([True], forward[1:] != forward[:-1]))
+    rank = index - np.maximum.accumulate(np.where(new_group, index, 0))
+    n_pairs = pair[-1] + 1
+    matched = np.minimum(
+        np.bincount(pair[forward], minlength=n_pairs), np.bincount(pair[~forward], minlength=n_pairs)
+    )
+    keep = rank < matched[pair]
+    forward_points = candidates[keep & forward]
+    backward_points = candidates[keep & ~forward]
+
+    # Both directions are sorted by descending gain, so the combined gains of a pair are non-increasing
+    positive = gain[forward_points] + gain[backward_points] > 0
+    return np.column_stack((forward_points[positive], backward_points[positive]))
@@ -0,0 +1,39 @@
+import json
+import logging
+import os
+import numpy as np
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Default k-means initialization when no usable centroids from a previous run exist
+DEFAULT_INIT = 'k-means++'
+
+
+def save_centroids(path: str, centroids: Dict[str, np.ndarray]):
+    """Persist final centroids (per department or other key) as JSON for the next run."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({key: np.asarray(value).tolist() for key, value in centroids.items()}, f)
+    logger.info(f"Saved centroids of {len(centroids)} groups to {path}")
+
+
+def load_centroids(path: str) -> Dict[str, np.ndarray]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        centroids = {key: np.asarray(value, dtype=np.float64) for key, value in json.load(f).items()}
+    logger.info(f"Loaded centroids of {len(centroids)} groups from {path}")
+    return centroids
+
+
+def initial_centers(centroids: np.ndarray | None, n_clusters: int, label: str = ""):
+    """Return previous centroids if they match the requested cluster count, else the default init."""
+    if centroids is None:
+        return DEFAULT_INIT
+    if centroids.shape != (n_clusters, 2):
+        logger.info(
+            f"Previous centroids{' of ' + label if label else ''} have {len(centroids)} clusters, "
+            f"{n_clusters} requested. Using {DEFAULT_INIT} initialization."
+        )
+        return DEFAULT_INIT
+    return centroids
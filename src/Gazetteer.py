@@ -0,0 +1,166 @@
+import argparse
+import logging
+import os
+import re
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from typing import List
+
+from .Geodata import Geodata, lv95_to_wgs84
+from .Participant import Participant
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Locality centroids, columns plz;ort;x;y;lat;lon. Built with `python -m src.Gazetteer`
+GAZETTEER_PATH = os.path.join(BASE_DIR, 'data', 'geodata', 'plz_gazetteer.csv')
+GAZETTEER_COLUMNS = ['plz', 'ort', 'x', 'y', 'lat', 'lon']
+
+# Column names of the swisstopo "Amtliches Ortschaftenverzeichnis" CSV (LV95 edition)
+SWISSTOPO_COLUMNS = {'plz': 'PLZ', 'ort': 'Ortschaftsname', 'x': 'E', 'y': 'N'}
+
+
+class Gazetteer:
+    """In-memory PLZ/Ort -> centroid index for offline geocoding at locality precision.
+
+    Lookups try the exact (PLZ, Ort) pair first, then the PLZ alone (mean of its localities), then
+    the Ort alone if it is unambiguous. Coordinates are kept in arrays, the dictionaries only map
+    keys to rows.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        frame = frame.reset_index(drop=True)
+        self.xy = frame[['x', 'y']].to_numpy(dtype=np.float64)
+        self.latlon = frame[['lat', 'lon']].to_numpy(dtype=np.float64)
+        plz = [_normalize_plz(value) for value in frame['plz'].tolist()]
+        ort = [_normalize_ort(value) for value in frame['ort'].tolist()]
+
+        self.by_plz_ort = {key: row for row, key in enumerate(zip(plz, ort))}
+
+        # A PLZ can cover several localities, a lookup by PLZ only returns their mean (appended rows)
+        plz_means = frame.assign(plz_key=plz).groupby('plz_key', sort=False)[['x', 'y', 'lat', 'lon']].mean()
+        self.by_plz = {code: len(frame) + i for i, code in enumerate(plz_means.index)}
+        self.xy = np.vstack([self.xy, plz_means[['x', 'y']].to_numpy(dtype=np.float64)])
+        self.latlon = np.vstack([self.latlon, plz_means[['lat', 'lon']].to_numpy(dtype=np.float64)])
+
+        # Names like "Buchs" exist in several cantons, those are not resolved by name alone
+        rows_by_ort = {}
+        for row, name in enumerate(ort):
+            rows_by_ort.setdefault(name, []).append(row)
+        self.by_ort = {name: rows[0] for name, rows in rows_by_ort.items() if len(rows) == 1}
+        self.n_localities = len(frame)
+
+    def __len__(self):
+        return self.n_localities
+
+    def lookup(self, plz, ort) -> Geodata | None:
+        code = _normalize_plz(plz)
+        name = _normalize_ort(ort)
+        row = self.by_plz_ort.get((code, name))
+        if row is None:
+            row = self.by_plz.get(code) if code else None
+        if row is None:
+            row = self.by_ort.get(name) if name else None
+        if row is None:
+            return None
+        x, y = self.xy[row].tolist()
+        lat, lon = self.latlon[row].tolist()
+        return Geodata(lat=lat, lon=lon, x=x, y=y, precision=Geodata.LOCALITY)
+
+    def locate(self, participants: List[Participant]) -> int:
+        """Set geo_data of every participant without one from its PLZ/Ort. Returns how many were found."""
+        located = 0
+        for participant in participants:
+            if participant.has_valid_geo():
+                continue
+            geo_data = self.lookup(participant.plz, participant.ort)
+            if geo_data is not None:
+                participant.geo_data = geo_data
+                located += 1
+        return located
+
+
+def load_gazetteer(path: str = GAZETTEER_PATH) -> Gazetteer:
+    """The gazetteer of the data file at path, read once per process and modification time."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"Gazetteer {path} not found, build it with `python -m src.Gazetteer swisstopo <AMTOVZ_CSV_LV95.csv>` "
+            f"or `python -m src.Gazetteer snapshot`"
+        )
+    return _load_gazetteer(path, os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=2)
+def _load_gazetteer(path: str, mtime_ns: int) -> Gazetteer:
+    frame = pd.read_csv(path, sep=';', dtype={'plz': str, 'ort': str}, keep_default_na=False)
+    gazetteer = Gazetteer(frame)
+    logger.info(f"Loaded gazetteer with {len(frame)} localities from {path}")
+    return gazetteer
+
+
+def build_from_swisstopo(source_path: str, encoding: str = 'utf-8-sig') -> pd.DataFrame:
+    """Gazetteer rows from the official locality directory of swisstopo (CSV, LV95 coordinates).
+    Localities split over several municipalities appear several times there and are averaged."""
+    source = pd.read_csv(source_path, sep=';', encoding=encoding, dtype={SWISSTOPO_COLUMNS['plz']: str})
+    frame = source[list(SWISSTOPO_COLUMNS.values())].rename(columns={v: k for k, v in SWISSTOPO_COLUMNS.items()})
+    frame = frame.groupby(['plz', 'ort'], as_index=False, sort=True)[['x', 'y']].mean()
+    frame['lat'], frame['lon'] = lv95_to_wgs84(frame['x'].to_numpy(), frame['y'].to_numpy())
+    return frame[GAZETTEER_COLUMNS]
+
+
+def build_from_participants(participants: List[Participant]) -> pd.DataFrame:
+    """Gazetteer rows from already geocoded participants: the median position per PLZ/Ort. Covers
+    only localities that occur in earlier exports, but needs no external data. Participants that
+    were themselves located by the gazetteer are left out."""
+    rows = [
+        (_normalize_plz(p.plz), p.ort.strip(), p.geo_data.x, p.geo_data.y, p.geo_data.lat, p.geo_data.lon)
+        for p in participants
+        if p.has_valid_geo() and p.geo_data.x is not None and p.geo_data.precision == Geodata.ADDRESS
+        and _normalize_plz(p.plz) and p.ort.strip()
+    ]
+    frame = pd.DataFrame(rows, columns=GAZETTEER_COLUMNS)
+    frame['ort_key'] = frame['ort'].map(_normalize_ort)
+    grouped = frame.groupby(['plz', 'ort_key'], sort=True)
+    result = grouped[['x', 'y', 'lat', 'lon']].median()
+    result['ort'] = grouped['ort'].agg(lambda names: names.mode().iloc[0])
+    return result.reset_index()[GAZETTEER_COLUMNS]
+
+
+def write_gazetteer(frame: pd.DataFrame, path: str = GAZETTEER_PATH):
+    frame.to_csv(path, sep=';', index=False, float_format='%.6f')
+    logger.info(f"Gazetteer with {len(frame)} localities written to {path}")
+
+
+def _normalize_plz(value) -> str:
+    # "3000", 3000, 3000.0 and " 3000 " are the same PLZ
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    text = str(value).strip()
+    return text[:-2] if text.endswith('.0') else text
+
+
+def _normalize_ort(value) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    return re.sub(r"\s+", " ", str(value).strip().lower())
+
+
+if __name__ == '__main__':
+    # Preprocessing step, writes GAZETTEER_PATH
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description="Build the PLZ/Ort gazetteer used for offline geocoding")
+    subparsers = parser.add_subparsers(dest='source', required=True)
+    swisstopo = subparsers.add_parser('swisstopo', help="From the swisstopo locality directory (AMTOVZ_CSV_LV95)")
+    swisstopo.add_argument('path')
+    swisstopo.add_argument('--encoding', default='utf-8-sig')
+    snapshot = subparsers.add_parser('snapshot', help="From the geocoded participants of a snapshot")
+    snapshot.add_argument('path', nargs='?', default='./export/participants_with_geo')
+    parser.add_argument('--output', default=GAZETTEER_PATH)
+    args = parser.parse_args()
+
+    if args.source == 'swisstopo':
+        write_gazetteer(build_from_swisstopo(args.path, args.encoding), args.output)
+    else:
+        from .ParticipantStore import load_participants
+        write_gazetteer(build_from_participants(load_participants(args.path)), args.output)
@@ -0,0 +1,134 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from .Geodata import Geodata
+
+logger = logging.getLogger(__name__)
+
+class GeocodeCache:
+    """Persistent SQLite cache for geocoding results keyed by normalized address."""
+
+    def __init__(self, path: str, ttl_seconds: float | None = None, negative_ttl_seconds: float | None = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        # Negative results (address not found) can get a shorter TTL so that corrected addresses are retried
+        self.negative_ttl_seconds = negative_ttl_seconds if negative_ttl_seconds is not None else ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                address TEXT NOT NULL,
+                k INTEGER NOT NULL,
+                lat REAL,
+                lon REAL,
+                x REAL,
+                y REAL,
+                found INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (address, k)
+            )
+            """
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def normalize_address(address: str) -> str:
+        """Normalize an address so that formatting differences map to the same cache key."""
+        normalized = address.strip().lower()
+        normalized = re.sub(r"\s*,\s*", ", ", normalized)
+        normalized = re.sub(r"\s+", " ", normalized)
+        return normalized
+
+    def lookup(self, address: str, k: int = 1) -> tuple[bool, Geodata | None]:
+        """Return (hit, geo_data). A hit with geo_data None is a cached negative result."""
+        key = self.normalize_address(address)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT lat, lon, x, y, found, created_at FROM geocode_cache WHERE address = ? AND k = ?",
+                (key, k)
+            ).fetchone()
+
+            if row is None or self._is_expired(found=bool(row[4]), created_at=row[5]):
+                self.misses += 1
+                return False, None
+
+            self.hits += 1
+
+        lat, lon, x, y, found, _ = row
+        if not found:
+            return True, None
+        return True, Geodata(lat=lat, lon=lon, x=x, y=y)
+
+    def store(self, address: str, geo_data: Geodata | None, k: int = 1):
+        """Store a geocoding result. Passing None records a negative result."""
+        self.store_many([(address, geo_data)], k=k)
+
+    def store_many(self, results: list, k: int = 1):
+        """Store (address, geo_data) pairs in one transaction, so a cold run does not commit per address."""
+        now = time.time()
+        rows = []
+        for address, geo_data in results:
+            key = self.normalize_address(address)
+            if geo_data is None:
+                rows.append((key, k, None, None, None, None, 0, now))
+            else:
+                rows.append((key, k, geo_data.lat, geo_data.lon, geo_data.x, geo_data.y, 1, now))
+        if not rows:
+            return
+
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO geocode_cache (address, k, lat, lon, x, y, found, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._connection.commit()
+
+    def invalidate(self, address: str | None = None):
+        """Remove a single address from the cache, or everything if no address is given."""
+        with self._lock:
+            if address is None:
+                self._connection.execute("DELETE FROM geocode_cache")
+            else:
+                self._connection.execute(
+                    "DELETE FROM geocode_cache WHERE address = ?", (self.normalize_address(address),)
+                )
+            self._connection.commit()
+
+    def purge_expired(self) -> int:
+        """Delete all expired entries and return how many were removed."""
+        now = time.time()
+        removed = 0
+        with self._lock:
+            if self.ttl_seconds is not None:
+                removed += self._connection.execute(
+                    "DELETE FROM geocode_cache WHERE found = 1 AND created_at < ?", (now - self.ttl_seconds,)
+                ).rowcount
+            if self.negative_ttl_seconds is not None:
+                removed += self._connection.execute(
+                    "DELETE FROM geocode_cache WHERE found = 0 AND created_at < ?", (now - self.negative_ttl_seconds,)
+                ).rowcount
+            self._connection.commit()
+        return removed
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _is_expired(self, found: bool, created_at: float) -> bool:
+        ttl = self.ttl_seconds if found else self.negative_ttl_seconds
+        return ttl is not None and time.time() - created_at > ttl
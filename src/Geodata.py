@@ -1,9 +1,64 @@
+import numpy as np
+
+from .LegacyPickle import restore_slots
+
 class Geodata:
-    def __init__(self, lat: float, lon: float, x: float, y: float):
+    # Geocoded address, or centroid of the locality (PLZ/Ort gazetteer)
+    ADDRESS = 'address'
+    LOCALITY = 'locality'
+
+    __slots__ = ('lat', 'lon', 'x', 'y', 'precision')
+
+    def __init__(self, lat: float, lon: float, x: float, y: float, precision: str = ADDRESS):
         self.lat = lat
         self.lon = lon
         self.x = x
         self.y = y
+        self.precision = precision
+
+    def complete(self) -> "Geodata":
+        """Fill in the coordinate system that is missing from the other one (in place)."""
+        if (self.x is None or self.y is None) and self.lat is not None and self.lon is not None:
+            x, y = wgs84_to_lv95(self.lat, self.lon)
+            self.x, self.y = float(x), float(y)
+        elif (self.lat is None or self.lon is None) and self.x is not None and self.y is not None:
+            lat, lon = lv95_to_wgs84(self.x, self.y)
+            self.lat, self.lon = float(lat), float(lon)
+        return self
+
+    def __setstate__(self, state):
+        restore_slots(self, state, defaults={'precision': Geodata.ADDRESS})
 
     def __repr__(self):
         return f"Geodata(lat={self.lat}, lon={self.lon}, x={self.x}, y={self.y})"
+
+
+# Approximate formulas of swisstopo ("Approximate formulas for the transformation between Swiss
+# projection coordinates and WGS84"), accurate to about 1 m within Switzerland. Both functions take
+# scalars or arrays of any shape and convert whole arrays at once.
+
+def to_float(value) -> float:
+    """A coordinate as float, NaN if it is missing."""
+    return float(value) if value is not None else np.nan
+
+
+def wgs84_to_lv95(lat, lon) -> tuple:
+    """WGS84 latitude/longitude in degrees -> LV95 east (x) / north (y) in metres."""
+    # Auxiliary values: differences to Bern in 10000" units
+    phi = (np.asarray(lat, dtype=np.float64) * 3600 - 169028.66) / 10000
+    lam = (np.asarray(lon, dtype=np.float64) * 3600 - 26782.5) / 10000
+    east = (2600072.37 + 211455.93 * lam - 10938.51 * lam * phi - 0.36 * lam * phi ** 2 - 44.54 * lam ** 3)
+    north = (1200147.07 + 308807.95 * phi + 3745.25 * lam ** 2 + 76.63 * phi ** 2
+             - 194.56 * lam ** 2 * phi + 119.79 * phi ** 3)
+    return east, north
+
+
+def lv95_to_wgs84(east, north) -> tuple:
+    """LV95 east (x) / north (y) in metres -> WGS84 latitude/longitude in degrees."""
+    # Auxiliary values: differences to Bern in 1000 km units
+    y = (np.asarray(east, dtype=np.float64) - 2600000) / 1000000
+    x = (np.asarray(north, dtype=np.float64) - 1200000) / 1000000
+    lon = 2.6779094 + 4.728982 * y + 0.791484 * y * x + 0.1306 * y * x ** 2 - 0.0436 * y ** 3
+    lat = 16.9023892 + 3.238272 * x - 0.270978 * y ** 2 - 0.002528 * x ** 2 - 0.0447 * y ** 2 * x - 0.0140 * x ** 3
+    # Results are in 10000" units
+    return lat * 100 / 36, lon * 100 / 36
@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Names of the counters incremented by the pipeline code
+GEOCODING_API_CALLS = 'geocoding_api_calls'
+CLUSTERING_SOLVER_CALLS = 'clustering_solver_calls'
+
+
+class Counters:
+    """Process-wide event counters (thread safe), e.g. API requests or solver runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, int] = {}
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._values)
+
+
+counters = Counters()
+
+
+class StageRecord:
+    __slots__ = ('name', 'items', 'wall_seconds', 'cpu_seconds', 'rss_start_mb', 'rss_end_mb', 'peak_rss_mb',
+                 'traced_peak_mb', 'counters')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = None  # Set by the caller, e.g. number of participants processed
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.rss_start_mb = None
+        self.rss_end_mb = None
+        self.peak_rss_mb = None
+        self.traced_peak_mb = None
+        self.counters = {}  # Counter increments during this stage
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class RunReport:
+    """Collects wall/CPU time, memory, item counts and counter increments per pipeline stage.
+
+    Usage:
+        with report.stage('clustering') as stage:
+            clusters = clusterer.cluster_participants(participants)
+            stage.items = len(participants)
+
+    With trace_memory the peak of Python allocations per stage is measured with tracemalloc,
+    which slows allocation heavy code down noticeably. Peak RSS is the process-wide maximum so far
+    (it never decreases), the current RSS at the start and end of a stage shows the growth.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.started_at = datetime.now()
+        self.stages: List[StageRecord] = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str):
+        record = StageRecord(name)
+        counters_before = counters.snapshot()
+        record.rss_start_mb = _current_rss_mb()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_seconds = round(time.perf_counter() - wall_start, 4)
+            record.cpu_seconds = round(time.process_time() - cpu_start, 4)
+            record.rss_end_mb = _current_rss_mb()
+            record.peak_rss_mb = _peak_rss_mb()
+            if self.trace_memory:
+                record.traced_peak_mb = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+            counters_after = counters.snapshot()
+            record.counters = {
+                key: value - counters_before.get(key, 0)
+                for key, value in counters_after.items() if value != counters_before.get(key, 0)
+            }
+            self.stages.append(record)
+            logger.info(f"Stage '{name}' took {record.wall_seconds:.2f}s (CPU {record.cpu_seconds:.2f}s)")
+
+    def to_dict(self) -> dict:
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'total_wall_seconds': round(sum(s.wall_seconds for s in self.stages), 4),
+            'counters': counters.snapshot(),
+            'stages': [s.to_dict() for s in self.stages]
+        }
+
+    def write_json(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        logger.info(f"Run report written to {path}")
+
+    def log_summary(self):
+        total = sum(s.wall_seconds for s in self.stages) or 1.0
+        logger.info("\nRun summary:")
+        logger.info(f"  {'Stage':<22} {'Wall s':>9} {'CPU s':>9} {'Share':>6} {'Items':>9} {'RSS MB':>9} {'Peak MB':>9}")
+        for s in self.stages:
+            logger.info(
+                f"  {s.name:<22} {s.wall_seconds:>9.2f} {s.cpu_seconds:>9.2f} {s.wall_seconds / total:>6.1%} "
+                f"{_format_optional(s.items, 'd'):>9} {_format_optional(s.rss_end_mb, '.1f'):>9} "
+                f"{_format_optional(s.traced_peak_mb if self.trace_memory else s.peak_rss_mb, '.1f'):>9}"
+            )
+            if s.counters:
+                logger.info(f"    {', '.join(f'{k}={v}' for k, v in s.counters.items())}")
+
+
+def _format_optional(value, spec: str) -> str:
+    return '-' if value is None else format(value, spec)
+
+
+def _current_rss_mb() -> float | None:
+    # Linux only, /proc/self/statm holds the resident set size in pages
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (2 ** 20 if os.uname().sysname == 'Darwin' else 2 ** 10), 1)
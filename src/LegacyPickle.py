@@ -0,0 +1,9 @@
+def restore_slots(instance, state, defaults: dict | None = None):
+    """__setstate__ of the classes with __slots__. Pickles written before __slots__ was introduced
+    store a plain attribute dict, newer ones a (dict, slots) tuple. Attributes missing from old
+    pickles get their value from defaults."""
+    if isinstance(state, tuple):
+        instance_dict, slot_values = state
+        state = {**(instance_dict or {}), **(slot_values or {})}
+    for name, value in {**(defaults or {}), **state}.items():
+        setattr(instance, name, value)
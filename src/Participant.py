@@ -1,9 +1,23 @@
+import csv
+import io
 import pandas as pd
 from math import nan
 
 from .Geodata import Geodata
+from .LegacyPickle import restore_slots
 
 class Participant:
+    PARTICIPANT_FUNCTION = "Teilnehmer:in / participant·e / partecipante"
+    LEADER_FUNCTION = "UL (Unit Lead)"
+
+    # Fields that stay None instead of "" when missing
+    NULLABLE_FIELDS = ('strasse', 'hausnummer', 'postfach', 'plz')
+    FIELDS = ('vorname', 'nachname', 'pfadiname', 'strasse', 'hausnummer', 'postfach', 'plz', 'ort', 'land',
+              'hauptebene', 'funktion_im_jamboree', 'abteilung', 'kantonalverband')
+
+    # No per-instance __dict__, large exports hold hundreds of thousands of participants
+    __slots__ = FIELDS + ('geo_data', 'cluster')
+
     def __init__(self, vorname: str, nachname: str, pfadiname: str, strasse: str, hausnummer: int, postfach: int,
                  plz: int, ort: str, land: str, hauptebene: str, funktion_im_jamboree: str, abteilung: str, kantonalverband: str):
         self.vorname = vorname if pd.notna(vorname) else ""
@@ -26,6 +40,31 @@ class Participant:
         # Optional cluster assignment
         self.cluster = None
 
+    @classmethod
+    def from_normalized(cls, vorname, nachname, pfadiname, strasse, hausnummer, postfach, plz, ort, land,
+                        hauptebene, funktion_im_jamboree, abteilung, kantonalverband):
+        """Create a participant from already normalized values, skipping the NaN checks of __init__."""
+        participant = cls.__new__(cls)
+        participant.vorname = vorname
+        participant.nachname = nachname
+        participant.pfadiname = pfadiname
+        participant.strasse = strasse
+        participant.hausnummer = hausnummer
+        participant.postfach = postfach
+        participant.plz = plz
+        participant.ort = ort
+        participant.land = land
+        participant.hauptebene = hauptebene
+        participant.funktion_im_jamboree = funktion_im_jamboree
+        participant.abteilung = abteilung
+        participant.kantonalverband = kantonalverband
+        participant.geo_data = None
+        participant.cluster = None
+        return participant
+
+    def __setstate__(self, state):
+        restore_slots(self, state, defaults={'geo_data': None, 'cluster': None})
+
     def __repr__(self):
         return (f"Participant(vorname='{self.vorname}', nachname='{self.nachname}', "
                 f"pfadiname='{self.pfadiname}', hauptebene='{self.hauptebene}')")
@@ -52,7 +91,7 @@ class Participant:
 
         # ZIP and city
         if self.plz or self.ort:
-            city_line = f"{self.plz} {self.ort}".strip()
+            city_line = f"{self.plz or ''} {self.ort}".strip()
             address_parts.append(city_line)
 
         return ", ".join(address_parts)
@@ -75,26 +114,39 @@ class Participant:
             'kantonalverband': self.kantonalverband
         }
 
-    def to_csv(self, separator: str = ";"):
-        """Convert participant to CSV string."""
+    def csv_fields(self, with_function: bool = False) -> list:
+        """Exported fields as strings, in the order of ClusterExport.CSV_HEADER (without the cluster),
+        with_function adds the function for ClusterExport.FUNCTION_COLUMN."""
         fields = [
-            self.vorname,
-            self.nachname,
-            self.pfadiname,
-            self.strasse if self.strasse is not None else "",
-            str(self.hausnummer) if self.hausnummer is not None else "",
-            str(self.plz) if self.plz is not None else "",
-            self.ort,
-            self.abteilung,
-            self.kantonalverband
+            _to_text(self.vorname),
+            _to_text(self.nachname),
+            _to_text(self.pfadiname),
+            _to_text(self.strasse),
+            _to_text(self.hausnummer),
+            _to_text(self.plz),
+            _to_text(self.ort),
+            _to_text(self.abteilung),
+            _to_text(self.kantonalverband)
         ]
-        return separator.join(fields)
+        if with_function:
+            fields.append(_to_text(self.funktion_im_jamboree))
+        return fields
+
+    def to_csv(self, separator: str = ";"):
+        """Convert participant to a CSV line (without line break), quoted where needed."""
+        buffer = io.StringIO()
+        csv.writer(buffer, delimiter=separator, lineterminator='').writerow(self.csv_fields())
+        return buffer.getvalue()
 
     def has_valid_geo(self):
         return self.geo_data is not None and self.geo_data.lat is not None and self.geo_data.lon is not None
 
     def is_participant(self):
-        return bool(self.funktion_im_jamboree.strip() == "Teilnehmer:in / participant·e / partecipante")
+        return bool(self.funktion_im_jamboree.strip() == self.PARTICIPANT_FUNCTION)
 
     def is_leader(self):
-        return bool(self.funktion_im_jamboree.strip() == "UL (Unit Lead)")
+        return bool(self.funktion_im_jamboree.strip() == self.LEADER_FUNCTION)
+
+
+def _to_text(value) -> str:
+    return "" if value is None else str(value)
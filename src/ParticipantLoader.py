@@ -0,0 +1,163 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import Iterable, List
+
+from .Geodata import Geodata
+from .Participant import Participant
+
+logger = logging.getLogger(__name__)
+
+# Mapping of Participant fields to the column names of the Midata export
+CSV_COLUMNS = {
+    'vorname': 'Vorname',
+    'nachname': 'Nachname',
+    'pfadiname': 'Pfadiname',
+    'strasse': 'Strasse',
+    'hausnummer': 'Hausnummer',
+    'postfach': 'Postfach',
+    'plz': 'PLZ',
+    'ort': 'Ort',
+    'land': 'Land',
+    'hauptebene': 'Hauptebene',
+    'funktion_im_jamboree': '3) In welcher Funktion meld...',
+    'abteilung': '5) Aus welcher Pfadiabteilu...',
+    'kantonalverband': '9) Mein Kantonalverband / M...',
+}
+
+# Fields that decide whether a participant has to be geocoded again
+ADDRESS_FIELDS = ('strasse', 'hausnummer', 'plz', 'ort', 'land')
+
+# Fields used to recognize the same person across exports
+IDENTITY_FIELDS = ('vorname', 'nachname', 'pfadiname', 'abteilung')
+
+
+def read_export(path: str) -> pd.DataFrame:
+    """Read a Midata export. All columns are read as strings so that PLZ and house numbers keep their format."""
+    return pd.read_csv(path, sep=';', na_values=[''], dtype=str)
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Select the Participant columns from an export and normalize missing values the same way
+    Participant.__init__ does: "" for text fields and None for the nullable address fields."""
+    frame = df[list(CSV_COLUMNS.values())].rename(columns={v: k for k, v in CSV_COLUMNS.items()})
+    frame = frame.reset_index(drop=True)
+
+    for field in Participant.FIELDS:
+        column = _to_string_column(frame[field])
+        if field in Participant.NULLABLE_FIELDS:
+            frame[field] = column.astype(object).where(column.notna(), None)
+        else:
+            frame[field] = column.fillna("").astype(object)
+
+    return frame
+
+
+def build_full_addresses(frame: pd.DataFrame) -> pd.Series:
+    """Vectorized equivalent of Participant.get_full_address for a normalized frame."""
+    strasse = frame['strasse'].fillna("").to_numpy(dtype=object)
+    hausnummer = frame['hausnummer'].fillna("").to_numpy(dtype=object)
+    plz = frame['plz'].fillna("").to_numpy(dtype=object)
+    ort = frame['ort'].to_numpy(dtype=object)
+
+    street_line = np.where(hausnummer == "", strasse, strasse + " " + hausnummer)
+    street_line = np.where(strasse == "", "", street_line)
+    city_line = np.where((plz == "") | (ort == ""), plz + ort, plz + " " + ort)
+
+    has_street = street_line != ""
+    has_city = city_line != ""
+    addresses = np.where(has_street & has_city, street_line + ", " + city_line,
+                         np.where(has_city, city_line, street_line))
+    return pd.Series(addresses, index=frame.index, dtype=object)
+
+
+def filter_by_function(frame: pd.DataFrame, functions: Iterable[str]) -> pd.DataFrame:
+    """Keep only rows whose Jamboree function is one of `functions`."""
+    mask = frame['funktion_im_jamboree'].str.strip().isin(list(functions))
+    return frame[mask].reset_index(drop=True)
+
+
+def participants_from_frame(frame: pd.DataFrame) -> List[Participant]:
+    """Create Participant objects from a normalized frame without per-field NaN checks."""
+    columns = [frame[field].tolist() for field in Participant.FIELDS]
+    return [Participant.from_normalized(*values) for values in zip(*columns)]
+
+
+def address_fingerprints(frame: pd.DataFrame) -> np.ndarray:
+    """Stable 64-bit fingerprint of the address fields of every row of a normalized frame."""
+    return _hash_fields([frame[field].to_numpy(dtype=object) for field in ADDRESS_FIELDS])
+
+
+def identity_fingerprints(frame: pd.DataFrame) -> np.ndarray:
+    """Stable 64-bit fingerprint identifying the person of every row of a normalized frame."""
+    return _hash_fields([frame[field].to_numpy(dtype=object) for field in IDENTITY_FIELDS])
+
+
+def participant_fingerprints(participants: List[Participant]) -> tuple[np.ndarray, np.ndarray]:
+    """Address and identity fingerprints of existing participants, matching the frame based functions."""
+    address = _hash_fields([
+        np.array([getattr(p, field) for p in participants], dtype=object) for field in ADDRESS_FIELDS
+    ])
+    identity = _hash_fields([
+        np.array([getattr(p, field) for p in participants], dtype=object) for field in IDENTITY_FIELDS
+    ])
+    return address, identity
+
+
+def reuse_snapshot_geodata(frame: pd.DataFrame, previous_participants: List[Participant]) -> tuple[list, dict]:
+    """Match the rows of a normalized frame against a previous snapshot by address fingerprint.
+
+    Returns the geo_data of the snapshot for every row whose address is unchanged (None for rows that
+    have to be geocoded) and a summary of added, changed, unchanged and removed participants.
+    Locality centroids of the gazetteer are not reused, those addresses are geocoded again.
+    """
+    previous_address, previous_identity = participant_fingerprints(previous_participants)
+    geo_by_address = {
+        fingerprint: participant.geo_data
+        for fingerprint, participant in zip(previous_address.tolist(), previous_participants)
+        if participant.has_valid_geo() and participant.geo_data.precision == Geodata.ADDRESS
+    }
+
+    address = address_fingerprints(frame)
+    identity = identity_fingerprints(frame)
+    reused = [geo_by_address.get(fingerprint) for fingerprint in address.tolist()]
+
+    known_identity = np.isin(identity, previous_identity)
+    known_pair = np.isin(_combine_hashes(identity, address), _combine_hashes(previous_identity, previous_address))
+    summary = {
+        'added': int((~known_identity).sum()),
+        'changed': int((known_identity & ~known_pair).sum()),
+        'unchanged': int(known_pair.sum()),
+        'removed': int((~np.isin(previous_identity, identity)).sum()),
+        'to_geocode': sum(geo is None for geo in reused)
+    }
+    return reused, summary
+
+
+def _hash_fields(columns: List[np.ndarray]) -> np.ndarray:
+    # Normalize like the geocode cache: missing values, case and surrounding whitespace are ignored
+    keys = None
+    for column in columns:
+        normalized = np.array(
+            ["" if value is None else str(value).strip().lower() for value in column], dtype=object
+        )
+        keys = normalized if keys is None else keys + "\x1f" + normalized
+    if keys is None or len(keys) == 0:
+        return np.array([], dtype=np.uint64)
+    return pd.util.hash_array(keys)
+
+
+def _combine_hashes(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    # uint64 arithmetic wraps around, which is what we want for hash mixing
+    return first * np.uint64(0x9E3779B97F4A7C15) ^ second
+
+
+def _to_string_column(column: pd.Series) -> pd.Series:
+    # Numeric columns (e.g. PLZ read without dtype=str) would otherwise be rendered as "8000.0"
+    if pd.api.types.is_float_dtype(column):
+        rounded = column.round()
+        if ((rounded == column) | column.isna()).all():
+            column = rounded.astype("Int64")
+    if not pd.api.types.is_object_dtype(column) and not pd.api.types.is_string_dtype(column):
+        return column.astype(str).where(column.notna(), None)
+    return column
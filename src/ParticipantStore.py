@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import pickle
+import shutil
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List
+
+from .Geodata import Geodata, to_float
+from .Participant import Participant
+from .ParticipantTable import ParticipantTable
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the stored columns or their meaning change, old snapshots are then rejected
+SCHEMA_VERSION = 2
+
+META_FILE = 'meta.json'
+COORDINATE_COLUMNS = ('x', 'y', 'lat', 'lon')
+# Geodata.precision of the coordinates, None for participants without any
+PRECISION_COLUMN = 'geo_precision'
+STRING_COLUMNS = Participant.FIELDS
+# Text columns read by load_table, everything clustering and leader assignment need
+TABLE_COLUMNS = ('funktion_im_jamboree', 'abteilung', 'kantonalverband')
+# Stored as text, but pickles of earlier versions may hold them as floats (3000.0)
+NUMBER_FIELDS = ('hausnummer', 'postfach', 'plz')
+
+
+class SnapshotSchemaError(Exception):
+    """Raised when a snapshot was written with a different schema version."""
+
+
+def save_snapshot(path: str, participants: List[Participant]):
+    """Write participants as a directory of .npy columns that can be memory-mapped on load.
+
+    Coordinates are float64 columns (NaN when missing), text fields are dictionary encoded as
+    int32 codes (-1 for None) plus a unicode array of distinct values.
+    """
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    columns = {}
+    for name in COORDINATE_COLUMNS:
+        values = np.array([
+            to_float(getattr(p.geo_data, name)) if p.geo_data is not None else np.nan
+            for p in participants
+        ], dtype=np.float64)
+        np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+        columns[name] = 'float64'
+
+    text_columns = {name: [_to_str(getattr(p, name)) for p in participants] for name in STRING_COLUMNS}
+    text_columns[PRECISION_COLUMN] = [p.geo_data.precision if p.geo_data is not None else None for p in participants]
+    for name, raw in text_columns.items():
+        codes, values = pd.factorize(np.array(raw, dtype=object), use_na_sentinel=True)
+        np.save(os.path.join(tmp_path, f"{name}.codes.npy"), codes.astype(np.int32))
+        np.save(os.path.join(tmp_path, f"{name}.values.npy"), np.asarray(values, dtype=str))
+        columns[name] = 'category'
+
+    with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'schema_version': SCHEMA_VERSION, 'count': len(participants), 'columns': columns}, f, indent=2)
+
+    # Replace the previous snapshot only once the new one is complete
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved snapshot of {len(participants)} participants to {path}")
+
+
+def read_snapshot_meta(path: str) -> dict:
+    with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('schema_version') != SCHEMA_VERSION:
+        raise SnapshotSchemaError(
+            f"Snapshot {path} has schema version {meta.get('schema_version')}, expected {SCHEMA_VERSION}"
+        )
+    return meta
+
+
+def load_columns(path: str, columns: Iterable[str]) -> Dict[str, np.ndarray | pd.Categorical]:
+    """Load only the requested columns. Coordinate columns are memory-mapped arrays, text
+    columns are returned as pandas Categoricals (codes + distinct values)."""
+    meta = read_snapshot_meta(path)
+    result = {}
+    for name in columns:
+        kind = meta['columns'].get(name)
+        if kind == 'float64':
+            result[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+        elif kind == 'category':
+            codes = np.load(os.path.join(path, f"{name}.codes.npy"), mmap_mode='r')
+            values = np.load(os.path.join(path, f"{name}.values.npy"))
+            result[name] = pd.Categorical.from_codes(codes, categories=values.astype(object))
+        else:
+            raise KeyError(f"Column '{name}' is not stored in snapshot {path}")
+    return result
+
+
+def load_participants(path: str) -> List[Participant]:
+    """Rebuild Participant objects (with geo_data where coordinates are present) from a snapshot."""
+    read_snapshot_meta(path)
+
+    field_values = []
+    for name in STRING_COLUMNS:
+        codes = np.load(os.path.join(path, f"{name}.codes.npy"))
+        values = np.load(os.path.join(path, f"{name}.values.npy")).astype(object)
+        # Code -1 selects the appended missing value: "" except for the nullable address fields
+        missing = None if name in Participant.NULLABLE_FIELDS else ""
+        field_values.append(np.append(values, [missing])[codes].tolist())
+
+    participants = [Participant.from_normalized(*values) for values in zip(*field_values)]
+    precision_codes = np.load(os.path.join(path, f"{PRECISION_COLUMN}.codes.npy"))
+    precision_values = np.load(os.path.join(path, f"{PRECISION_COLUMN}.values.npy")).astype(object)
+    _attach_geodata(
+        participants, *(np.load(os.path.join(path, f"{name}.npy")) for name in COORDINATE_COLUMNS),
+        np.append(precision_values, [Geodata.ADDRESS])[precision_codes]
+    )
+    return participants
+
+
+def load_table(path: str) -> ParticipantTable:
+    """ParticipantTable of all snapshot rows for clustering, read with load_columns.
+
+    Only the coordinate, function, department and Kantonalverband columns are read and no
+    Participant objects are created. Row i of the table is snapshot row i, clusters computed on it
+    are stored with save_cluster_labels and loaded onto full participants with load_cluster_labels.
+    """
+    columns = load_columns(path, COORDINATE_COLUMNS + TABLE_COLUMNS)
+    x, y, lat, lon = (columns[name] for name in COORDINATE_COLUMNS)
+    return ParticipantTable.from_columns(
+        np.column_stack([x, y]), np.column_stack([lat, lon]),
+        columns['abteilung'], columns['kantonalverband'], columns['funktion_im_jamboree']
+    )
+
+
+def convert_legacy_pickle(pkl_path: str, path: str):
+    """Write the participants of a pickle of earlier versions as a snapshot. Numbers stored as
+    floats are written like the export reader produces them ("3000", not "3000.0"), otherwise the
+    next export would count every address as changed."""
+    with open(pkl_path, 'rb') as f:
+        participants = pickle.load(f)
+    for participant in participants:
+        for name in NUMBER_FIELDS:
+            setattr(participant, name, _number_text(getattr(participant, name)))
+    save_snapshot(path, participants)
+
+
+def _attach_geodata(participants: List[Participant], x: np.ndarray, y: np.ndarray, lat: np.ndarray, lon: np.ndarray,
+                    precision: np.ndarray):
+    has_geo = ~(np.isnan(x) & np.isnan(y) & np.isnan(lat) & np.isnan(lon))
+    for i, xi, yi, lat_i, lon_i, precision_i in zip(
+        np.flatnonzero(has_geo).tolist(), x[has_geo].tolist(), y[has_geo].tolist(),
+        lat[has_geo].tolist(), lon[has_geo].tolist(), precision[has_geo].tolist()
+    ):
+        participants[i].geo_data = Geodata(
+            lat=_from_float(lat_i), lon=_from_float(lon_i), x=_from_float(xi), y=_from_float(yi), precision=precision_i
+        )
+
+
+def _number_text(value) -> str | None:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    text = str(value).strip()
+    return text[:-2] if text.endswith('.0') and text[:-2].isdigit() else text
+
+
+def _from_float(value: float) -> float | None:
+    return None if value != value else value  # NaN check without a NumPy call per value
+
+
+def _to_str(value) -> str | None:
+    return None if value is None else str(value)
+
+
+def save_cluster_labels(path: str, count: int, rows: np.ndarray, labels: np.ndarray, cluster_info: dict):
+    """Store the clusters of a snapshot of count rows: labels[i] is the cluster of snapshot row
+    rows[i] (e.g. ParticipantTable.rows), all other rows get -1. Also stores the cluster info."""
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    row_labels = np.full(count, -1, dtype=np.int32)
+    row_labels[np.asarray(rows, dtype=np.intp)] = labels
+    np.save(os.path.join(tmp_path, 'labels.npy'), row_labels)
+    with open(os.path.join(tmp_path, 'cluster_info.json'), 'w', encoding='utf-8') as f:
+        json.dump({str(cluster_id): info for cluster_id, info in cluster_info.items()}, f, indent=2)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+
+
+def load_labels(path: str) -> tuple:
+    """Stored (labels in snapshot row order, cluster_info)."""
+    labels = np.load(os.path.join(path, 'labels.npy'))
+    with open(os.path.join(path, 'cluster_info.json'), encoding='utf-8') as f:
+        cluster_info = {int(cluster_id): info for cluster_id, info in json.load(f).items()}
+    return labels, cluster_info
+
+
+def load_cluster_labels(path: str, participants: List[Participant]) -> tuple:
+    """Assign the stored clusters to participants loaded from the same snapshot.
+    Returns ({cluster_id: [participants]}, cluster_info), clusters in ID order."""
+    labels, cluster_info = load_labels(path)
+    if len(labels) != len(participants):
+        raise ValueError(f"Cluster labels in {path} are for {len(labels)} participants, got {len(participants)}")
+
+    clusters = {cluster_id: [] for cluster_id in sorted(cluster_info)}
+    for participant, label in zip(participants, labels.tolist()):
+        participant.cluster = None if label < 0 else label
+        if label >= 0:
+            clusters[label].append(participant)
+    return clusters, cluster_info
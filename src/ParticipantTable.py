@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+from .Geodata import lv95_to_wgs84, to_float, wgs84_to_lv95
+from .Participant import Participant
+
+class ParticipantTable:
+    """Struct-of-arrays view of a list of participants.
+
+    Coordinates are stored as contiguous float64 columns and departments / Kantonalverbände /
+    functions as integer category codes, so that clustering can work on array slices instead of
+    reading attributes from every Participant object. Row i belongs to participants[i], tables
+    built from snapshot columns have no Participant objects (participants is None). rows[i] is the
+    position of row i in the list or snapshot the table was built from.
+    """
+
+    UNKNOWN_DEPARTMENT = "UNKNOWN"
+
+    def __init__(self, participants: List[Participant] | None, xy: np.ndarray, latlon: np.ndarray,
+                 department_codes: np.ndarray, departments: np.ndarray,
+                 kantonalverband_codes: np.ndarray, kantonalverbaende: np.ndarray,
+                 function_codes: np.ndarray, functions: np.ndarray, rows: np.ndarray):
+        self.participants = participants
+        self.xy = xy
+        self.latlon = latlon
+        self.department_codes = department_codes
+        self.departments = departments
+        self.kantonalverband_codes = kantonalverband_codes
+        self.kantonalverbaende = kantonalverbaende
+        self.function_codes = function_codes
+        self.functions = functions
+        self.rows = rows
+
+    @classmethod
+    def from_participants(cls, participants: List[Participant]) -> "ParticipantTable":
+        n = len(participants)
+        xy = np.full((n, 2), np.nan, dtype=np.float64)
+        latlon = np.full((n, 2), np.nan, dtype=np.float64)
+        for i, participant in enumerate(participants):
+            geo = participant.geo_data
+            if geo is not None:
+                xy[i] = (to_float(geo.x), to_float(geo.y))
+                latlon[i] = (to_float(geo.lat), to_float(geo.lon))
+
+        return cls.from_columns(
+            xy, latlon,
+            np.array([p.abteilung for p in participants], dtype=object),
+            np.array([p.kantonalverband for p in participants], dtype=object),
+            np.array([p.funktion_im_jamboree for p in participants], dtype=object),
+            participants=participants
+        )
+
+    @classmethod
+    def from_columns(cls, xy: np.ndarray, latlon: np.ndarray, departments, kantonalverbaende, functions,
+                     participants: List[Participant] | None = None) -> "ParticipantTable":
+        """Build a table from coordinate arrays (NaN when missing) and the department, Kantonalverband
+        and function of every row (arrays or Categoricals, e.g. columns of a snapshot). Without
+        participants the table holds no Participant objects."""
+        xy = np.array(xy, dtype=np.float64)
+        latlon = np.array(latlon, dtype=np.float64)
+
+        # Derive a missing coordinate system from the other one, for all such rows at once
+        has_xy = np.isfinite(xy).all(axis=1)
+        has_latlon = np.isfinite(latlon).all(axis=1)
+        missing_xy = has_latlon & ~has_xy
+        if missing_xy.any():
+            xy[missing_xy] = np.column_stack(wgs84_to_lv95(latlon[missing_xy, 0], latlon[missing_xy, 1]))
+        missing_latlon = has_xy & ~has_latlon
+        if missing_latlon.any():
+            latlon[missing_latlon] = np.column_stack(lv95_to_wgs84(xy[missing_latlon, 0], xy[missing_latlon, 1]))
+
+        # Codes follow the order of first appearance, which keeps cluster IDs stable
+        department_codes, departments = _factorize(departments, missing=cls.UNKNOWN_DEPARTMENT)
+        kantonalverband_codes, kantonalverbaende = _factorize(kantonalverbaende, missing="")
+        function_codes, functions = _factorize(functions, missing="")
+
+        return cls(
+            participants=None if participants is None else list(participants),
+            xy=xy,
+            latlon=latlon,
+            department_codes=department_codes,
+            departments=departments,
+            kantonalverband_codes=kantonalverband_codes,
+            kantonalverbaende=kantonalverbaende,
+            function_codes=function_codes,
+            functions=functions,
+            rows=np.arange(len(xy))
+        )
+
+    @classmethod
+    def with_valid_xy(cls, participants: "List[Participant] | ParticipantTable") -> "ParticipantTable":
+        """Build (or reuse) a table restricted to rows with finite x/y coordinates."""
+        table = participants if isinstance(participants, ParticipantTable) else cls.from_participants(participants)
+        valid = table.has_xy()
+        return table if valid.all() else table.take(valid)
+
+    def __len__(self):
+        return len(self.xy)
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.xy[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.xy[:, 1]
+
+    @property
+    def lat(self) -> np.ndarray:
+        return self.latlon[:, 0]
+
+    @property
+    def lon(self) -> np.ndarray:
+        return self.latlon[:, 1]
+
+    def has_xy(self) -> np.ndarray:
+        return np.isfinite(self.xy).all(axis=1)
+
+    def has_latlon(self) -> np.ndarray:
+        return np.isfinite(self.latlon).all(axis=1)
+
+    def is_participant(self) -> np.ndarray:
+        """Rows with the function of a participant, like Participant.is_participant."""
+        return self._has_function(Participant.PARTICIPANT_FUNCTION)
+
+    def is_leader(self) -> np.ndarray:
+        """Rows with the function of a unit leader, like Participant.is_leader."""
+        return self._has_function(Participant.LEADER_FUNCTION)
+
+    def take(self, indices: np.ndarray) -> "ParticipantTable":
+        """Return a new table with the given rows. Category tables are shared, codes are kept."""
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        return ParticipantTable(
+            participants=None if self.participants is None else [self.participants[i] for i in indices],
+            xy=self.xy[indices],
+            latlon=self.latlon[indices],
+            department_codes=self.department_codes[indices],
+            departments=self.departments,
+            kantonalverband_codes=self.kantonalverband_codes[indices],
+            kantonalverbaende=self.kantonalverbaende,
+            function_codes=self.function_codes[indices],
+            functions=self.functions,
+            rows=self.rows[indices]
+        )
+
+    def sorted_by_department(self) -> "ParticipantTable":
+        """Return a copy whose rows are grouped by department (stable, in order of first appearance)."""
+        return self.take(self.department_order())
+
+    def department_order(self) -> np.ndarray:
+        """Row order of sorted_by_department()."""
+        _, first_index, inverse = np.unique(self.department_codes, return_index=True, return_inverse=True)
+        appearance_rank = np.argsort(np.argsort(first_index))
+        return np.argsort(appearance_rank[inverse], kind='stable')
+
+    def department_slices(self) -> Dict[str, slice]:
+        """Row slices per department. Requires a table returned by sorted_by_department(), so that
+        each slice of xy is a view and no coordinates are copied."""
+        codes = self.department_codes
+        boundaries = np.flatnonzero(np.diff(codes)) + 1
+        if len(codes) and len(boundaries) + 1 != len(np.unique(codes)):
+            raise ValueError("department_slices() requires a table sorted by department")
+
+        starts = np.concatenate(([0], boundaries)) if len(codes) else np.array([], dtype=int)
+        ends = np.concatenate((boundaries, [len(codes)])) if len(codes) else np.array([], dtype=int)
+        return {
+            self.departments[codes[start]]: slice(int(start), int(end))
+            for start, end in zip(starts, ends)
+        }
+
+    def _has_function(self, function: str) -> np.ndarray:
+        matches = np.array([value.strip() == function for value in self.functions], dtype=bool)
+        return matches[self.function_codes]
+
+
+def _factorize(values, missing: str) -> tuple:
+    """Integer codes (int32) and distinct values of a column, empty or missing values become missing."""
+    codes, uniques = pd.factorize(values if isinstance(values, pd.Categorical) else np.asarray(values, dtype=object))
+    uniques = np.asarray(uniques, dtype=object)
+    empty = np.array([pd.isna(value) or value == "" for value in uniques], dtype=bool)
+    if (codes < 0).any() or empty.any():
+        # Fold missing and empty values into one category, at the position of its first appearance
+        values = np.where(np.append(empty, True)[codes], missing, np.append(uniques, missing)[codes])
+        codes, uniques = pd.factorize(values)
+        uniques = np.asarray(uniques, dtype=object)
+    return codes.astype(np.int32), uniques
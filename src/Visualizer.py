@@ -1,26 +1,62 @@
-import os
+import json
 import logging
 import folium
-import pandas as pd
 import numpy as np
 from folium import plugins
 from typing import List, Dict
 
+from src.CantonLayer import load_canton_layer, canton_densities
+from src.Clustering.ClusterStatistics import cluster_statistics
 from src.Participant import Participant
 
 logger = logging.getLogger(__name__)
 
-# Get the base directory of the project
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-kanton_overview = os.path.join(BASE_DIR, 'data', 'geodata', 'Switzerland_overview.csv')
-kanton_geojson = os.path.join(BASE_DIR, 'data', 'geodata', 'switzerland.geojson')
-kanton_data = pd.read_csv(kanton_overview)
+
+# CSS colors of the folium/Leaflet.awesome-markers color names, for layers drawn without icons
+MARKER_HEX_COLORS = {
+    'red': '#d63e2a', 'blue': '#38aadd', 'green': '#72b026', 'purple': '#d252b9', 'orange': '#f69730',
+    'darkred': '#a23336', 'lightred': '#ff8e7f', 'beige': '#ffcb92', 'darkblue': '#0067a3',
+    'darkgreen': '#728224', 'cadetblue': '#436978', 'darkpurple': '#5b396b', 'pink': '#ff91ea',
+    'lightblue': '#8adaff', 'lightgreen': '#bbf970', 'gray': '#575757', 'black': '#303030', 'lightgray': '#a3a3a3'
+}
+
+# Builds a marker from a data row of _add_fast_participant_layer:
+# [lat, lon, cluster, name, full name, place, Abteilung, Funktion, Kantonalverband].
+# Text is escaped and the popup is only rendered when it is opened.
+FAST_MARKER_CALLBACK = """
+function (row) {
+    var colors = __COLORS__;
+    var escape = function (value) {
+        var element = document.createElement('div');
+        element.textContent = value == null ? '' : String(value);
+        return element.innerHTML;
+    };
+    var color = row[2] < 0 ? colors[1] : colors[row[2] % colors.length];
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 6, color: color, fillColor: color, fillOpacity: 0.8, weight: 1
+    });
+    marker.bindTooltip(escape(row[3]) + ' - ' + escape(row[5]));
+    marker.bindPopup(function () {
+        var html = '<b>' + escape(row[3]) + '</b><br>' + escape(row[4]) + '<br>' + escape(row[5]) + '<br>'
+            + 'Abteilung: ' + escape(row[6]) + '<br>Funktion: ' + escape(row[7]) + '<br>'
+            + 'Kantonalverband: ' + escape(row[8]) + '<br>';
+        if (row[2] >= 0) {
+            html += '<br>Cluster: ' + row[2];
+        }
+        return html;
+    }, {maxWidth: 300});
+    return marker;
+}
+"""
 
 class ParticipantVisualizer:
     # Swiss geographic center and bounds
     SWISS_CENTER = [46.8182, 8.2275]  # Center of Switzerland
     SWISS_BOUNDS = [[45.8, 5.9], [47.8, 10.5]]  # Southwest and Northeast corners
 
+    MAP_MODES = ('markers', 'fast', 'hulls', 'auto')
+    FAST_MODE_THRESHOLD = 2000  # 'auto' switches to the 'fast' mode above this many participants
+
     def __init__(self):
         self.colors = [
             'red', 'blue', 'green', 'purple', 'orange',
@@ -31,7 +67,19 @@ class ParticipantVisualizer:
 
     def create_interactive_map(self, participants: List[Participant],
                                clusters: Dict[int, List[Participant]] = None,
-                               output_file: str = 'participant_map.html'):
+                               output_file: str = 'participant_map.html',
+                               mode: str = 'markers'):
+        """Render participants and clusters to an HTML map.
+
+        mode 'markers' draws one marker with popup per participant (readable, but large HTML),
+        'fast' puts all participants into one FastMarkerCluster data layer whose markers and popups
+        are built in the browser, 'hulls' only draws the convex hull and centroid of every cluster.
+        'auto' uses 'fast' above FAST_MODE_THRESHOLD participants. In 'fast' and 'hulls' mode the
+        clusters are drawn as hulls, so the output grows with the number of clusters only.
+        """
+        if mode not in self.MAP_MODES:
+            raise ValueError(f"Unknown map mode '{mode}', expected one of {self.MAP_MODES}")
+
         # Filter participants with valid geo_data
         valid_participants = [
             p for p in participants
@@ -42,6 +90,10 @@ class ParticipantVisualizer:
             logger.error("No participants with valid geo_data found")
             return None
 
+        if mode == 'auto':
+            mode = 'fast' if len(valid_participants) > self.FAST_MODE_THRESHOLD else 'markers'
+        logger.info(f"Rendering map in '{mode}' mode")
+
         # Create map centered on Switzerland
         map = folium.Map(
             location=self.SWISS_CENTER,
@@ -49,11 +101,11 @@ class ParticipantVisualizer:
             tiles='OpenStreetMap'
         )
 
-        # Add Swiss cantonal choropleth layer
-        folium.Choropleth(
-            geo_data=kanton_geojson,
-            data=kanton_data,
-            columns=['CantonNumber', 'Density'],
+        # Add Swiss cantonal choropleth layer (simplified polygons with densities, cached)
+        canton_layer = load_canton_layer()
+        choropleth = folium.Choropleth(
+            geo_data=canton_layer,
+            data=canton_densities(canton_layer),
             key_on='feature.properties.KANTONSNUM',
             threshold_scale=[26, 100, 200, 500, 1000, 5072],
             fill_color='BuPu',
@@ -61,12 +113,38 @@ class ParticipantVisualizer:
             line_opacity=0.2,
             legend_name='Population Density (per km²)',
             name='Canton Density'
-        ).add_to(map)
+        )
+        folium.GeoJsonTooltip(fields=['Canton', 'Density'], aliases=['Canton', 'Density (per km²)']).add_to(choropleth.geojson)
+        choropleth.add_to(map)
+
+        if mode == 'markers':
+            self._add_participant_markers(map, valid_participants)
+            if clusters:
+                self._add_cluster_centers(map, clusters)
+        else:
+            if mode == 'fast':
+                self._add_fast_participant_layer(map, valid_participants)
+            if clusters:
+                self._add_cluster_hulls(map, clusters)
+
+        # Add layer control
+        folium.LayerControl().add_to(map)
+
+        # Add fullscreen option
+        plugins.Fullscreen().add_to(map)
+
+        # Save map
+        map.save(output_file)
+        logger.info(f"Interactive map saved to {output_file}")
+        logger.info(f"Total participants plotted: {len(valid_participants)}")
+
+        return map
 
+    def _add_participant_markers(self, map: folium.Map, participants: List[Participant]):
         # Add markers for each participant
         marker_cluster = plugins.MarkerCluster()
 
-        for participant in valid_participants:
+        for participant in participants:
             geo = participant.geo_data
 
             # Determine marker color based on cluster
@@ -98,44 +176,104 @@ class ParticipantVisualizer:
 
         marker_cluster.add_to(map)
 
-        # Add cluster centers if available
+    def _add_cluster_centers(self, map: folium.Map, clusters: Dict[int, List[Participant]]):
+        # Add cluster centers if available, the LV95 means of all clusters are converted to WGS84 at once
         if clusters:
-            for cluster_id, members in clusters.items():
-                if members:
-                    # Calculate center from members
-                    lats = [p.geo_data.lat for p in members]
-                    lons = [p.geo_data.lon for p in members]
-                    center_lat = np.mean(lats)
-                    center_lon = np.mean(lons)
-
-                    color = self.colors[cluster_id % len(self.colors)]
-
-                    # Add circle for cluster center
-                    folium.Circle(
-                        location=[center_lat, center_lon],
-                        radius=5000,  # 5km radius
-                        popup=f'Cluster {cluster_id}<br>{len(members)} participants',
-                        color=color,
-                        fill=True,
-                        fillOpacity=0.2
-                    ).add_to(map)
-
-                    # Add marker for cluster center
-                    folium.Marker(
-                        location=[center_lat, center_lon],
-                        popup=f'<b>Cluster {cluster_id} Center</b><br>{len(members)} participants',
-                        icon=folium.Icon(color=color, icon='star', prefix='fa')
-                    ).add_to(map)
+            stats = cluster_statistics({cluster_id: members for cluster_id, members in clusters.items() if members})
+            for cluster_id, cluster_stats in stats.items():
+                center_lat = cluster_stats['center_lat']
+                center_lon = cluster_stats['center_lon']
+                size = cluster_stats['size']
 
-        # Add layer control
-        folium.LayerControl().add_to(map)
+                color = self.colors[cluster_id % len(self.colors)]
 
-        # Add fullscreen option
-        plugins.Fullscreen().add_to(map)
+                # Add circle for cluster center
+                folium.Circle(
+                    location=[center_lat, center_lon],
+                    radius=5000,  # 5km radius
+                    popup=f'Cluster {cluster_id}<br>{size} participants',
+                    color=color,
+                    fill=True,
+                    fillOpacity=0.2
+                ).add_to(map)
 
-        # Save map
-        map.save(output_file)
-        logger.info(f"Interactive map saved to {output_file}")
-        logger.info(f"Total participants plotted: {len(valid_participants)}")
+                # Add marker for cluster center
+                folium.Marker(
+                    location=[center_lat, center_lon],
+                    popup=f'<b>Cluster {cluster_id} Center</b><br>{size} participants',
+                    icon=folium.Icon(color=color, icon='star', prefix='fa')
+                ).add_to(map)
 
-        return map
+    def _add_fast_participant_layer(self, map: folium.Map, participants: List[Participant]):
+        # One compact row per participant, markers and popups are created by the callback in the browser
+        data = [
+            [
+                round(p.geo_data.lat, 5), round(p.geo_data.lon, 5),
+                -1 if p.cluster is None else p.cluster,
+                p.pfadiname or p.vorname, f"{p.vorname} {p.nachname}", f"{p.plz or ''} {p.ort}".strip(),
+                p.hauptebene, p.funktion_im_jamboree, p.kantonalverband
+            ]
+            for p in participants
+        ]
+        callback = FAST_MARKER_CALLBACK.replace('__COLORS__', json.dumps([MARKER_HEX_COLORS[c] for c in self.colors]))
+        plugins.FastMarkerCluster(data, callback=callback, name='Participants').add_to(map)
+
+    def _add_cluster_hulls(self, map: folium.Map, clusters: Dict[int, List[Participant]]):
+        hulls = []
+        centers = []
+        for cluster_id, members in clusters.items():
+            if not members:
+                continue
+            coordinates = np.array([[p.geo_data.lon, p.geo_data.lat] for p in members], dtype=np.float64)
+            color = MARKER_HEX_COLORS[self.colors[cluster_id % len(self.colors)]]
+            departments = sorted({p.abteilung for p in members})
+            properties = {
+                'cluster': int(cluster_id),
+                'participants': len(members),
+                'departments': ', '.join(departments[:3]) + ('...' if len(departments) > 3 else ''),
+                'color': color
+            }
+            hulls.append({'type': 'Feature', 'geometry': _hull_geometry(coordinates), 'properties': properties})
+            center = coordinates.mean(axis=0).round(5).tolist()
+            centers.append({'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': center}, 'properties': properties})
+
+        style = lambda feature: {
+            'color': feature['properties']['color'],
+            'fillColor': feature['properties']['color'],
+            'weight': 2,
+            'fillOpacity': 0.25
+        }
+        popup_fields = ['cluster', 'participants', 'departments']
+        popup_aliases = ['Cluster', 'Participants', 'Departments']
+        folium.GeoJson(
+            {'type': 'FeatureCollection', 'features': hulls},
+            name='Cluster areas',
+            style_function=style,
+            popup=folium.GeoJsonPopup(fields=popup_fields, aliases=popup_aliases)
+        ).add_to(map)
+        folium.GeoJson(
+            {'type': 'FeatureCollection', 'features': centers},
+            name='Cluster centers',
+            style_function=style,
+            marker=folium.CircleMarker(radius=6, fill=True),
+            popup=folium.GeoJsonPopup(fields=popup_fields, aliases=popup_aliases)
+        ).add_to(map)
+
+
+def _hull_geometry(coordinates: np.ndarray) -> dict:
+    """GeoJSON geometry of the convex hull of (lon, lat) points. Clusters with fewer than three
+    distinct points or all points on a line are drawn as a point or line instead."""
+    from scipy.spatial import ConvexHull, QhullError
+    unique = np.unique(coordinates.round(6), axis=0)
+    if len(unique) == 1:
+        return {'type': 'Point', 'coordinates': unique[0].tolist()}
+    if len(unique) >= 3:
+        try:
+            ring = unique[ConvexHull(unique).vertices]
+            ring = np.vstack([ring, ring[:1]]).round(5)
+            return {'type': 'Polygon', 'coordinates': [ring.tolist()]}
+        except QhullError:
+            pass
+    # Collinear points: line between the two extremes
+    order = np.lexsort((unique[:, 1], unique[:, 0]))
+    return {'type': 'LineString', 'coordinates': unique[order[[0, -1]]].round(5).tolist()}
@@ -1,28 +1,231 @@
+import logging
 import requests
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import List
+from urllib3.util.retry import Retry
 
 from .Geodata import Geodata
+from .GeocodeCache import GeocodeCache
+from .Instrumentation import counters, GEOCODING_API_CALLS
+from .RateLimiter import TokenBucket
+
+logger = logging.getLogger(__name__)
 
 class LawmangerInteractor:
-    def __init__(self, base_url: str):
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+    # Responses of a backend without batch endpoint, batching is switched off for this interactor
+    BATCH_UNSUPPORTED_STATUS_CODES = (404, 405, 501)
+
+    def __init__(self, base_url: str, cache: GeocodeCache | None = None, max_workers: int = 8,
+                 rate_limit: float | None = None, max_retries: int = 5, backoff_factor: float = 0.5,
+                 timeout: float = 30, batch_url: str | None = None, batch_size: int = 100):
         self.BASE_URL = base_url
+        self.batch_url = batch_url or None  # POST {"searches": [...]} endpoint, None for single requests only
+        self.batch_size = max(1, batch_size)
+        self.cache = cache
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit else None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+
+        # Shared session so that lookups reuse pooled keep-alive connections. The adapter only retries
+        # connection errors, responses with RETRY_STATUS_CODES are retried in _send so that every
+        # attempt takes a rate limit token
+        retry = Retry(
+            total=max_retries,
+            status=0,
+            backoff_factor=backoff_factor,
+            allowed_methods=frozenset(["GET", "POST"]),  # Batch lookups are POSTed but read only
+            respect_retry_after_header=False  # Else urllib3 retries 429/503 with Retry-After itself
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def search_address(self, search_query: str, k=1) -> Geodata | None:
+        if self.cache is not None:
+            hit, geo_data = self.cache.lookup(search_query, k=k)
+            if hit:
+                return geo_data
+
+        geo_data = self._request_address(search_query, k=k)
+
+        # Only successful lookups are cached, API errors are raised before this point
+        if self.cache is not None:
+            self.cache.store(search_query, geo_data, k=k)
+
+        return geo_data
+
+    def search_addresses(self, search_queries: List[str], k=1) -> List[Geodata | None]:
+        """Geocode many addresses. Results are returned aligned with search_queries, failed lookups
+        are logged and returned as None.
+
+        Addresses are deduplicated after normalization (members of a household share one address),
+        so every distinct address is looked up in the cache and requested at most once. Missing ones
+        are sent in batches if a batch endpoint is configured, otherwise as concurrent single requests.
+        """
+        unique_index = {}
+        unique_queries = []
+        positions = []
+        for query in search_queries:
+            key = GeocodeCache.normalize_address(query)
+            if key not in unique_index:
+                unique_index[key] = len(unique_queries)
+                unique_queries.append(query)
+            positions.append(unique_index[key])
+
+        results: List[Geodata | None] = [None] * len(unique_queries)
+        pending = []
+        for i, query in enumerate(unique_queries):
+            if self.cache is not None:
+                hit, geo_data = self.cache.lookup(query, k=k)
+                if hit:
+                    results[i] = geo_data
+                    continue
+            pending.append(i)
+
+        logger.info(
+            f"{len(search_queries)} addresses, {len(unique_queries)} unique after normalization, "
+            f"{len(unique_queries) - len(pending)} cached, {len(pending)} to request"
+        )
+
+        pending_queries = [unique_queries[i] for i in pending]
+        if self.batch_url is not None:
+            fetched = self._request_batches(pending_queries, k=k)
+        else:
+            fetched = self._request_singles(pending_queries, k=k)
+
+        succeeded_results = []
+        for i, (succeeded, geo_data) in zip(pending, fetched):
+            results[i] = geo_data
+            if succeeded:
+                succeeded_results.append((unique_queries[i], geo_data))
+        # Only successful lookups are cached, failed requests are retried on the next run
+        if self.cache is not None:
+            self.cache.store_many(succeeded_results, k=k)
+
+        return [results[position] for position in positions]
+
+    def _request_singles(self, search_queries: List[str], k=1) -> List[tuple]:
+        """One request per address on the pooled session. Returns (succeeded, geo_data) per address."""
+        def request(search_query: str) -> tuple:
+            try:
+                return True, self._request_address(search_query, k=k)
+            except Exception as e:
+                logger.error(f"Geocoding failed for address '{search_query}': {e}")
+                return False, None
+
+        if self.max_workers == 1 or len(search_queries) <= 1:
+            return [request(query) for query in search_queries]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(request, search_queries))
+
+    def _request_batches(self, search_queries: List[str], k=1) -> List[tuple]:
+        """Request the addresses from the batch endpoint, batch_size at a time. Batches that fail are
+        retried as single requests. Returns (succeeded, geo_data) per address."""
+        batches = [
+            search_queries[start:start + self.batch_size] for start in range(0, len(search_queries), self.batch_size)
+        ]
+
+        def request(batch: List[str]) -> List[tuple] | None:
+            if self.batch_url is None:
+                return None
+            try:
+                return [(True, geo_data) for geo_data in self._request_batch(batch, k=k)]
+            except BatchNotSupported as e:
+                logger.warning(f"Batch geocoding not available ({e}), using single requests")
+                self.batch_url = None
+            except Exception as e:
+                logger.warning(f"Batch of {len(batch)} addresses failed ({e}), retrying them as single requests")
+            return None
+
+        # The first batch is sent alone, so a backend without batch endpoint is detected with one request
+        batch_results = [request(batch) for batch in batches[:1]]
+        if self.max_workers == 1 or len(batches) <= 2:
+            batch_results += [request(batch) for batch in batches[1:]]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                batch_results += list(executor.map(request, batches[1:]))
+
+        fallback = [query for batch, result in zip(batches, batch_results) if result is None for query in batch]
+        fallback_results = iter(self._request_singles(fallback, k=k))
+        results = []
+        for batch, result in zip(batches, batch_results):
+            results.extend(result if result is not None else (next(fallback_results) for _ in batch))
+        return results
+
+    def _request_batch(self, search_queries: List[str], k=1) -> List[Geodata | None]:
+        # A batch counts as one request for the rate limit
+        batch_url = self.batch_url
+        response = self._send("POST", batch_url, json={"searches": search_queries})
+        if response.status_code in self.BATCH_UNSUPPORTED_STATUS_CODES:
+            raise BatchNotSupported(f"HTTP {response.status_code} from {batch_url}")
+        response.raise_for_status()
+        response = response.json()
+
+        if response["response"] != "success":
+            raise Exception(f"Error from Lawmanger API: {response.get('message', 'Unknown error')}")
+        results = response.get("results", [])
+        if len(results) != len(search_queries):
+            raise Exception(f"Lawmanger API returned {len(results)} results for {len(search_queries)} addresses")
+        return [_geodata_from_addresses(result.get("addresses", []), k) for result in results]
+
+    def _request_address(self, search_query: str, k=1) -> Geodata | None:
         params = {"search": search_query}
-        response = requests.get(self.BASE_URL, params=params)
+        response = self._send("GET", self.BASE_URL, params=params)
         response.raise_for_status()
         response = response.json()
 
         if response["response"] == "success":
-            results = response.get("addresses", [])
-            if len(results) >= k:
-                result = results[k - 1]
-                return Geodata(
-                    lat=result.get("lat"),
-                    lon=result.get("lon"),
-                    x=result.get("x"),
-                    y=result.get("y")
-                )
-            else:
-                return None
+            return _geodata_from_addresses(response.get("addresses", []), k)
         else:
             raise Exception(f"Error from Lawmanger API: {response.get('message', 'Unknown error')}")
+
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying RETRY_STATUS_CODES up to max_retries times with exponential backoff
+        or the delay of a Retry-After header. Every attempt waits for the rate limiter."""
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            counters.increment(GEOCODING_API_CALLS)
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            if response.status_code not in self.RETRY_STATUS_CODES or attempt == self.max_retries:
+                return response
+            delay = _retry_after(response)
+            if delay is None:
+                delay = self.backoff_factor * 2 ** attempt
+            logger.debug(f"HTTP {response.status_code} from {url}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+class BatchNotSupported(Exception):
+    """The backend has no batch endpoint (or not at the configured URL)."""
+
+
+def _retry_after(response: requests.Response) -> float | None:
+    # Only the delay-seconds form of the header, an HTTP date falls back to the backoff
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", "")))
+    except ValueError:
+        return None
+
+
+def _geodata_from_addresses(addresses: list, k: int) -> Geodata | None:
+    # The k-th result of a search, None if there are fewer results. A result with only one of the
+    # coordinate systems gets the other one converted
+    if len(addresses) < k:
+        return None
+    result = addresses[k - 1]
+    return Geodata(
+        lat=result.get("lat"),
+        lon=result.get("lon"),
+        x=result.get("x"),
+        y=result.get("y")
+    ).complete()
@@ -0,0 +1,83 @@
+import json
+import re
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+
+class StubLawmanager(ThreadingHTTPServer):
+    """Local stand-in for the Lawmanager address API.
+
+    GET /search?search=<address> answers with one address whose x is 2600000 plus the first number
+    in the query, so results can be matched to their query. POST /batch answers {"searches": [...]}
+    the same way in order. Scripted status codes are returned before a query succeeds.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.lock = threading.Lock()
+        self.searches = []  # Query of every GET, in arrival order
+        self.batches = []  # Queries of every POST
+        self.failures = {}  # query -> status codes returned before success
+        self.batch_status = None  # Status of every POST, None to answer batches
+        self.retry_after = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+def address_result(query: str) -> dict:
+    number = int(re.search(r"\d+", query).group())
+    return {"addresses": [{"x": 2600000.0 + number, "y": 1200000.0}]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)["search"][0]
+        with self.server.lock:
+            self.server.searches.append(query)
+            failures = self.server.failures.get(query)
+            status = failures.pop(0) if failures else None
+        if status is not None:
+            self._reply(status, {"response": "error", "message": f"HTTP {status}"})
+        else:
+            self._reply(200, {"response": "success", **address_result(query)})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.batches.append(body["searches"])
+        if self.server.batch_status is not None:
+            self._reply(self.server.batch_status, {"response": "error"})
+        else:
+            self._reply(200, {"response": "success", "results": [address_result(q) for q in body["searches"]]})
+
+    def _reply(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if self.server.retry_after is not None and status == 429:
+            self.send_header("Retry-After", str(self.server.retry_after))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def lawmanager():
+    server = StubLawmanager()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,67 @@
+import csv
+
+import pytest
+
+import src.ClusterExport as ClusterExport
+from src.ClusterExport import CSV_HEADER, FUNCTION_COLUMN, export_clusters
+from src.Participant import Participant
+
+
+def participant(name: str, function: str = Participant.PARTICIPANT_FUNCTION) -> Participant:
+    return Participant.from_normalized(
+        name, "Muster; \"Jr.\"", "", "Weg", "1", None, "3000", "Bern", "CH", "", function, "Abt A", "KV Bern"
+    )
+
+
+CLUSTERS = {
+    0: [participant("Anna"), participant("Ben", Participant.LEADER_FUNCTION)],
+    1: [participant(f"Kind {i}") for i in range(5)],
+}
+
+
+def test_csv_columns_and_quoting(tmp_path):
+    path = tmp_path / "clusters.csv"
+
+    export_clusters(CLUSTERS, str(path))
+
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f, delimiter=';'))
+    assert rows[0] == CSV_HEADER
+    assert [row[:3] for row in rows[1:3]] == [["0", "Anna", "Muster; \"Jr.\""], ["0", "Ben", "Muster; \"Jr.\""]]
+    assert len(rows) == 1 + 7
+
+
+def test_function_column_only_when_requested(tmp_path):
+    path = tmp_path / "clusters.csv"
+
+    export_clusters(CLUSTERS, str(path), with_function=True)
+
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f, delimiter=';'))
+    assert rows[0] == CSV_HEADER + [FUNCTION_COLUMN]
+    assert rows[2][-1] == Participant.LEADER_FUNCTION
+
+
+@pytest.mark.parametrize('with_function', [False, True])
+def test_parquet_is_written_in_row_groups(tmp_path, monkeypatch, with_function):
+    pq = pytest.importorskip('pyarrow.parquet')
+    monkeypatch.setattr(ClusterExport, 'PARQUET_BATCH_ROWS', 3)
+    path = tmp_path / "clusters.parquet"
+
+    export_clusters(CLUSTERS, str(path), export_format='parquet', with_function=with_function)
+
+    parquet_file = pq.ParquetFile(str(path))
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column_names == CSV_HEADER + ([FUNCTION_COLUMN] if with_function else [])
+    assert table.column('Cluster').to_pylist() == [0, 0, 1, 1, 1, 1, 1]
+    assert table.column('Vorname').to_pylist()[:2] == ["Anna", "Ben"]
+
+
+def test_empty_parquet_export_keeps_the_columns(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / "clusters.parquet"
+
+    export_clusters({}, str(path), export_format='parquet')
+
+    assert pq.read_table(str(path)).column_names == CSV_HEADER
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from src.Clustering.DepartmentGeoClustering import DepartmentGeoClustering
+from src.Geodata import Geodata
+from src.Participant import Participant
+
+
+def participant(abteilung: str, x: float, y: float = 1200000.0) -> Participant:
+    result = Participant.from_normalized(
+        "Vorname", "Nachname", "", "Weg", "1", None, "3000", "Bern", "CH", "", Participant.PARTICIPANT_FUNCTION,
+        abteilung, "KV Bern"
+    )
+    result.geo_data = Geodata(lat=None, lon=None, x=x, y=y)
+    return result
+
+
+@pytest.fixture
+def clusterer():
+    """Two clusters of department A with size_max 4: cluster 0 is full, cluster 1 has room for two."""
+    clusterer = DepartmentGeoClustering(size_max=4, merge_threshold=2, engine='bisection')
+    clusters = {
+        0: [participant("Abt A", 2600000.0 + i) for i in range(4)],
+        1: [participant("Abt A", 2650000.0 + i) for i in range(2)],
+    }
+    for cluster_id, members in clusters.items():
+        for member in members:
+            member.cluster = cluster_id
+    clusterer.cluster_info = {0: {'department': "Abt A", 'sub_cluster': 1}, 1: {'department': "Abt A", 'sub_cluster': 2}}
+    return clusterer, clusters
+
+
+def memberships(clusters: dict) -> dict:
+    return {id(member): cluster_id for cluster_id, members in clusters.items() for member in members}
+
+
+def test_existing_participants_keep_their_cluster(clusterer):
+    clusterer, clusters = clusterer
+    before = memberships(clusters)
+    existing = [member for members in clusters.values() for member in members]
+
+    late = [participant("Abt A", 2600010.0 + i) for i in range(7)] + [participant("Abt B", 2700000.0)]
+    clusterer.assign_late_participants(clusters, late)
+
+    after = memberships(clusters)
+    assert all(after[key] == cluster_id for key, cluster_id in before.items())
+    assert all(member.cluster == before[id(member)] for member in existing)
+    assert all(member.cluster is not None and after[id(member)] == member.cluster for member in late)
+
+
+def test_late_participant_joins_nearest_cluster_with_room(clusterer):
+    clusterer, clusters = clusterer
+    # Next to the full cluster 0, so it goes to cluster 1 of the same department
+    late = participant("Abt A", 2600005.0)
+
+    clusterer.assign_late_participants(clusters, [late])
+
+    assert late.cluster == 1
+    assert len(clusters) == 2
+
+
+def test_size_max_holds_after_late_arrivals(clusterer):
+    clusterer, clusters = clusterer
+    rng = np.random.default_rng(0)
+    late = [participant("Abt A", 2600000.0 + x, 1200000.0 + y) for x, y in rng.uniform(0, 50000, size=(23, 2))]
+
+    clusterer.assign_late_participants(clusters, late)
+
+    assert sum(len(members) for members in clusters.values()) == 6 + 23
+    assert max(len(members) for members in clusters.values()) <= 4
+    assert set(clusters) == set(clusterer.cluster_info)
+
+
+def test_new_units_open_when_every_unit_is_full(clusterer):
+    clusterer, clusters = clusterer
+    clusters[1] += [participant("Abt A", 2650002.0), participant("Abt A", 2650003.0)]
+    late = [participant("Abt A", 2640000.0 + i) for i in range(3)]
+
+    clusterer.assign_late_participants(clusters, late)
+
+    assert [len(clusters[cluster_id]) for cluster_id in (0, 1)] == [4, 4]
+    assert {member.cluster for member in late} == {2}
+    assert clusterer.cluster_info[2] == {'department': "Abt A", 'sub_cluster': 3}
+
+
+def test_new_department_gets_its_own_units(clusterer):
+    clusterer, clusters = clusterer
+    late = [participant("Abt B", 2700000.0 + i) for i in range(6)]
+
+    clusterer.assign_late_participants(clusters, late)
+
+    new_ids = sorted({member.cluster for member in late})
+    assert new_ids == [2, 3]
+    assert all(len(clusters[cluster_id]) <= 4 for cluster_id in new_ids)
+    assert all(clusterer.cluster_info[cluster_id]['department'] == "Abt B" for cluster_id in new_ids)
+
+
+def test_small_leftover_joins_nearest_unit_with_room(clusterer):
+    clusterer, clusters = clusterer
+    # A single participant of a new department is below merge_threshold and joins cluster 1
+    late = participant("Abt B", 2651000.0)
+
+    clusterer.assign_late_participants(clusters, [late])
+
+    assert late.cluster == 1
+    assert sorted(clusterer.cluster_info[1]['department']) == ["Abt A", "Abt B"]
+
+
+def test_late_participants_without_coordinates_are_skipped(clusterer):
+    clusterer, clusters = clusterer
+    late = participant("Abt A", 2600000.0)
+    late.geo_data = None
+
+    clusterer.assign_late_participants(clusters, [late])
+
+    assert late.cluster is None
+    assert sum(len(members) for members in clusters.values()) == 6
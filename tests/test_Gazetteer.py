@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+
+from src.Gazetteer import GAZETTEER_COLUMNS, Gazetteer, build_from_participants
+from src.Geodata import Geodata
+from src.Participant import Participant
+
+LOCALITIES = [
+    ("3011", "Bern", 2600000.0, 1200000.0),
+    # One PLZ, two localities
+    ("1400", "Yverdon-les-Bains", 2539000.0, 1181000.0),
+    ("1400", "Cheseaux-Noréaz", 2541000.0, 1183000.0),
+    # One name, two cantons
+    ("9470", "Buchs SG", 2754000.0, 1226000.0),
+    ("9470", "Buchs", 2754000.0, 1226000.0),
+    ("5033", "Buchs", 2648000.0, 1248000.0),
+]
+
+
+def participant(plz: str | None, ort: str, geo_data: Geodata | None = None) -> Participant:
+    result = Participant.from_normalized(
+        "Vorname", "Nachname", "", "Weg", "1", None, plz, ort, "CH", "", Participant.PARTICIPANT_FUNCTION,
+        "Abt A", "KV Bern"
+    )
+    result.geo_data = geo_data
+    return result
+
+
+@pytest.fixture
+def gazetteer():
+    frame = pd.DataFrame(
+        [(plz, ort, x, y, 46.0 + (y - 1200000.0) / 111000, 7.0 + (x - 2600000.0) / 76000)
+         for plz, ort, x, y in LOCALITIES],
+        columns=GAZETTEER_COLUMNS
+    )
+    return Gazetteer(frame)
+
+
+def test_plz_and_ort_before_plz_only(gazetteer):
+    geo_data = gazetteer.lookup("1400", "Cheseaux-Noréaz")
+
+    assert (geo_data.x, geo_data.y) == (2541000.0, 1183000.0)
+    assert geo_data.precision == Geodata.LOCALITY
+
+
+def test_plz_only_is_the_mean_of_its_localities(gazetteer):
+    geo_data = gazetteer.lookup("1400", "Unbekannt")
+
+    assert (geo_data.x, geo_data.y) == (2540000.0, 1182000.0)
+
+
+def test_lookup_keys_are_normalized(gazetteer):
+    geo_data = gazetteer.lookup(1400.0, "  cheseaux-noréaz ")
+
+    assert (geo_data.x, geo_data.y) == (2541000.0, 1183000.0)
+
+
+def test_ort_only_when_unambiguous(gazetteer):
+    assert gazetteer.lookup(None, "Bern").x == 2600000.0
+    assert gazetteer.lookup(None, "Buchs") is None
+    assert gazetteer.lookup("9999", "Buchs") is None
+
+
+def test_api_results_are_kept(gazetteer):
+    api_result = Geodata(lat=46.95, lon=7.44, x=2600500.0, y=1199500.0)
+    found = participant("3011", "Bern", api_result)
+    not_found = participant("3011", "Bern")
+    unknown = participant("9999", "Nirgends")
+
+    located = gazetteer.locate([found, not_found, unknown])
+
+    assert located == 1
+    assert found.geo_data is api_result and found.geo_data.precision == Geodata.ADDRESS
+    assert (not_found.geo_data.x, not_found.geo_data.precision) == (2600000.0, Geodata.LOCALITY)
+    assert unknown.geo_data is None
+
+
+def test_snapshot_gazetteer_ignores_locality_centroids():
+    participants = [
+        participant("3011", "Bern", Geodata(lat=46.95, lon=7.44, x=2600500.0, y=1199500.0)),
+        participant("3011", "Bern", Geodata(lat=46.9, lon=7.4, x=2600000.0, y=1200000.0, precision=Geodata.LOCALITY)),
+    ]
+
+    frame = build_from_participants(participants)
+
+    assert frame[['plz', 'ort', 'x', 'y']].values.tolist() == [["3011", "Bern", 2600500.0, 1199500.0]]
@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+from src.GeocodeCache import GeocodeCache
+from src.Geodata import Geodata
+
+DAY = 24 * 3600
+BERN = Geodata(lat=46.95, lon=7.44, x=2600000.0, y=1200000.0)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"), ttl_seconds=30 * DAY, negative_ttl_seconds=DAY)
+    yield cache
+    cache.close()
+
+
+def age(cache: GeocodeCache, seconds: float):
+    """Move the creation time of every entry back by seconds."""
+    cache._connection.execute("UPDATE geocode_cache SET created_at = created_at - ?", (seconds,))
+    cache._connection.commit()
+
+
+def test_stored_result_is_found_under_normalized_address(cache):
+    cache.store("Weg 1,  3000   Bern", BERN)
+
+    hit, geo_data = cache.lookup(" weg 1 , 3000 bern")
+
+    assert hit
+    assert (geo_data.lat, geo_data.lon, geo_data.x, geo_data.y) == (46.95, 7.44, 2600000.0, 1200000.0)
+    assert cache.stats() == {'hits': 1, 'misses': 0, 'hit_rate': 1.0}
+
+
+def test_negative_result_is_a_hit_without_geodata(cache):
+    cache.store("Nirgendwo 1, 9999 Nirgends", None)
+
+    assert cache.lookup("Nirgendwo 1, 9999 Nirgends") == (True, None)
+    assert cache.lookup("Weg 1, 3000 Bern") == (False, None)
+
+
+def test_entries_expire_after_their_ttl(cache):
+    cache.store_many([("Weg 1, 3000 Bern", BERN), ("Nirgendwo 1, 9999 Nirgends", None)])
+
+    age(cache, 2 * DAY)
+
+    # The negative result expired after one day, the found address is valid for 30 days
+    assert cache.lookup("Nirgendwo 1, 9999 Nirgends") == (False, None)
+    assert cache.lookup("Weg 1, 3000 Bern")[0]
+
+    age(cache, 30 * DAY)
+
+    assert cache.lookup("Weg 1, 3000 Bern") == (False, None)
+
+
+def test_expiry_follows_the_clock(cache, monkeypatch):
+    cache.store("Weg 1, 3000 Bern", BERN)
+    now = time.time()
+
+    monkeypatch.setattr(time, 'time', lambda: now + 31 * DAY)
+
+    assert cache.lookup("Weg 1, 3000 Bern") == (False, None)
+
+
+def test_negative_ttl_defaults_to_ttl(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"), ttl_seconds=DAY)
+    cache.store("Nirgendwo 1, 9999 Nirgends", None)
+
+    age(cache, DAY / 2)
+    assert cache.lookup("Nirgendwo 1, 9999 Nirgends") == (True, None)
+
+    age(cache, DAY)
+    assert cache.lookup("Nirgendwo 1, 9999 Nirgends") == (False, None)
+    cache.close()
+
+
+def test_purge_expired_removes_only_expired_entries(cache):
+    cache.store("Weg 1, 3000 Bern", BERN)
+    cache.store("Nirgendwo 1, 9999 Nirgends", None)
+    age(cache, 2 * DAY)
+    cache.store("Weg 2, 3000 Bern", BERN)
+    cache.store("Nirgendwo 2, 9999 Nirgends", None)
+
+    assert cache.purge_expired() == 1
+    assert cache.lookup("Nirgendwo 1, 9999 Nirgends") == (False, None)
+    assert cache.lookup("Nirgendwo 2, 9999 Nirgends") == (True, None)
+    assert cache.lookup("Weg 1, 3000 Bern")[0] and cache.lookup("Weg 2, 3000 Bern")[0]
+
+    age(cache, 30 * DAY)
+
+    assert cache.purge_expired() == 3
+    assert cache.purge_expired() == 0
+
+
+def test_without_ttl_nothing_expires(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    cache.store("Weg 1, 3000 Bern", BERN)
+    age(cache, 1000 * DAY)
+
+    assert cache.purge_expired() == 0
+    assert cache.lookup("Weg 1, 3000 Bern")[0]
+    cache.close()
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from src.Geodata import Geodata, lv95_to_wgs84, wgs84_to_lv95
+
+
+def dms(degrees: int, minutes: int, seconds: float) -> float:
+    return degrees + minutes / 60 + seconds / 3600
+
+
+# Worked examples of the swisstopo approximate formulas, one per direction
+REFERENCE_POINTS = [
+    (dms(46, 2, 38.87), dms(8, 43, 49.79), 2699999.76, 1099999.97),
+    (dms(46, 2, 38.86), dms(8, 43, 49.80), 2700000.0, 1100000.0),
+]
+
+
+@pytest.mark.parametrize('lat, lon, east, north', REFERENCE_POINTS)
+def test_wgs84_to_lv95_reference_points(lat, lon, east, north):
+    x, y = wgs84_to_lv95(lat, lon)
+
+    assert np.hypot(x - east, y - north) < 1.0
+
+
+@pytest.mark.parametrize('lat, lon, east, north', REFERENCE_POINTS)
+def test_lv95_to_wgs84_reference_points(lat, lon, east, north):
+    result_lat, result_lon = lv95_to_wgs84(east, north)
+
+    # Compare in metres: one arc second is about 31 m north-south and 21 m east-west here
+    assert abs(result_lat - lat) * 3600 * 30.9 < 1.0
+    assert abs(result_lon - lon) * 3600 * 21.4 < 1.0
+
+
+def test_round_trip_on_arrays():
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(46.0, 47.5, size=(50, 40))
+    lon = rng.uniform(6.5, 9.5, size=(50, 40))
+
+    east, north = wgs84_to_lv95(lat, lon)
+    round_trip = wgs84_to_lv95(*lv95_to_wgs84(east, north))
+
+    assert east.shape == north.shape == lat.shape
+    # Each direction is accurate to about 1 m within Switzerland
+    assert np.hypot(round_trip[0] - east, round_trip[1] - north).max() < 3.0
+
+
+def test_complete_fills_the_missing_system():
+    lat, lon, east, north = REFERENCE_POINTS[0]
+
+    from_wgs84 = Geodata(lat=lat, lon=lon, x=None, y=None).complete()
+    from_lv95 = Geodata(lat=None, lon=None, x=east, y=north).complete()
+
+    assert np.hypot(from_wgs84.x - east, from_wgs84.y - north) < 1.0
+    assert abs(from_lv95.lat - lat) < 1e-5 and abs(from_lv95.lon - lon) < 1e-5
+    assert isinstance(from_wgs84.x, float) and isinstance(from_lv95.lat, float)
@@ -0,0 +1,109 @@
+import logging
+
+import numpy as np
+import pytest
+
+from src.Clustering.LeaderAssignment import LeaderAssignment
+from src.Participant import Participant
+from src.ParticipantTable import ParticipantTable
+
+
+def table(x: list, departments: list | None = None, function: str = Participant.PARTICIPANT_FUNCTION) -> ParticipantTable:
+    xy = np.column_stack([2600000.0 + np.asarray(x, dtype=np.float64), np.full(len(x), 1200000.0)])
+    return ParticipantTable.from_columns(
+        xy, np.full((len(x), 2), np.nan), departments or ["Abt A"] * len(x), [""] * len(x), [function] * len(x)
+    )
+
+
+def units(sizes: dict, departments: dict | None = None) -> tuple:
+    """Members of units {cluster_id: (number of members, x)} and their labels."""
+    x = [position for size, position in sizes.values() for _ in range(size)]
+    labels = np.repeat(list(sizes), [size for size, _ in sizes.values()])
+    member_departments = [
+        (departments or {}).get(cluster_id, "Abt A") for cluster_id, (size, _) in sizes.items() for _ in range(size)
+    ]
+    return table(x, member_departments), labels
+
+
+def leaders(x: list, departments: list | None = None) -> ParticipantTable:
+    return table(x, departments, Participant.LEADER_FUNCTION)
+
+
+def test_required_slots_are_filled_before_optional_ones():
+    members, labels = units({0: (5, 0.0), 1: (5, 100000.0)})
+    # Both leaders live next to unit 0, but unit 1 needs one as well
+    near_unit_0 = leaders([10.0, 20.0])
+
+    assert LeaderAssignment(min_leaders=1, max_leaders=2).assign_labels(members, labels, near_unit_0).tolist() == [0, 1]
+    # Without required slots both stay close to home
+    assert LeaderAssignment(min_leaders=0, max_leaders=2).assign_labels(members, labels, near_unit_0).tolist() == [0, 0]
+
+
+def test_optional_slots_are_filled_by_cost():
+    members, labels = units({0: (5, 0.0), 1: (5, 100000.0)})
+
+    result = LeaderAssignment(min_leaders=1, max_leaders=2).assign_labels(members, labels, leaders([10.0, 20.0, 30.0]))
+
+    assert sorted(result.tolist()) == [0, 0, 1]
+
+
+@pytest.mark.parametrize('participants_per_leader, expected', [(0, [1, 1, 1, 1]), (5, [1, 1, 2, 3]), (12, [1, 1, 1, 3])])
+def test_required_leaders_scale_with_unit_size(participants_per_leader, expected):
+    assignment = LeaderAssignment(min_leaders=1, max_leaders=3, participants_per_leader=participants_per_leader)
+
+    assert assignment.required_leaders(np.array([1, 5, 6, 30])).tolist() == expected
+
+
+def test_large_unit_gets_its_share_of_leaders():
+    members, labels = units({0: (10, 0.0), 1: (2, 50000.0)})
+    # All leaders live next to the small unit 1
+    near_unit_1 = leaders([50010.0, 50020.0, 50030.0])
+
+    by_count = LeaderAssignment(min_leaders=1, max_leaders=3).assign_labels(members, labels, near_unit_1)
+    by_ratio = LeaderAssignment(min_leaders=1, max_leaders=3, participants_per_leader=5).assign_labels(
+        members, labels, near_unit_1
+    )
+
+    assert np.bincount(by_count, minlength=2).tolist() == [1, 2]
+    assert np.bincount(by_ratio, minlength=2).tolist() == [2, 1]
+
+
+def test_leaders_above_capacity_are_reported(caplog):
+    members, labels = units({0: (5, 0.0), 1: (5, 100000.0)})
+    assignment = LeaderAssignment(min_leaders=1, max_leaders=2)
+
+    with caplog.at_level(logging.WARNING):
+        result = assignment.assign_labels(members, labels, leaders([10.0, 20.0, 100010.0, 100020.0, 30000.0]))
+
+    # Four slots for five leaders, the one farthest from any unit is left out
+    assert result.tolist() == [0, 0, 1, 1, -1]
+    assert assignment.unassigned == [4]
+    assert "1 leaders left without unit, 2 units take at most 2 leaders each" in caplog.text
+
+
+def test_leaders_without_coordinates_are_not_assigned(caplog):
+    members, labels = units({0: (5, 0.0)})
+    assignment = LeaderAssignment(min_leaders=1, max_leaders=2)
+
+    with caplog.at_level(logging.WARNING):
+        result = assignment.assign_labels(members, labels, leaders([np.nan, 10.0]))
+
+    assert result.tolist() == [-1, 0]
+    assert assignment.unassigned == [0]
+    assert "1 leaders without valid coordinates are not assigned" in caplog.text
+
+
+def test_leader_prefers_the_unit_of_their_department():
+    members, labels = units({0: (5, -1000.0), 1: (5, 1000.0)}, departments={0: "Abt A", 1: "Abt B"})
+
+    result = LeaderAssignment(min_leaders=0, max_leaders=1).assign_labels(
+        members, labels, leaders([-100.0, 100.0], ["Abt B", "Abt A"])
+    )
+
+    assert result.tolist() == [1, 0]
+
+
+@pytest.mark.parametrize('min_leaders, max_leaders, participants_per_leader', [(3, 2, 0), (0, 0, 0), (1, 2, -1)])
+def test_invalid_settings_are_rejected(min_leaders, max_leaders, participants_per_leader):
+    with pytest.raises(ValueError):
+        LeaderAssignment(min_leaders, max_leaders, participants_per_leader=participants_per_leader)
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.Geodata import Geodata
+from src.Participant import Participant
+from src.ParticipantLoader import CSV_COLUMNS, normalize_frame, reuse_snapshot_geodata
+from src.ParticipantStore import load_cluster_labels, load_participants, load_table, save_cluster_labels, save_snapshot
+
+
+def participant(name: str, function: str, abteilung: str, kantonalverband: str, x: float | None = None) -> Participant:
+    result = Participant.from_normalized(
+        name, "Muster", "", "Weg", "1", None, "3000", "Bern", "CH", "", function, abteilung, kantonalverband
+    )
+    if x is not None:
+        result.geo_data = Geodata(lat=None, lon=None, x=x, y=1200000.0)
+    return result
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / "participants_with_geo")
+    save_snapshot(path, [
+        participant("Anna", Participant.PARTICIPANT_FUNCTION, "Abt A", "KV Bern", 2600000.0),
+        participant("Ben", Participant.LEADER_FUNCTION, "Abt A", "KV Bern", 2600100.0),
+        participant("Cleo", Participant.PARTICIPANT_FUNCTION, "", "", None),
+        participant("Dario", Participant.PARTICIPANT_FUNCTION, "Abt B", "KV Bern", 2610000.0),
+        participant("Eva", "Helfer:in", "Abt B", "KV Bern", 2610000.0),
+    ])
+    return path
+
+
+def test_load_table_reads_columns_without_participants(snapshot):
+    table = load_table(snapshot)
+
+    assert table.participants is None
+    assert len(table) == 5
+    assert table.x[[0, 1, 3]].tolist() == [2600000.0, 2600100.0, 2610000.0]
+    assert np.isnan(table.x[2])
+    # Latitude and longitude are derived from LV95 where missing
+    assert table.has_latlon().tolist() == [True, True, False, True, True]
+    assert table.departments[table.department_codes].tolist() == ["Abt A", "Abt A", "UNKNOWN", "Abt B", "Abt B"]
+    assert table.is_participant().tolist() == [True, False, True, True, False]
+    assert table.is_leader().tolist() == [False, True, False, False, False]
+
+
+def test_labels_are_stored_by_snapshot_row(snapshot, tmp_path):
+    table = load_table(snapshot)
+    members = table.take(table.is_participant())
+    leaders = table.take(table.is_leader())
+    path = str(tmp_path / "clusters")
+
+    save_cluster_labels(
+        path, len(table), np.concatenate([members.rows, leaders.rows]), np.array([0, -1, 1, 1]),
+        {0: {'department': "Abt A", 'sub_cluster': None}, 1: {'department': "Abt B", 'sub_cluster': None}}
+    )
+    clusters, cluster_info = load_cluster_labels(path, load_participants(snapshot))
+
+    assert {cluster_id: [p.vorname for p in members] for cluster_id, members in clusters.items()} == {
+        0: ["Anna"], 1: ["Ben", "Dario"]
+    }
+    assert cluster_info[1]['department'] == "Abt B"
+
+
+def test_labels_of_another_snapshot_are_rejected(snapshot, tmp_path):
+    path = str(tmp_path / "clusters")
+    save_cluster_labels(path, 3, np.arange(3), np.zeros(3, dtype=int), {0: {'department': "Abt A", 'sub_cluster': None}})
+
+    with pytest.raises(ValueError):
+        load_cluster_labels(path, load_participants(snapshot))
+
+
+def test_locality_precision_is_stored_and_geocoded_again(tmp_path):
+    path = str(tmp_path / "participants_with_geo")
+    geocoded = participant("Anna", Participant.PARTICIPANT_FUNCTION, "Abt A", "KV Bern")
+    geocoded.geo_data = Geodata(lat=46.95, lon=7.44, x=2600000.0, y=1200000.0)
+    located = participant("Dario", Participant.PARTICIPANT_FUNCTION, "Abt B", "KV Bern")
+    located.geo_data = Geodata(lat=46.9, lon=7.4, x=2597000.0, y=1194000.0, precision=Geodata.LOCALITY)
+    located.plz, located.ort = "3097", "Liebefeld"
+    without_geo = participant("Cleo", Participant.PARTICIPANT_FUNCTION, "", "")
+    without_geo.strasse = "Gasse"
+    save_snapshot(path, [geocoded, without_geo, located])
+
+    previous = load_participants(path)
+    frame = normalize_frame(pd.DataFrame([p.to_dict() for p in previous]).rename(columns=CSV_COLUMNS))
+    reused, summary = reuse_snapshot_geodata(frame, previous)
+
+    assert [p.geo_data and p.geo_data.precision for p in previous] == [Geodata.ADDRESS, None, Geodata.LOCALITY]
+    # Only the geocoded address is reused, the PLZ/Ort centroid is looked up again
+    assert reused[0] is previous[0].geo_data and reused[1] is None and reused[2] is None
+    assert summary['unchanged'] == 3 and summary['to_geocode'] == 2
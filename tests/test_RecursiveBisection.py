@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from math import ceil
+
+from src.Clustering.RecursiveBisection import RecursiveBisectionConstrained
+
+SIZE_MAX = 36
+
+
+def swiss_points(n: int, seed: int = 0) -> np.ndarray:
+    """LV95 coordinates around a few towns, like the homes of a large department."""
+    rng = np.random.default_rng(seed)
+    towns = rng.uniform((2550000.0, 1150000.0), (2750000.0, 1250000.0), size=(8, 2))
+    return towns[rng.integers(len(towns), size=n)] + rng.normal(scale=3000.0, size=(n, 2))
+
+
+def split(points: np.ndarray, slack: int = 5) -> tuple:
+    """Split like DepartmentGeoClustering does, return the labels, k and size_min."""
+    k = ceil(len(points) / SIZE_MAX)
+    size_min = max(1, len(points) // k - slack)
+    labels = RecursiveBisectionConstrained(n_clusters=k, size_min=size_min, size_max=SIZE_MAX).fit_predict(points)
+    return labels, k, size_min
+
+
+def assert_sizes(labels: np.ndarray, k: int, size_min: int):
+    sizes = np.bincount(labels, minlength=k)
+    assert len(sizes) == k
+    assert sizes.max() <= SIZE_MAX
+    assert sizes.min() >= size_min
+
+
+@pytest.mark.parametrize('n', [37, 38, 71, 73, 100, 500, 2000, 20000])
+def test_sizes_stay_within_bounds(n):
+    points = swiss_points(n)
+
+    labels, k, size_min = split(points)
+
+    assert labels.shape == (n,)
+    assert_sizes(labels, k, size_min)
+
+
+@pytest.mark.parametrize('n', [37, 73, 1000, 5000])
+def test_sizes_without_slack(n):
+    # size_min as large as an even split allows
+    labels, k, size_min = split(swiss_points(n, seed=1), slack=0)
+
+    assert_sizes(labels, k, size_min)
+
+
+@pytest.mark.parametrize('n, distinct', [(37, 1), (500, 3), (2000, 40), (10000, 200)])
+def test_shared_coordinates(n, distinct):
+    # Households and collective addresses put many participants on the same point
+    rng = np.random.default_rng(2)
+    addresses = swiss_points(distinct, seed=3)
+    points = addresses[rng.integers(distinct, size=n)]
+
+    labels, k, size_min = split(points)
+
+    assert_sizes(labels, k, size_min)
+
+
+def test_centres_are_the_cluster_means():
+    points = swiss_points(1000)
+    model = RecursiveBisectionConstrained(n_clusters=28, size_min=30, size_max=SIZE_MAX)
+
+    labels = model.fit_predict(points)
+
+    for label in range(28):
+        np.testing.assert_allclose(model.cluster_centers_[label], points[labels == label].mean(axis=0))
+
+
+def test_result_is_deterministic():
+    points = swiss_points(3000)
+
+    first, _, _ = split(points)
+    second, _, _ = split(points)
+
+    np.testing.assert_array_equal(first, second)
+
+
+@pytest.mark.parametrize('n_clusters, size_min, size_max', [(2, None, 36), (3, 30, None), (81, None, None)])
+def test_infeasible_sizes_are_rejected(n_clusters, size_min, size_max):
+    model = RecursiveBisectionConstrained(n_clusters=n_clusters, size_min=size_min, size_max=size_max)
+
+    with pytest.raises(ValueError):
+        model.fit_predict(swiss_points(80))
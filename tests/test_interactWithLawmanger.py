@@ -0,0 +1,109 @@
+import pytest
+
+from src.GeocodeCache import GeocodeCache
+from src.interactWithLawmanger import LawmangerInteractor
+
+
+def interactor(lawmanager, **kwargs) -> LawmangerInteractor:
+    kwargs.setdefault('max_workers', 4)
+    return LawmangerInteractor(f"{lawmanager.url}/search", backoff_factor=0, **kwargs)
+
+
+def test_results_keep_query_order(lawmanager):
+    queries = [f"Weg {i}, 3000 Bern" for i in range(50)]
+
+    results = interactor(lawmanager).search_addresses(queries)
+
+    assert [geo.x for geo in results] == [2600000.0 + i for i in range(50)]
+    assert sorted(lawmanager.searches) == sorted(queries)
+
+
+def test_429_and_5xx_are_retried(lawmanager):
+    lawmanager.failures = {"Weg 7, 3000 Bern": [429, 503, 500]}
+    lawmanager.retry_after = 0
+
+    results = interactor(lawmanager).search_addresses(["Weg 7, 3000 Bern", "Weg 8, 3000 Bern"])
+
+    assert [geo.x for geo in results] == [2600007.0, 2600008.0]
+    assert lawmanager.searches.count("Weg 7, 3000 Bern") == 4
+
+
+def test_retries_take_rate_limit_tokens(lawmanager):
+    lawmanager.failures = {"Weg 1, 3000 Bern": [429, 502]}
+    lawmanager.retry_after = 0
+    client = interactor(lawmanager, rate_limit=1000)
+    acquired = []
+    acquire = client.rate_limiter.acquire
+    client.rate_limiter.acquire = lambda *args: acquired.append(1) or acquire(*args)
+
+    client.search_addresses(["Weg 1, 3000 Bern"])
+
+    assert len(acquired) == len(lawmanager.searches) == 3
+
+
+def test_failed_address_is_none_after_retries(lawmanager):
+    lawmanager.failures = {"Weg 3, 3000 Bern": [503] * 3}
+
+    results = interactor(lawmanager, max_retries=2).search_addresses(["Weg 2, 3000 Bern", "Weg 3, 3000 Bern"])
+
+    assert results[0].x == 2600002.0
+    assert results[1] is None
+    assert lawmanager.searches.count("Weg 3, 3000 Bern") == 3
+
+
+def test_duplicate_addresses_are_requested_once(lawmanager):
+    queries = ["Weg 1, 3000 Bern", "weg 1 ,3000  Bern", "Weg 2, 3000 Bern", " WEG 1, 3000 BERN "]
+
+    results = interactor(lawmanager).search_addresses(queries)
+
+    assert [geo.x for geo in results] == [2600001.0, 2600001.0, 2600002.0, 2600001.0]
+    assert sorted(lawmanager.searches) == ["Weg 1, 3000 Bern", "Weg 2, 3000 Bern"]
+
+
+def test_batches_are_aligned_with_queries(lawmanager):
+    queries = [f"Weg {i % 30}, 3000 Bern" for i in range(75)]
+    client = interactor(lawmanager, batch_url=f"{lawmanager.url}/batch", batch_size=7)
+
+    results = client.search_addresses(queries)
+
+    assert [geo.x for geo in results] == [2600000.0 + i % 30 for i in range(75)]
+    assert len(lawmanager.batches) == 5
+    assert lawmanager.searches == []
+
+
+@pytest.mark.parametrize('status', [404, 405, 501])
+def test_missing_batch_endpoint_falls_back_to_single_requests(lawmanager, status):
+    lawmanager.batch_status = status
+    queries = [f"Weg {i}, 3000 Bern" for i in range(20)]
+    client = interactor(lawmanager, batch_url=f"{lawmanager.url}/batch", batch_size=5)
+
+    results = client.search_addresses(queries)
+
+    assert [geo.x for geo in results] == [2600000.0 + i for i in range(20)]
+    # Detected with the first batch, everything else is requested on its own
+    assert len(lawmanager.batches) == 1
+    assert sorted(lawmanager.searches) == sorted(queries)
+    assert client.batch_url is None
+
+
+def test_failed_batch_is_retried_as_single_requests(lawmanager):
+    lawmanager.batch_status = 400
+    queries = [f"Weg {i}, 3000 Bern" for i in range(6)]
+    client = interactor(lawmanager, batch_url=f"{lawmanager.url}/batch", batch_size=3)
+
+    results = client.search_addresses(queries)
+
+    assert [geo.x for geo in results] == [2600000.0 + i for i in range(6)]
+    assert len(lawmanager.batches) == 2
+    assert client.batch_url is not None
+
+
+def test_cached_addresses_are_not_requested(lawmanager, tmp_path):
+    cache = GeocodeCache(str(tmp_path / 'cache.sqlite'))
+    interactor(lawmanager, cache=cache).search_addresses(["Weg 1, 3000 Bern", "Weg 2, 3000 Bern"])
+
+    results = interactor(lawmanager, cache=cache).search_addresses(["weg 2, 3000 bern", "Weg 3, 3000 Bern"])
+
+    assert [geo.x for geo in results] == [2600002.0, 2600003.0]
+    assert lawmanager.searches.count("weg 2, 3000 bern") == 0
+    assert len(lawmanager.searches) == 3